@@ -28,6 +28,7 @@ from . import error
 from . import logging
 from . import config
 from . import event
+from . import journal
 from . import util
 
 c = None
@@ -50,6 +50,8 @@ def get_settings_path(name):
 
 CONFIG = {
     "cg:debug.event.dump_file": "events.txt",
+    "cg:debug.event.profile": False,
+    "cg:debug.event.journal_file": "",
 
     "cg:network.default_port": 11225,
 
@@ -75,6 +77,21 @@ CONFIG = {
     "cg:server.address": "0.0.0.0",
     "cg:server.port": 11225,
     "cg:server.secret_length": 32,
+    "cg:server.send.max_latency": 0.02,
+    "cg:server.send.max_buffer": 65536,
+    "cg:server.send.max_queue": 262144,
+    "cg:server.send.max_pending": 1024,
+    "cg:server.send.max_stall": 30,
+    "cg:server.compress.enabled": True,
+    "cg:server.compress.threshold": 1024,
+    "cg:server.compress.level": 6,
+    "cg:server.ping.cache_ttl": 1.0,
+    "cg:server.ping.rate_limit": 10,
+    "cg:server.ping.rate_window": 10.0,
+    "cg:server.auth.workers": 2,
+    "cg:server.auth.max_pending": 32,
+    "cg:server.auth.processes": True,
+    "cg:server.persist.delay": 1.0,
     "cg:server.default_privilege_level": 100,
     "cg:server.default_permissions": [
         "cg:chat.lobby.write",
@@ -62,6 +62,29 @@ This state is usually followed by either :py:data:`STATE_LOBBY` or :py:data:`STA
 
 MODE_CG = 100
 
+# Protocol features
+
+FEATURE_UUID_BIN = "uuid_bin"
+"""
+The ``uuid_bin`` feature signals that :term:`UUIDs <UUID>` are sent as 16 byte binary values.
+
+Only fields listed in the ``uuid_keys`` of a packet are affected, see :py:attr:`cg.packet.CGPacket.uuid_keys`\ .
+"""
+
+FEATURE_GAMERULE_CACHE = "gamerule_cache"
+"""
+The ``gamerule_cache`` feature signals that the client caches gamerule validators.
+
+Instead of the validators themselves, only their hash is sent in :cg:packet:`cg:lobby.change`\ .
+"""
+
+SUPPORTED_FEATURES = frozenset([FEATURE_UUID_BIN, FEATURE_GAMERULE_CACHE])
+"""
+Protocol features supported by this version.
+
+Features are negotiated via :cg:packet:`cg:version.check` and only used if both sides support them.
+"""
+
 ROLE_REMOVE = -1
 ROLE_NONE = 0
 ROLE_SPECTATOR = 1
@@ -129,14 +129,14 @@ class CardGame(object):
         else:
             raise RuntimeError("Neither server or client have been initialized, version information is not available")
 
-    def send_event(self, event: str, data=None):
-        return self.event_manager.send_event(event, data)
+    def send_event(self, event: str, data=None, scope=None):
+        return self.event_manager.send_event(event, data, scope)
 
-    def add_event_listener(self, event: str, func: Callable, flags=0, group=None):
-        self.event_manager.add_event_listener(event, func, flags, group)
+    def add_event_listener(self, event: str, func: Callable, flags=0, group=None, scope=None):
+        self.event_manager.add_event_listener(event, func, flags, group, scope)
 
-    def del_event_listener(self, event: str, func: Callable):
-        self.event_manager.del_event_listener(event, func)
+    def del_event_listener(self, event: str, func: Callable, scope=None):
+        self.event_manager.del_event_listener(event, func, scope)
 
     def process_async_events(self):
         while len(self._ev_queue) > 0:
@@ -22,8 +22,9 @@
 #
 import os
 import threading
+import time
 import traceback
-from typing import Callable, Dict, Mapping, Any, List, Tuple
+from typing import Callable, Dict, Mapping, Any, List, Tuple, Hashable, Optional
 
 MAX_IGNORE = 2
 """
@@ -64,104 +65,602 @@ be added to the event dump list.
    See :py:meth:`EventManager.add_event_listener()` for more information.
 """
 
+WILDCARD = "*"
+"""
+Segment used within event names to create a pattern subscription.
+
+A wildcard matches exactly one segment of an event name. Segments are separated by dots,
+except for dots within square brackets. For example, the pattern ``cg:bot.*.packet.recv``
+matches ``cg:bot.[<uuid>].packet.recv``\ .
+
+.. seealso::
+   See :py:meth:`EventManager.add_event_listener()` for more information.
+"""
+
+MAX_PATTERN_CACHE = 4096
+"""
+Maximum number of event names for which the matching pattern handlers are cached.
+
+If this is exceeded, the cache is simply cleared.
+"""
+
+
+def split_event(event: str) -> Tuple[str, ...]:
+    """
+    Splits an event name into its segments.
+
+    Dots within square brackets do not start a new segment. This allows for segments
+    like ``[cg:game.dk.card.transfer]`` in ``cg:network.packet.[cg:game.dk.card.transfer].recv``\ .
+
+    :param str event: Event name or pattern
+    :return: Tuple of segments
+    """
+    segments = []
+    depth = 0
+    start = 0
+    for i, c in enumerate(event):
+        if c == "[":
+            depth += 1
+        elif c == "]":
+            depth -= 1
+        elif c == "." and depth == 0:
+            segments.append(event[start:i])
+            start = i+1
+    segments.append(event[start:])
+    return tuple(segments)
+
+
+def is_pattern(event: str) -> bool:
+    """
+    Checks whether the given event name is a pattern containing :py:data:`WILDCARD` segments.
+
+    :param str event: Event name
+    :return: bool
+    """
+    return WILDCARD in event and WILDCARD in split_event(event)
+
+
+class _TrieNode(object):
+    __slots__ = ["children", "handlers", "pattern"]
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.handlers: Dict[Callable, int] = {}
+        self.pattern: Optional[str] = None
+
+
+class HandlerStats(object):
+    """
+    Timing statistics of a single handler, as collected by :py:class:`EventProfiler`\ .
+    """
+    __slots__ = ["calls", "total", "max"]
+
+    def __init__(self):
+        self.calls: int = 0
+        self.total: float = 0.0
+        self.max: float = 0.0
+
+
+class EventStats(object):
+    """
+    Dispatch statistics of a single event name, as collected by :py:class:`EventProfiler`\ .
+
+    Handlers are identified by their qualified name, causing e.g. the handlers of all rounds
+    to be aggregated into a single entry.
+    """
+    __slots__ = ["dispatches", "handler_calls", "total", "max", "handlers"]
+
+    def __init__(self):
+        self.dispatches: int = 0
+        self.handler_calls: int = 0
+        self.total: float = 0.0
+        self.max: float = 0.0
+        self.handlers: Dict[str, HandlerStats] = {}
+
+
+class EventProfiler(object):
+    """
+    Low-overhead profiler for event dispatching.
+
+    While :py:attr:`enabled` is ``True``\ , the :py:class:`EventManager` records the number
+    of dispatches, the number of handlers called and the cumulative and maximum wall time
+    of every event and every handler. If it is disabled, dispatching is not slowed down.
+
+    All times are given in seconds.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled: bool = enabled
+        self.stats: Dict[str, EventStats] = {}
+        self.start_time: float = time.time()
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def reset(self) -> None:
+        self.stats = {}
+        self.start_time = time.time()
+
+    def record_handler(self, event: str, handler: Callable, dt: float) -> None:
+        stats = self.stats.get(event, None)
+        if stats is None:
+            stats = self.stats[event] = EventStats()
+
+        name = getattr(handler, "__qualname__", None) or repr(handler)
+        hstats = stats.handlers.get(name, None)
+        if hstats is None:
+            hstats = stats.handlers[name] = HandlerStats()
+
+        hstats.calls += 1
+        hstats.total += dt
+        if dt > hstats.max:
+            hstats.max = dt
+
+    def record_dispatch(self, event: str, handlers: int, dt: float) -> None:
+        stats = self.stats.get(event, None)
+        if stats is None:
+            stats = self.stats[event] = EventStats()
+
+        stats.dispatches += 1
+        stats.handler_calls += handlers
+        stats.total += dt
+        if dt > stats.max:
+            stats.max = dt
+
+    def top(self, n: Optional[int] = None, key: str = "total") -> List[Tuple[str, EventStats]]:
+        """
+        Returns the events with the highest value for the given statistic.
+
+        :param n: Maximum number of events to return, all if ``None``
+        :param str key: Name of the :py:class:`EventStats` attribute to sort by
+        :return: List of ``(event, stats)`` tuples, sorted descending
+        """
+        out = sorted(list(self.stats.items()), key=lambda i: getattr(i[1], key), reverse=True)
+        return out if n is None else out[:n]
+
 
 class EventManager(object):
+    """
+    Central event bus of the :py:class:`~cg.CardGame` singleton.
+
+    Handlers may be registered either globally or for a specific *scope*\ . A scope is an
+    arbitrary hashable value, usually the :term:`UUID` of a game or bot. Events sent with a
+    scope are only delivered to the global handlers and the handlers registered for that
+    exact scope, which allows game events to be routed to the owning game in constant time
+    regardless of how many games are running at the same time.
+
+    Events sent without a scope are broadcast to all handlers of the event, including all
+    scoped handlers. This keeps plugins and older code that do not know about scopes working.
+
+    For fast dispatch, the handlers of each event are compiled into immutable tuples of
+    ``(handler, flags, scope)`` whenever a listener is added or removed. Dispatching only
+    iterates over such a snapshot, which means that handlers may safely be added or removed
+    from within other handlers or threads while an event is being dispatched.
+
+    Event names containing :py:data:`WILDCARD` segments are pattern subscriptions. They are
+    stored in a prefix trie of segments and resolved once per event name, with the result
+    being cached until the registered patterns change.
+
+    Handlers are stored in insertion-ordered dictionaries mapping each handler to its flags,
+    together with an index of the group of each handler. Adding and removing a handler as
+    well as removing a whole group thus only take constant time per handler, no matter how
+    many other handlers are registered.
+    """
+
     def __init__(self, cg):
         self.cg = cg
 
-        self.event_handlers = {}
-        self.handler_flags = {}
-        self.handler_groups: Dict[Any, List[Tuple[str, Callable]]] = {}
+        # Handler dicts map each handler to its flags
+        self.event_handlers: Dict[str, Dict[Callable, int]] = {}
+        self.scoped_handlers: Dict[str, Dict[Hashable, Dict[Callable, int]]] = {}
+        # Groups map to dicts used as ordered sets of (event, scope, handler) keys
+        self.handler_groups: Dict[Any, Dict[Tuple[str, Hashable, Callable], None]] = {}
+        self._handler_group: Dict[Tuple[str, Hashable, Callable], Any] = {}
         self.ignored = {}
 
+        # Compiled dispatch lists, only ever replaced and never mutated
+        self._dispatch_global: Dict[str, Tuple[Tuple[Callable, int, Hashable], ...]] = {}
+        self._dispatch_scoped: Dict[Tuple[str, Hashable], Tuple[Tuple[Callable, int, Hashable], ...]] = {}
+        self._dispatch_all: Dict[str, Tuple[Tuple[Callable, int, Hashable], ...]] = {}
+
+        self._pattern_root = _TrieNode()
+        self._pattern_count: int = 0
+        self._pattern_cache: Dict[str, Tuple[Tuple[Callable, int, str, Tuple[str, ...]], ...]] = {}
+
         self.event_list = set()
 
+        # Config options cannot change at runtime, so this only needs to be checked once
+        self.dump_events: bool = self.cg.get_config_option("cg:debug.event.dump_file") != ""
+
+        self.profiler = EventProfiler(self.cg.get_config_option("cg:debug.event.profile"))
+
+        self.journal: Optional["cg.journal.EventJournal"] = None
+
         self.event_lock = threading.RLock()
 
         self.add_event_listener("cg:shutdown", self.handle_shutdown)
 
-    def send_event(self, event: str, data=None) -> None:
+    def send_event(self, event: str, data=None, scope: Hashable = None) -> None:
         """
         Send a event to all registered event handlers.
 
+        If ``scope`` is given, only global handlers and handlers registered for the same
+        scope will be called. Otherwise, the event is broadcast to all handlers.
+
         :param str event: Name of the event to trigger
         :param dict data: Optional context data
+        :param scope: Optional scope to route the event to
         :return: None
         """
 
         if data is None:
             data = {}
 
-        if self.cg.get_config_option("cg:debug.event.dump_file") != "" and event not in self.event_list:
+        journal = self.journal
+        if journal is not None:
+            journal.enter(event, data, scope)
+            try:
+                self._dispatch(event, data, scope)
+            finally:
+                journal.leave()
+        else:
+            self._dispatch(event, data, scope)
+
+    def _dispatch(self, event: str, data, scope: Hashable) -> None:
+        if self.dump_events and event not in self.event_list:
             self.cg.debug(f"Found event {event}")
             self.event_list.add(event)
 
-        if event not in self.event_handlers:
+        if scope is None:
+            handlers = self._dispatch_all.get(event, None)
+            if handlers is None:
+                if event in self._dispatch_global or event in self.scoped_handlers:
+                    handlers = self._compile_broadcast(event)
+                else:
+                    handlers = ()
+        else:
+            handlers = self._dispatch_global.get(event, ()) + self._dispatch_scoped.get((event, scope), ())
+
+        patterns = self._resolve_patterns(event) if self._pattern_count else ()
+
+        if not handlers and not patterns:
             if event not in self.ignored or self.ignored[event] <= MAX_IGNORE:
                 # Prevents spamming logging with repeated unhandled messages
                 self.cg.debug(f"Ignored event of type {event} because there were no handlers registered for this event")
                 self.ignored[event] = self.ignored.get(event, 0) + 1
             return
 
-        for handler in self.event_handlers[event]:
-            flags = self.handler_flags[(event, handler)]
+        if self.profiler.enabled:
+            self._send_event_profiled(event, data, handlers, patterns)
+            return
+
+        for handler, flags, s in handlers:
             try:
                 handler(event, data)  # Call the event handler
             except Exception:
                 if flags & F_RAISE_ERRORS:  # raise_errors parameter
                     raise
-                elif not (flags & F_SILENT):
-                    self.cg.info(f"Ignored error raised by event handler {handler} of event {event}")
-                    self.cg.exception("Error while handling event:")
-                elif flags & F_REMOVE_ONERROR:
-                    self.del_event_listener(event, handler)
+                self._handle_error(event, handler, flags, event, s)
+
+        for handler, flags, pattern, captures in patterns:
+            try:
+                handler(event, data, captures)  # Call the pattern handler
+            except Exception:
+                if flags & F_RAISE_ERRORS:
+                    raise
+                self._handle_error(event, handler, flags, pattern, None)
+
+    def _send_event_profiled(self, event: str, data, handlers, patterns) -> None:
+        # Same as the loops in send_event(), but with timing
+        profiler = self.profiler
+        start = time.perf_counter()
+        try:
+            for handler, flags, s in handlers:
+                t = time.perf_counter()
+                try:
+                    handler(event, data)
+                except Exception:
+                    if flags & F_RAISE_ERRORS:
+                        raise
+                    self._handle_error(event, handler, flags, event, s)
+                finally:
+                    profiler.record_handler(event, handler, time.perf_counter()-t)
+
+            for handler, flags, pattern, captures in patterns:
+                t = time.perf_counter()
+                try:
+                    handler(event, data, captures)
+                except Exception:
+                    if flags & F_RAISE_ERRORS:
+                        raise
+                    self._handle_error(event, handler, flags, pattern, None)
+                finally:
+                    profiler.record_handler(event, handler, time.perf_counter()-t)
+        finally:
+            profiler.record_dispatch(event, len(handlers)+len(patterns), time.perf_counter()-start)
+
+    def _handle_error(self, event: str, handler: Callable, flags: int, registered: str, scope: Hashable):
+        # Must be called from within an except block
+        if not (flags & F_SILENT):
+            self.cg.info(f"Ignored error raised by event handler {handler} of event {event}")
+            self.cg.exception("Error while handling event:")
+        elif flags & F_REMOVE_ONERROR:
+            self.del_event_listener(registered, handler, scope)
+
+    def has_listeners(self, event: str, scope: Hashable = None) -> bool:
+        """
+        Checks whether sending the given event would reach any handler.
+
+        This is very cheap and can be used to avoid building expensive event data for
+        events nobody is interested in.
+
+        :param str event: Name of the event
+        :param scope: Optional scope the event would be sent with
+        :return: bool
+        """
+        if event in self._dispatch_global:
+            return True
+        elif scope is None and event in self.scoped_handlers:
+            return True
+        elif scope is not None and (event, scope) in self._dispatch_scoped:
+            return True
+        return bool(self._pattern_count and self._resolve_patterns(event))
+
+    def add_event_listener(self, event: str, func: Callable[[str, Dict], None], flags=0, group=None,
+                           scope: Hashable = None):
+        """
+        Registers an event handler.
 
-    def add_event_listener(self, event: str, func: Callable[[str, Dict], None], flags=0, group=None):
+        :param str event: Name of the event to listen for
+        :param func: Handler to be called with the event name and data
+        :param int flags: Bitmask of ``F_*`` flags
+        :param group: Optional group used to remove many handlers at once via :py:meth:`del_group()`
+        :param scope: Optional scope, if given the handler only receives events of this scope
+        :return: None
+
+        If the event name contains :py:data:`WILDCARD` segments, the handler is registered
+        as a pattern handler and will receive all events matching the pattern. Pattern
+        handlers are called with a third argument, a tuple containing the segments matched
+        by each wildcard. Surrounding square brackets are stripped from these segments.
+        Pattern handlers cannot be scoped.
+        """
         if not isinstance(event, str):
             raise TypeError("Event types must always be strings")
 
+        if is_pattern(event):
+            if scope is not None:
+                raise ValueError("Pattern handlers cannot be scoped")
+
+            with self.event_lock:
+                node = self._pattern_root
+                for segment in split_event(event):
+                    node = node.children.setdefault(segment, _TrieNode())
+                if func not in node.handlers:
+                    self._pattern_count += 1
+                node.handlers[func] = flags
+                node.pattern = event
+
+                self._set_group((event, None, func), group)
+                self._pattern_cache = {}
+            return
+
         # Ensure that listeners are added sequentially
         with self.event_lock:
-            if not (flags & F_SILENT)\
-                    and self.cg.get_config_option("cg:debug.event.dump_file") != ""\
-                    and event not in self.event_list:
+            if not (flags & F_SILENT) and self.dump_events and event not in self.event_list:
                 self.cg.debug(f"Found event listener {event}")
                 self.event_list.add(event)
 
-            if event not in self.event_handlers:
-                self.event_handlers[event] = []
-            if group not in self.handler_groups:
-                self.handler_groups[group] = []
-            self.handler_groups[group].append((event, func))
-            self.handler_flags[(event, func)] = flags
-            self.event_handlers[event].append(func)
+            if scope is None:
+                handlers = self.event_handlers.setdefault(event, {})
+            else:
+                handlers = self.scoped_handlers.setdefault(event, {}).setdefault(scope, {})
+            handlers[func] = flags
 
-    def del_event_listener(self, event: str, func: Callable):
-        if event not in self.event_handlers:
-            raise NameError(f"No handlers exist for event {event}")
+            self._set_group((event, scope, func), group)
+            self._compile(event, scope)
 
+    def del_event_listener(self, event: str, func: Callable, scope: Hashable = None):
         with self.event_lock:
-            if func in self.event_handlers[event]:
-                del self.event_handlers[event][self.event_handlers[event].index(func)]
-                del self.handler_flags[(event, func)]
-            else:
-                raise NameError(f"This handler is not registered for event {event}")
-
-            if not self.event_handlers[event]:
-                # Clean up empty event handlers to prevent memory leaks
-                del self.event_handlers[event]
+            self._remove_listener(event, func, scope)
+            self._discard_group((event, scope, func))
+            if not is_pattern(event):
+                self._compile(event, scope)
 
     def del_group(self, group):
         with self.event_lock:
             if group not in self.handler_groups:
                 return  # Prevent errors if the group did not exist
 
-            for event, func in self.handler_groups[group]:
-                self.del_event_listener(event, func)
+            changed = set()
+            for event, scope, func in self.handler_groups.pop(group):
+                del self._handler_group[(event, scope, func)]
+                self._remove_listener(event, func, scope)
+                if not is_pattern(event):
+                    changed.add((event, scope))
+
+            # Only recompile each affected event once
+            for event, scope in changed:
+                self._compile(event, scope)
+
+    def _set_group(self, key: Tuple[str, Hashable, Callable], group):
+        # Re-registering a handler moves it to the new group
+        if key in self._handler_group:
+            if self._handler_group[key] == group:
+                return
+            self._discard_group(key)
+
+        self._handler_group[key] = group
+        self.handler_groups.setdefault(group, {})[key] = None
+
+    def _discard_group(self, key: Tuple[str, Hashable, Callable]):
+        group = self._handler_group.pop(key)
+        members = self.handler_groups[group]
+        del members[key]
+        if not members:
             del self.handler_groups[group]
 
+    def _remove_listener(self, event: str, func: Callable, scope: Hashable):
+        """
+        Removes a single handler without recompiling the dispatch lists.
+
+        Group membership is not touched, this is the responsibility of the caller.
+        """
+        if is_pattern(event):
+            self._remove_pattern(event, func)
+            return
+
+        if scope is None:
+            if event not in self.event_handlers:
+                raise NameError(f"No handlers exist for event {event}")
+            handlers = self.event_handlers[event]
+        else:
+            if scope not in self.scoped_handlers.get(event, {}):
+                raise NameError(f"No handlers exist for event {event} in scope {scope}")
+            handlers = self.scoped_handlers[event][scope]
+
+        if func in handlers:
+            del handlers[func]
+        else:
+            raise NameError(f"This handler is not registered for event {event}")
+
+        # Clean up empty event handlers to prevent memory leaks
+        if scope is None:
+            if not handlers:
+                del self.event_handlers[event]
+        elif not handlers:
+            del self.scoped_handlers[event][scope]
+            if not self.scoped_handlers[event]:
+                del self.scoped_handlers[event]
+
+    def _remove_pattern(self, pattern: str, func: Callable):
+        path = [self._pattern_root]
+        segments = split_event(pattern)
+        for segment in segments:
+            if segment not in path[-1].children:
+                raise NameError(f"No handlers exist for pattern {pattern}")
+            path.append(path[-1].children[segment])
+
+        if func not in path[-1].handlers:
+            raise NameError(f"This handler is not registered for pattern {pattern}")
+        del path[-1].handlers[func]
+
+        # Prune empty branches of the trie
+        for i in range(len(segments), 0, -1):
+            node = path[i]
+            if node.handlers or node.children:
+                break
+            del path[i-1].children[segments[i-1]]
+
+        self._pattern_count -= 1
+        self._pattern_cache = {}
+
+    def _resolve_patterns(self, event: str) -> Tuple[Tuple[Callable, int, str, Tuple[str, ...]], ...]:
+        """
+        Finds all pattern handlers matching the given event name.
+
+        Results are cached per event name until the registered patterns change.
+
+        :param str event: Concrete event name
+        :return: Tuple of ``(handler, flags, pattern, captures)``
+        """
+        out = self._pattern_cache.get(event, None)
+        if out is not None:
+            return out
+
+        segments = split_event(event)
+        with self.event_lock:
+            out = []
+            # Depth-first walk of the trie, following both literal and wildcard children
+            todo = [(self._pattern_root, 0, ())]
+            while todo:
+                node, i, captures = todo.pop()
+                if i == len(segments):
+                    for handler, flags in node.handlers.items():
+                        out.append((handler, flags, node.pattern, captures))
+                    continue
+
+                segment = segments[i]
+                if WILDCARD in node.children:
+                    capture = segment[1:-1] if segment.startswith("[") and segment.endswith("]") else segment
+                    todo.append((node.children[WILDCARD], i+1, captures+(capture,)))
+                if segment in node.children:
+                    todo.append((node.children[segment], i+1, captures))
+            out = tuple(out)
+
+            if len(self._pattern_cache) >= MAX_PATTERN_CACHE:
+                self._pattern_cache = {}
+            self._pattern_cache[event] = out
+        return out
+
+    def _compile(self, event: str, scope: Hashable):
+        """
+        Rebuilds the dispatch lists of the given event after a registration change.
+
+        Must be called with :py:attr:`event_lock` held.
+        """
+        if scope is None:
+            compiled = tuple((h, flags, None) for h, flags in self.event_handlers.get(event, {}).items())
+            if compiled:
+                self._dispatch_global[event] = compiled
+            else:
+                self._dispatch_global.pop(event, None)
+        else:
+            compiled = tuple((h, flags, scope)
+                             for h, flags in self.scoped_handlers.get(event, {}).get(scope, {}).items())
+            if compiled:
+                self._dispatch_scoped[(event, scope)] = compiled
+            else:
+                self._dispatch_scoped.pop((event, scope), None)
+
+        # Broadcast list is rebuilt lazily, since most scoped events are never broadcast
+        self._dispatch_all.pop(event, None)
+
+    def _compile_broadcast(self, event: str) -> Tuple[Tuple[Callable, int, Hashable], ...]:
+        with self.event_lock:
+            # Global handlers first, then all scoped handlers
+            compiled = self._dispatch_global.get(event, ())
+            for s in self.scoped_handlers.get(event, {}):
+                compiled += self._dispatch_scoped[(event, s)]
+            if compiled:
+                self._dispatch_all[event] = compiled
+            return compiled
+
+    def start_journal(self, fname: str) -> None:
+        """
+        Starts recording all sent events to the given journal file.
+
+        Any journal that is already being recorded is closed first.
+
+        .. seealso::
+           See :py:class:`cg.journal.EventJournal` for the format of the journal.
+
+        :param str fname: Path of the journal file, will be overwritten if it exists
+        :return: None
+        """
+        from . import journal
+
+        self.stop_journal()
+        self.journal = journal.EventJournal(fname)
+        self.cg.info(f"Recording event journal to {fname}")
+
+    def stop_journal(self) -> None:
+        """
+        Stops recording the current event journal, if any.
+
+        :return: None
+        """
+        journal, self.journal = self.journal, None
+        if journal is not None:
+            journal.close()
+            self.cg.info(f"Stopped event journal {journal.fname} after {journal.entries} events")
+
     def handle_shutdown(self, event: str, data: dict):
-        if self.cg.get_config_option("cg:debug.event.dump_file") != "":
+        self.stop_journal()
+
+        if self.dump_events:
             with open(
                     os.path.join(self.cg.get_instance_path(),
                                  self.cg.get_config_option("cg:debug.event.dump_file")
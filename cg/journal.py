@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  journal.py
+#
+#  Copyright 2020 contributors of cardgame
+#
+#  This file is part of cardgame.
+#
+#  cardgame is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  cardgame is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with cardgame.  If not, see <http://www.gnu.org/licenses/>.
+#
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Hashable, Iterator
+
+import msgpack
+
+EXT_UUID = 1
+"""
+MsgPack extension type code used for :py:class:`uuid.UUID` objects in journals.
+"""
+
+INPUT_DEPTH = -1
+"""
+Depth of entries recorded via :py:meth:`EventJournal.record()`\\ .
+
+These entries are inputs from outside of the event system, like received packets, and are
+the only entries needed to replay a journal.
+"""
+
+
+@dataclass
+class JournalEntry:
+    time: float
+    depth: int
+    event: str
+    scope: Hashable
+    data: Any
+
+
+def _encode(obj):
+    # Called by msgpack for every object it cannot serialize natively
+    if isinstance(obj, uuid.UUID):
+        return msgpack.ExtType(EXT_UUID, obj.bytes)
+    elif isinstance(obj, (set, frozenset)):
+        return list(obj)
+    # Everything else (lobbies, peers, sockets, ...) cannot be replayed anyway
+    return None
+
+
+def _decode(code, data):
+    if code == EXT_UUID:
+        return uuid.UUID(bytes=data)
+    return msgpack.ExtType(code, data)
+
+
+class EventJournal(object):
+    """
+    Binary journal of all events sent through an :py:class:`~cg.event.EventManager`\\ .
+
+    Each event is written as a msgpack array of ``[time, depth, event, scope, data]`` to a
+    stream of concatenated msgpack objects. ``depth`` is the number of events that were being
+    dispatched by the same thread when the event was sent, meaning that events with a depth
+    of ``0`` were caused by something external like a packet or timer, while all other events
+    are consequences of other events.
+
+    :py:class:`uuid.UUID` objects are stored as a msgpack extension type and restored when
+    reading. Objects that cannot be serialized, like lobbies or network peers, are replaced
+    with ``None``\\ .
+
+    Inputs that are not events, like received packets, can be recorded in the same stream via
+    :py:meth:`record()`\\ . They have a depth of :py:data:`INPUT_DEPTH` and use ``None`` as
+    their scope.
+
+    The journal is buffered and only guaranteed to be complete after :py:meth:`close()`
+    has been called. A truncated journal can still be read up to the last complete entry.
+    """
+
+    def __init__(self, fname: str):
+        self.fname = fname
+
+        self.f = open(fname, "wb")
+        self.packer = msgpack.Packer(default=_encode, use_bin_type=True)
+
+        self.entries: int = 0
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def enter(self, event: str, data, scope: Hashable) -> None:
+        """
+        Records an event that is about to be dispatched.
+
+        Must be followed by a call to :py:meth:`leave()` once the dispatch has finished.
+        """
+        depth = getattr(self._local, "depth", 0)
+        self._local.depth = depth+1
+
+        self._write([time.time(), depth, event, scope, data])
+
+    def leave(self) -> None:
+        self._local.depth -= 1
+
+    def record(self, kind: str, data) -> None:
+        """
+        Records an input that is not an event, e.g. a packet received from a client.
+
+        :param str kind: Type of the input, e.g. ``cg:journal.packet``
+        :param data: Data of the input
+        :return: None
+        """
+        self._write([time.time(), INPUT_DEPTH, kind, None, data])
+
+    def _write(self, entry: list) -> None:
+        # The packer is shared between all threads and keeps an internal buffer
+        with self._lock:
+            try:
+                packed = self.packer.pack(entry)
+            except Exception:
+                # Unpackable payloads (e.g. integers that are too large) are not worth a crash
+                self.packer.reset()
+                packed = self.packer.pack(entry[:-1]+[None])
+
+            if not self.f.closed:
+                self.f.write(packed)
+                self.entries += 1
+
+    def close(self) -> None:
+        with self._lock:
+            self.f.close()
+
+
+def read_journal(fname: str) -> Iterator[JournalEntry]:
+    """
+    Reads all entries of a journal written by :py:class:`EventJournal`\\ .
+
+    Reading stops silently at a truncated entry, e.g. if the server crashed while writing.
+
+    :param str fname: Path of the journal file
+    :return: Iterator of journal entries, in the order they were recorded
+    """
+    with open(fname, "rb") as f:
+        unpacker = msgpack.Unpacker(f, ext_hook=_decode, raw=False, strict_map_key=False)
+        for t, depth, event, scope, data in unpacker:
+            yield JournalEntry(t, depth, event, scope, data)
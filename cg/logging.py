@@ -83,6 +83,7 @@ LOGGER_BLACKLIST = [
     "urllib3.connection",
     "urllib3.util.retry",
     "requests",
+    "concurrent.futures",
     "past.translation",
     "future_stdlib",
     "chardet.universaldetector",
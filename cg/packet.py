@@ -20,7 +20,8 @@
 #  You should have received a copy of the GNU General Public License
 #  along with cardgame.  If not, see <http://www.gnu.org/licenses/>.
 #
-from typing import List, Union, Dict, Any, Optional
+import uuid
+from typing import List, Union, Dict, Any, Optional, Tuple, FrozenSet, Type
 
 import peng3dnet
 from peng3dnet.constants import SIDE_CLIENT, SIDE_SERVER, CONNTYPE_CLASSIC
@@ -33,12 +34,41 @@ MAX_IGNORE_SEND = 10
 
 
 class CGPacket(peng3dnet.net.packet.SmartPacket):
+    """
+    Base class of all packets used by cardgame.
+
+    The ``state``\ , ``mode``\ , ``conntype``\ , ``required_keys``\ , ``allowed_keys`` and
+    ``key_types`` attributes of each packet class are compiled into frozensets and a list of
+    type checks once when the packet is registered. Validating a packet thus only takes a few
+    set operations, regardless of how many keys are allowed.
+    """
     _ignorecount_recv: int = 0
     _ignorecount_send: int = 0
 
     required_keys: List[str] = []
     allowed_keys: List[str] = []
 
+    key_types: Dict[str, Union[Type, Tuple[Type, ...]]] = {}
+    """
+    Optional types of the values of keys.
+
+    If a key is present in a received packet, its value must be an instance of the given
+    type or tuple of types. Packets with values of other types are treated as invalid and
+    never reach the :py:meth:`receive()` method.
+    """
+
+    uuid_keys: List[str] = []
+    """
+    Keys whose values are :term:`UUIDs <UUID>` or lists of UUIDs.
+
+    Nested keys are separated by dots, ``*`` matches every item of a list, e.g. ``transfers.*.card_id``\ .
+
+    If the :py:data:`~cg.constants.FEATURE_UUID_BIN` feature was negotiated, these values are
+    sent as 16 byte binary values instead of hex strings. Received binary values are always
+    converted into :py:class:`uuid.UUID` objects, which :py:func:`cg.util.uuidify()` accepts
+    as well.
+    """
+
     conntype: str = CONNTYPE_CLASSIC
     mode: Optional[int] = MODE_CG
     side = None
@@ -55,47 +85,54 @@ class CGPacket(peng3dnet.net.packet.SmartPacket):
 
         self.cg = c
 
-    def _receive(self, msg: Dict, cid: Optional[int] = None):
-        d = {
-            "msg": msg,
-            "cid": cid,
-            "type": self.reg.getName(self),
-        }
+        self._trace_events: Dict[Tuple[str, str], Tuple[str, ...]] = {}
+
+        # Compile the criteria once, since they are checked for every single packet
+        self._states = self.compile_criteria(self.state)
+        self._modes = self.compile_criteria(self.mode)
+        self._conntypes = self.compile_criteria(self.conntype)
+        self._required_keys: FrozenSet[str] = frozenset(self.required_keys)
+        self._allowed_keys: Optional[FrozenSet[str]] = frozenset(self.allowed_keys) or None
+        self._key_types: Tuple[Tuple[str, Union[Type, Tuple[Type, ...]]], ...] = tuple(self.key_types.items())
+        self._uuid_keys: Tuple[Tuple[str, ...], ...] = tuple(tuple(k.split(".")) for k in self.uuid_keys)
 
+    def _receive(self, msg: Dict, cid: Optional[int] = None):
         if cid is None and (self.side is None or self.side == SIDE_CLIENT):
             # On the Client
-            if not self.check(self.peer.remote_state, self.state):
+            if not self.check_compiled(self.peer.remote_state, self._states):
                 return self.invalid_recv("incorrect SmartPacket remote state", msg, cid)
-            if not self.check(self.peer.mode, self.mode):
+            if not self.check_compiled(self.peer.mode, self._modes):
                 return self.invalid_recv("incorrect SmartPacket mode", msg, cid)
-            if not self.check(self.peer.conntype, self.conntype):
+            if not self.check_compiled(self.peer.conntype, self._conntypes):
                 return self.invalid_recv("incorrect SmartPacket conntype", msg, cid)
-            if not self.check_keys(msg, self.required_keys, self.allowed_keys):
+            if not self.check_compiled_keys(msg):
                 return self.invalid_recv("incorrect SmartPacket allowed/required keys", msg, cid)
+            if self._uuid_keys:
+                msg = self.unpack_uuids(msg)
+            if not self.check_key_types(msg):
+                return self.invalid_recv("incorrect SmartPacket key types", msg, cid)
 
-            self.cg.send_event("cg:network.packet.recv", d)
-            self.cg.send_event(f"cg:network.packet.[{self.reg.getName(self)}].recv", d)
-            self.cg.send_event("cg:network.packet.recv.client", d)
-            self.cg.send_event(f"cg:network.packet.[{self.reg.getName(self)}].recv.client", d)
+            self._trace("recv", "client", msg, cid)
 
             self.receive(msg, cid)
 
             return True
         elif cid is not None and (self.side is None or self.side == SIDE_SERVER):
             # On the server
-            if not self.check(self.peer.clients[cid].state, self.state):
+            if not self.check_compiled(self.peer.clients[cid].state, self._states):
                 return self.invalid_recv("incorrect SmartPacket state", msg, cid)
-            if not self.check(self.peer.clients[cid].mode, self.mode):
+            if not self.check_compiled(self.peer.clients[cid].mode, self._modes):
                 return self.invalid_recv("incorrect SmartPacket mode", msg, cid)
-            if not self.check(self.peer.clients[cid].conntype, self.conntype):
+            if not self.check_compiled(self.peer.clients[cid].conntype, self._conntypes):
                 return self.invalid_recv("incorrect SmartPacket conntype", msg, cid)
-            if not self.check_keys(msg, self.required_keys, self.allowed_keys):
+            if not self.check_compiled_keys(msg):
                 return self.invalid_recv("incorrect SmartPacket allowed/required keys", msg, cid)
+            if self._uuid_keys:
+                msg = self.unpack_uuids(msg)
+            if not self.check_key_types(msg):
+                return self.invalid_recv("incorrect SmartPacket key types", msg, cid)
 
-            self.cg.send_event("cg:network.packet.recv", d)
-            self.cg.send_event(f"cg:network.packet.[{self.reg.getName(self)}].recv", d)
-            self.cg.send_event("cg:network.packet.recv.server", d)
-            self.cg.send_event(f"cg:network.packet.[{self.reg.getName(self)}].recv.server", d)
+            self._trace("recv", "server", msg, cid)
 
             self.receive(msg, cid)
 
@@ -104,42 +141,30 @@ class CGPacket(peng3dnet.net.packet.SmartPacket):
             return self.invalid_recv("unknown side", msg, cid)
 
     def _send(self, msg: Dict, cid: Optional[int] = None):
-        d = {
-            "msg": msg,
-            "cid": cid,
-            "type": self.reg.getName(self),
-        }
-
         if cid is None and (self.side is None or self.side == SIDE_SERVER):
             # On the Client
-            if not self.check(self.peer.remote_state, self.state):
+            if not self.check_compiled(self.peer.remote_state, self._states):
                 return self.invalid_send("incorrect SmartPacket remote state", msg, cid)
-            if not self.check(self.peer.mode, self.mode):
+            if not self.check_compiled(self.peer.mode, self._modes):
                 return self.invalid_send("incorrect SmartPacket mode", msg, cid)
-            if not self.check(self.peer.conntype, self.conntype):
+            if not self.check_compiled(self.peer.conntype, self._conntypes):
                 return self.invalid_send("incorrect SmartPacket conntype", msg, cid)
 
-            self.cg.send_event("cg:network.packet.send", d)
-            self.cg.send_event(f"cg:network.packet.[{self.reg.getName(self)}].send", d)
-            self.cg.send_event("cg:network.packet.send.client", d)
-            self.cg.send_event(f"cg:network.packet.[{self.reg.getName(self)}].send.client", d)
+            self._trace("send", "client", msg, cid)
 
             self.send(msg, cid)
 
             return True
         elif cid is not None and (self.side is None or self.side == SIDE_CLIENT):
             # On the server
-            if not self.check(self.peer.clients[cid].state, self.state):
+            if not self.check_compiled(self.peer.clients[cid].state, self._states):
                 return self.invalid_send("incorrect SmartPacket state", msg, cid)
-            if not self.check(self.peer.clients[cid].mode, self.mode):
+            if not self.check_compiled(self.peer.clients[cid].mode, self._modes):
                 return self.invalid_send("incorrect SmartPacket mode", msg, cid)
-            if not self.check(self.peer.clients[cid].conntype, self.conntype):
+            if not self.check_compiled(self.peer.clients[cid].conntype, self._conntypes):
                 return self.invalid_send("incorrect SmartPacket conntype", msg, cid)
 
-            self.cg.send_event("cg:network.packet.send", d)
-            self.cg.send_event(f"cg:network.packet.[{self.reg.getName(self)}].send", d)
-            self.cg.send_event("cg:network.packet.send.server", d)
-            self.cg.send_event(f"cg:network.packet.[{self.reg.getName(self)}].send.server", d)
+            self._trace("send", "server", msg, cid)
 
             self.send(msg, cid)
 
@@ -147,6 +172,69 @@ class CGPacket(peng3dnet.net.packet.SmartPacket):
         else:
             return self.invalid_send("unknown side", msg, cid)
 
+    def pack_uuids(self, msg: Dict) -> Dict:
+        """
+        Converts all UUIDs listed in :py:attr:`uuid_keys` into their binary representation.
+
+        The given message is not modified, since it may be shared between multiple recipients.
+        Only the containers on the way to a converted value are copied.
+
+        :param dict msg: Packet payload
+        :return: Packet payload with binary UUIDs
+        """
+        for path in self._uuid_keys:
+            msg = _convert_path(msg, path, _uuid_to_bytes)
+        return msg
+
+    def unpack_uuids(self, msg: Dict) -> Dict:
+        """
+        Converts all binary UUIDs listed in :py:attr:`uuid_keys` into :py:class:`uuid.UUID` objects.
+
+        Values that are not binary, e.g. from peers that did not negotiate the feature, are left untouched.
+
+        :param dict msg: Received packet payload
+        :return: Packet payload with UUID objects
+        """
+        for path in self._uuid_keys:
+            msg = _convert_path(msg, path, _bytes_to_uuid)
+        return msg
+
+    def _trace(self, direction: str, side: str, msg: Dict, cid: Optional[int]):
+        """
+        Sends the packet tracing events for a received or sent packet.
+
+        Since these events are sent for every single packet but rarely listened to, they
+        are only created and sent if there is at least one listener.
+
+        :param str direction: Either ``recv`` or ``send``
+        :param str side: Either ``client`` or ``server``
+        :param dict msg: Packet payload
+        :param cid: Client ID, if on the server
+        :return: None
+        """
+        key = (direction, side)
+        events = self._trace_events.get(key, None)
+        if events is None:
+            name = self.reg.getName(self)
+            events = (
+                f"cg:network.packet.{direction}",
+                f"cg:network.packet.[{name}].{direction}",
+                f"cg:network.packet.{direction}.{side}",
+                f"cg:network.packet.[{name}].{direction}.{side}",
+            )
+            self._trace_events[key] = events
+
+        d = None
+        for event in events:
+            if self.cg.event_manager.has_listeners(event):
+                if d is None:
+                    d = {
+                        "msg": msg,
+                        "cid": cid,
+                        "type": self.reg.getName(self),
+                    }
+                self.cg.send_event(event, d)
+
     def invalid_recv(self, msg: str, data: Dict, cid: Optional[int] = None):
         d = {
             "msg": msg,
@@ -226,6 +314,61 @@ class CGPacket(peng3dnet.net.packet.SmartPacket):
 
         return True
 
+    def check_compiled_keys(self, d: dict) -> bool:
+        """
+        Checks if all required keys and only allowed keys are present.
+
+        Same as :py:meth:`check_keys()`\ , but uses the keys compiled at registration.
+
+        :param dict d: Packet payload
+        :return: bool
+        """
+        if not isinstance(d, dict):
+            return False
+
+        keys = d.keys()
+        return keys >= self._required_keys and (self._allowed_keys is None or keys <= self._allowed_keys)
+
+    def check_key_types(self, d: dict) -> bool:
+        """
+        Checks if the values of all keys listed in :py:attr:`key_types` have the correct type.
+
+        Keys that are not present are ignored, use ``required_keys`` to require them.
+
+        :param dict d: Packet payload
+        :return: bool
+        """
+        for k, t in self._key_types:
+            if k in d and not isinstance(d[k], t):
+                return False
+        return True
+
+    @staticmethod
+    def compile_criteria(allowed: Union[Any, List[Any]]) -> Optional[FrozenSet[Any]]:
+        """
+        Compiles a criteria as accepted by :py:meth:`check()` into a frozenset.
+
+        :param allowed: Allowed value(s)
+        :return: Frozenset of allowed values or ``None`` if any value is allowed
+        """
+        if isinstance(allowed, list):
+            return frozenset(allowed)
+        elif allowed is None:
+            return None
+        else:
+            return frozenset([allowed])
+
+    @staticmethod
+    def check_compiled(current: Any, allowed: Optional[FrozenSet[Any]]) -> bool:
+        """
+        Same as :py:meth:`check()`\ , but for criteria compiled via :py:meth:`compile_criteria()`\ .
+
+        :param current: Current value
+        :param allowed: Compiled allowed values
+        :return: bool
+        """
+        return allowed is None or current in allowed
+
     @staticmethod
     def check(current: Any, allowed: Union[Any, List[Any]]) -> bool:
         """
@@ -242,3 +385,47 @@ class CGPacket(peng3dnet.net.packet.SmartPacket):
             return current in allowed
         else:
             return allowed is None or current == allowed
+
+
+def _uuid_to_bytes(value):
+    if isinstance(value, str) and len(value) == 32:
+        try:
+            return bytes.fromhex(value)
+        except ValueError:
+            # Not a UUID after all, e.g. a username
+            return value
+    elif isinstance(value, uuid.UUID):
+        return value.bytes
+    return value
+
+
+def _bytes_to_uuid(value):
+    if isinstance(value, bytes) and len(value) == 16:
+        return cg.util.uuid_from_bytes(value)
+    return value
+
+
+def _convert_path(obj, path: Tuple[str, ...], conv):
+    # Returns a converted copy of obj, or obj itself if nothing changed
+    if not path:
+        if isinstance(obj, list):
+            new = [conv(v) for v in obj]
+        else:
+            return conv(obj)
+    elif path[0] == "*":
+        if not isinstance(obj, list):
+            return obj
+        new = [_convert_path(v, path[1:], conv) for v in obj]
+    else:
+        if not isinstance(obj, dict) or path[0] not in obj:
+            return obj
+        value = _convert_path(obj[path[0]], path[1:], conv)
+        if value is obj[path[0]]:
+            return obj
+        new = dict(obj)
+        new[path[0]] = value
+        return new
+
+    if all(a is b for a, b in zip(new, obj)):
+        return obj
+    return new
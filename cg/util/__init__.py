@@ -21,8 +21,11 @@
 #  along with cardgame.  If not, see <http://www.gnu.org/licenses/>.
 #
 
+import hashlib
+import json
 import sys
 import uuid
+import weakref
 from math import floor
 from typing import Union, Dict, Tuple, List
 
@@ -32,13 +35,32 @@ from . import time
 from . import itch
 
 
-def uuidify(uuid_in: Union[str, uuid.UUID, List[Union[str, uuid.UUID]]]):
+# Maps the binary representation to UUID objects that are still in use
+_uuid_intern: "weakref.WeakValueDictionary[bytes, uuid.UUID]" = weakref.WeakValueDictionary()
+
+
+def uuid_from_bytes(data: bytes) -> uuid.UUID:
+    """
+    Converts the 16 byte binary representation of a UUID into a :py:class:`uuid.UUID` object.
+
+    As long as a UUID is still referenced somewhere, the same object is returned for the
+    same bytes instead of parsing them again.
+    """
+    u = _uuid_intern.get(data, None)
+    if u is None:
+        u = _uuid_intern[data] = uuid.UUID(bytes=data)
+    return u
+
+
+def uuidify(uuid_in: Union[str, bytes, uuid.UUID, List[Union[str, bytes, uuid.UUID]]]):
     if isinstance(uuid_in, list):
         return list([uuidify(u) for u in uuid_in])
     elif isinstance(uuid_in, str):
         return uuid.UUID(uuid_in)
     elif isinstance(uuid_in, uuid.UUID):
         return uuid_in
+    elif isinstance(uuid_in, bytes):
+        return uuid_from_bytes(uuid_in)
     else:
         raise TypeError(f"Unsupported UUID representation of type {type(uuid_in)}")
 
@@ -104,6 +126,21 @@ def check_requirements(name: str, value: Union[float, bool, str], gamerules: Dic
     return True
 
 
+def hash_validators(validators: Dict[str, Dict]) -> str:
+    """
+    Returns a hash identifying the given gamerule validators.
+
+    The hash only depends on the content of the validators, not on the order of any keys.
+    It is used by clients as the key of their validator cache.
+
+    :param validators: Dictionary mapping gamerule names to their validators
+    :return: SHA-256 hex digest
+    """
+    # Always the stdlib json, since the hash must be identical on server and client
+    data = json.dumps(validators, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
 def print_version_information(cg, version):
     cg.info(f"Version: {version.SEMVER} ({version.FLAVOR})")
     cg.info(f"Release Channel: {cg.channel}")
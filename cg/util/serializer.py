@@ -35,7 +35,7 @@ class Serializer(object):
         return self.module.dump(data, fname)
 
     def dumps(self, data):
-        return self.module.dump(data)
+        return self.module.dumps(data)
 
 
 class JSONSerializer(Serializer):
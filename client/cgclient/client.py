@@ -21,10 +21,11 @@
 #  along with cardgame.  If not, see <http://www.gnu.org/licenses/>.
 #
 import os
+import re
 import threading
 import time
 import uuid
-from typing import Dict, Optional, Type, List
+from typing import Dict, Optional, Type, List, FrozenSet
 
 import peng3dnet
 import pyglet
@@ -34,7 +35,7 @@ import cg
 import cgclient
 import cgclient.gui
 
-from cg.constants import STATE_AUTH, MODE_CG, STATE_VERSIONCHECK
+from cg.constants import STATE_AUTH, MODE_CG, STATE_VERSIONCHECK, FEATURE_UUID_BIN, SUPPORTED_FEATURES
 from cg.util.serializer import json
 
 
@@ -46,9 +47,21 @@ class CGClient(peng3dnet.net.Client):
         self.cg = c
         self.cgclient = cgc
 
+        # Protocol features negotiated with the server
+        self.features: FrozenSet[str] = frozenset()
+
+    def send_message(self, ptype, data, cid=None):
+        if FEATURE_UUID_BIN in self.features:
+            packet = self.registry.getObj(ptype)
+            if getattr(packet, "uuid_keys", None):
+                data = packet.pack_uuids(data)
+
+        super().send_message(ptype, data, cid)
+
     def on_handshake_complete(self):
         super().on_handshake_complete()
 
+        self.features = frozenset()
         self.remote_state = STATE_VERSIONCHECK
         self.mode = MODE_CG
 
@@ -67,6 +80,7 @@ class CGClient(peng3dnet.net.Client):
             "protoversion": cgclient.version.PROTO_VERSION,
             "semver": cgclient.version.SEMVER,
             "flavor": cgclient.version.FLAVOR,
+            "features": sorted(SUPPORTED_FEATURES),
         })
 
     def on_close(self, reason=None):
@@ -120,6 +134,9 @@ class Client(object):
 
         self.settings = {}
 
+        # Maps validator hashes to gamerule validators, backed by files in the settings directory
+        self.gamerule_validator_cache: Dict[str, Dict[str, Dict]] = {}
+
         self.register_event_handlers()
 
         self.cg.send_event("cg:game.register.do", {
@@ -301,6 +318,64 @@ class Client(object):
         with open(fname, "w") as f:
             json.dump(self.settings, f)
 
+    def load_gamerule_validators(self, h: str) -> Optional[Dict[str, Dict]]:
+        """
+        Returns the cached gamerule validators with the given hash.
+
+        Cache files that do not match their hash, e.g. because they were damaged, are ignored.
+
+        :param h: Hash as returned by :py:func:`cg.util.hash_validators()`
+        :return: Validators or ``None`` if they are not cached
+        """
+        if h in self.gamerule_validator_cache:
+            return self.gamerule_validator_cache[h]
+
+        # The hash is sent by the server and thus must not be used for a path as-is
+        if not re.fullmatch(r"[0-9a-f]{64}", h):
+            self.cg.warn(f"Received invalid gamerule validator hash {h!r}")
+            return None
+
+        fname = os.path.join(self.cg.get_settings_path("gamerule_cache"), f"{h}.json")
+        if not os.path.isfile(fname):
+            return None
+
+        try:
+            with open(fname, "r") as f:
+                validators = json.load(f)
+        except Exception:
+            self.cg.exception(f"Could not load cached gamerule validators {h}:")
+            return None
+
+        if cg.util.hash_validators(validators) != h:
+            self.cg.warn(f"Cached gamerule validators {h} are damaged, ignoring them")
+            return None
+
+        self.gamerule_validator_cache[h] = validators
+        return validators
+
+    def save_gamerule_validators(self, h: str, validators: Dict[str, Dict]):
+        """
+        Stores gamerule validators received from the server in the cache.
+
+        :param h: Hash of the validators as sent by the server
+        :param validators: Validators to store
+        :return: None
+        """
+        if cg.util.hash_validators(validators) != h:
+            self.cg.warn(f"Gamerule validators do not match their hash {h}, not caching them")
+            return
+
+        self.gamerule_validator_cache[h] = validators
+
+        dname = self.cg.get_settings_path("gamerule_cache")
+        try:
+            os.makedirs(dname, exist_ok=True)
+            with open(os.path.join(dname, f"{h}.json"), "w") as f:
+                json.dump(validators, f)
+        except Exception:
+            # Not fatal, the validators will just be requested again next time
+            self.cg.exception(f"Could not save gamerule validators {h} to the cache:")
+
     # Event Handlers
 
     def register_event_handlers(self):
@@ -40,7 +40,8 @@ class Lobby(object):
 
         self.gamerules: Dict[str, Any] = {}
 
-        self.gamerule_validators: Dict[str, Dict] = {}
+        # None until received from the server, a game may also have no gamerules at all
+        self.gamerule_validators: Optional[Dict[str, Dict]] = None
 
     def add_user(self, uid: uuid.UUID, udat: dict):
         if uid in self.users:
@@ -118,6 +118,9 @@ def register_default_packets(reg, peer, cg, add):
     # Transfer a card
     r("cg:game.dk.card.transfer", game_dk.card_transfer.CardTransferPacket)
 
+    # Transfer multiple cards at once
+    r("cg:game.dk.card.transfer_bulk", game_dk.card_transfer_bulk.CardTransferBulkPacket)
+
     # Point out a wrong move
     r("cg:game.dk.complaint", game_dk.complaint.ComplaintPacket)
 
@@ -82,6 +82,13 @@ class AuthPacket(CGPacket):
                 "cg:gui.menu.smain.loginerr.blocked"
             )
             self.cg.client.gui.servermain.d_login_err.activate()
+        elif status == "busy":
+            self.cg.warn("Server is busy, redirecting to login")
+            self.cg.client.gui.servermain.changeSubMenu("login")
+            self.cg.client.gui.servermain.d_login_err.label_main = self.cg.client.gui.peng.tl(
+                "cg:gui.menu.smain.loginerr.busy"
+            )
+            self.cg.client.gui.servermain.d_login_err.activate()
         elif status == "logged_out":
             self.cg.error("logged_out auth status not yet supported")
         else:
@@ -25,6 +25,7 @@ from . import question
 from . import announce
 from . import card_intent
 from . import card_transfer
+from . import card_transfer_bulk
 from . import complaint
 from . import turn
 from . import scoreboard
@@ -36,4 +36,7 @@ class CardIntentPacket(CGPacket):
         "intent",
         "card"
     ]
+    uuid_keys = [
+        "card",
+    ]
     side = SIDE_SERVER
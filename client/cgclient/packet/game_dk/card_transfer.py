@@ -42,6 +42,9 @@ class CardTransferPacket(CGPacket):
         "from_slot",
         "to_slot"
     ]
+    uuid_keys = [
+        "card_id",
+    ]
     side = SIDE_CLIENT
 
     def receive(self, msg, cid=None):
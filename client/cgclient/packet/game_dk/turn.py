@@ -41,6 +41,9 @@ class TurnPacket(CGPacket):
         "rebtn_state",
         "pigbtn_state",
     ]
+    uuid_keys = [
+        "current_player",
+    ]
     side = SIDE_CLIENT
 
     last_trick = -1
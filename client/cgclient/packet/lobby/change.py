@@ -21,6 +21,8 @@
 #  along with cardgame.  If not, see <http://www.gnu.org/licenses/>.
 #
 
+from typing import Dict
+
 from cg.constants import STATE_LOBBY, ROLE_NONE, ROLE_REMOVE
 from cg.packet import CGPacket
 from cg.util import uuidify, check_requirements
@@ -38,6 +40,7 @@ class ChangePacket(CGPacket):
         "game",
         "gamerules",
         "gamerule_validators",
+        "gamerule_validators_hash",
         "supported_bots",
     ]
 
@@ -101,45 +104,21 @@ class ChangePacket(CGPacket):
                 self.cg.send_event("cg:lobby.game.change", {"game": msg["game"]})
 
         if "gamerule_validators" in msg:
-            if self.cg.client.lobby.gamerule_validators == msg["gamerule_validators"]:
-                return
-
-            self.cg.client.lobby.gamerule_validators = msg["gamerule_validators"]
-            # No update, just overwrite it
-            self.cg.send_event("cg:lobby.gameruleval.change", {"validators": msg["gamerule_validators"]})
-
-            c = 0
-            page = -1
-            gamerules = {}
-            s_gamerule = self.cg.client.gui.servermain.s_gamerule
-            for gamerule, grdat in self.cg.client.lobby.gamerule_validators.items():
-                c += 1
-                gamerules[gamerule] = grdat
-                if c % 2 == 0:
-                    page += 1
-
-                    # TODO Fix Memory Leak with containers being
-                    s_gamerule.gamerule_containers[page] = cgclient.gui.servermain.GameRuleContainer(
-                        f"grcontainer{page}", s_gamerule,
-                        self.cg.client.gui.window, self.peer.peng,
-                        s_gamerule.grid.get_cell([0, 1], [12, 4], border=0), None,
-                        page, gamerules
-                    )
-                    s_gamerule.addWidget(s_gamerule.gamerule_containers[page])
-                    gamerules.clear()
-            if c % 2 != 0:
-                page += 1
-
-                s_gamerule.gamerule_containers[page] = cgclient.gui.servermain.GameRuleContainer(
-                    f"grcontainer{page}", s_gamerule,
-                    self.cg.client.gui.window, self.peer.peng,
-                    s_gamerule.grid.get_cell([0, 1], [12, 4], border=0), None,
-                    page, gamerules
-                )
-                s_gamerule.addWidget(s_gamerule.gamerule_containers[page])
-                gamerules.clear()
-
-        if "gamerules" in msg:
+            if "gamerule_validators_hash" in msg:
+                self.cg.client.save_gamerule_validators(msg["gamerule_validators_hash"], msg["gamerule_validators"])
+            self.update_gamerule_validators(msg["gamerule_validators"])
+        elif "gamerule_validators_hash" in msg:
+            validators = self.cg.client.load_gamerule_validators(msg["gamerule_validators_hash"])
+            if validators is not None:
+                self.update_gamerule_validators(validators)
+            else:
+                self.cg.info(f"Gamerule validators {msg['gamerule_validators_hash']} not cached, requesting them")
+                self.cg.client.send_message("cg:lobby.change", {
+                    "gamerule_validators_hash": msg["gamerule_validators_hash"],
+                })
+
+        # The gamerules will be sent again together with the validators if they are missing
+        if "gamerules" in msg and self.cg.client.lobby.gamerule_validators is not None:
             self.cg.client.lobby.gamerules.update(msg["gamerules"])
 
             self.cg.send_event("cg:lobby.gamerules.change", {"gamerules": msg["gamerules"]})
@@ -180,3 +159,42 @@ class ChangePacket(CGPacket):
                 self.cg.client.gui.servermain.s_lobby.c_add_bot.btns[i].label = \
                     self.cg.client.gui.peng.tl(f"cg:gui.menu.smain.lobby.add_bot.label", {"bot_name": bot_name})
                 self.cg.client.gui.servermain.s_lobby.c_add_bot.btns[i].bot_type = f"bot_{bot_type}"
+
+    def update_gamerule_validators(self, validators: Dict[str, Dict]):
+        if self.cg.client.lobby.gamerule_validators == validators:
+            return
+
+        self.cg.client.lobby.gamerule_validators = validators
+        # No update, just overwrite it
+        self.cg.send_event("cg:lobby.gameruleval.change", {"validators": validators})
+
+        c = 0
+        page = -1
+        gamerules = {}
+        s_gamerule = self.cg.client.gui.servermain.s_gamerule
+        for gamerule, grdat in self.cg.client.lobby.gamerule_validators.items():
+            c += 1
+            gamerules[gamerule] = grdat
+            if c % 2 == 0:
+                page += 1
+
+                # TODO Fix Memory Leak with containers being
+                s_gamerule.gamerule_containers[page] = cgclient.gui.servermain.GameRuleContainer(
+                    f"grcontainer{page}", s_gamerule,
+                    self.cg.client.gui.window, self.peer.peng,
+                    s_gamerule.grid.get_cell([0, 1], [12, 4], border=0), None,
+                    page, gamerules
+                )
+                s_gamerule.addWidget(s_gamerule.gamerule_containers[page])
+                gamerules.clear()
+        if c % 2 != 0:
+            page += 1
+
+            s_gamerule.gamerule_containers[page] = cgclient.gui.servermain.GameRuleContainer(
+                f"grcontainer{page}", s_gamerule,
+                self.cg.client.gui.window, self.peer.peng,
+                s_gamerule.grid.get_cell([0, 1], [12, 4], border=0), None,
+                page, gamerules
+            )
+            s_gamerule.addWidget(s_gamerule.gamerule_containers[page])
+            gamerules.clear()
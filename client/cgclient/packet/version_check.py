@@ -25,7 +25,7 @@ import uuid
 
 from peng3dnet import SIDE_SERVER
 
-from cg.constants import STATE_VERSIONCHECK, STATE_AUTH
+from cg.constants import STATE_VERSIONCHECK, STATE_AUTH, SUPPORTED_FEATURES
 from cg.packet import CGPacket
 
 import cgclient.version
@@ -43,12 +43,17 @@ class VersionCheckPacket(CGPacket):
         "semver",
         "flavor",
         "compatible",
+        "features",
     ]
+    key_types = {
+        "features": list,
+    }
 
     def receive(self, msg, cid=None):
         # TODO: check that this works when peng3dnet is updated
         if msg["compatible"]:
             self.cg.info(f"Version check succeeded. Server Version: {msg['semver']} ({msg['protoversion']}, {msg['flavor']})")
+            self.peer.features = SUPPORTED_FEATURES.intersection(msg.get("features", []))
             self.peer.remote_state = STATE_AUTH
             return
 
@@ -26,8 +26,12 @@ DEV_MODE = False
 from . import version
 from . import command
 from . import user
+from . import userstore
 from . import lobby
 from . import game
+from . import scheduler
+from . import hashing
+from . import persistence
 from . import server
 from . import packet
 
@@ -152,7 +152,10 @@ class CommandManager(object):
             import cgserver.command.dev
             self.register_command("dev", cgserver.command.dev.DevCommand(self.cg))
 
-        # TODO: implement more commands, like perf
+        import cgserver.command.perf
+        self.register_command("perf", cgserver.command.perf.PerfCommand(self.cg))
+
+        # TODO: implement more commands
 
     def register_command(self, command: str, obj: Command) -> None:
         self.commands[command] = obj
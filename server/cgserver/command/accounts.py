@@ -129,7 +129,7 @@ class AccountsCommand(cgserver.command.Command):
             self.cg.server.users[username.lower()] = u
             self.cg.server.users_uuid[u.uuid] = u
 
-            self.cg.server.save_server_data()
+            self.cg.server.save_user(u)
 
             self.cg.send_event("cg:network.client.register", {"client": -1})
             ctx.output(f"Successfully created new account {username}")
@@ -0,0 +1,321 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  perf.py
+#  
+#  Copyright 2020 contributors of cardgame
+#  
+#  This file is part of cardgame.
+#
+#  cardgame is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  cardgame is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with cardgame.  If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+The ``perf`` command can be used to inspect the performance of the server at runtime.
+
+Usage
+-----
+
+The ``perf`` command supports multiple sub-commands.
+
+The ``events`` subcommand gives access to the event dispatch profiler. Profiling is
+disabled by default, since it slightly slows down event dispatching. Its syntax is as
+follows::
+
+    /perf events [on|off|reset]
+    /perf events top [count] [total|max|dispatches]
+    /perf events show <event>
+
+Without any further argument, the current state of the profiler is shown. ``on`` and ``off``
+enable and disable the profiler, while ``reset`` clears all collected statistics.
+
+``top`` lists the events with the highest cumulative handler time. Optionally, the number of
+events and the statistic to sort by may be given.
+
+``show`` displays the statistics of all handlers of a single event.
+
+The ``timers`` subcommand shows how late scheduled functions were called, per function.
+Lateness is measured from the requested deadline to the actual call and should usually stay
+below the resolution of the scheduler. Its syntax is as follows::
+
+    /perf timers [reset]
+
+The ``loop`` subcommand shows how long each iteration of the main loop of the network
+processing thread took, excluding time spent waiting for work. Long iterations delay all
+packets, events and timers. Its syntax is as follows::
+
+    /perf loop [reset]
+
+``reset`` clears the statistics of both the ``timers`` and the ``loop`` subcommands.
+
+The ``net`` subcommand shows the outbound queues of all connected clients, including the
+highest number of bytes that were ever waiting to be sent to a client and the number of
+superseded messages that were dropped. It also shows how many messages were compressed,
+the overall compression ratio and the time spent compressing, as well as the number of
+pings answered from the cache or rejected by the rate limit. Its syntax is as follows::
+
+    /perf net
+
+The ``auth`` subcommand shows the queue of passwords waiting to be hashed, including the
+highest number of pending hashes, how many logins were rejected because the queue was full
+and how long hashing took, including the time spent waiting in the queue. Its syntax is as
+follows::
+
+    /perf auth
+
+The ``io`` subcommand shows the writes waiting for the background persistence thread, how
+many writes were saved by coalescing multiple changes and how long it took until changes
+were written. Its syntax is as follows::
+
+    /perf io
+
+Further subcommands may be added in the future.
+
+Privileges
+----------
+
+It requires either a privilege level of ``1000`` or the permission :cg:perm:``cg:command.perf``\\ .
+It can be run by any user meeting the privilege requirements at any time.
+
+Examples
+--------
+
+To find out which handler blocks the network thread, enable the profiler, wait for the
+lag to happen and then look at the slowest events::
+
+    /perf events on
+    /perf events top 10 max
+
+To check whether the network thread is falling behind, look at the loop durations and
+timer lateness::
+
+    /perf loop
+    /perf timers
+
+"""
+
+import time
+
+import cg
+import cgserver
+
+DEFAULT_TOP_COUNT = 10
+"""
+Number of events shown by ``perf events top`` if no count is given.
+"""
+
+SORT_KEYS = ["total", "max", "dispatches"]
+"""
+Statistics that ``perf events top`` can sort by.
+"""
+
+PERCENTILES = [50, 90, 99]
+"""
+Percentiles shown for histograms by ``perf timers``\ , ``perf loop``\ , ``perf auth`` and ``perf io``\ .
+"""
+
+
+def format_ms(t: float) -> str:
+    return f"{t*1000:.3f}ms"
+
+
+def format_histogram(hist: cgserver.scheduler.Histogram) -> str:
+    out = f"{hist.count} samples, mean {format_ms(hist.mean)}"
+    for p in PERCENTILES:
+        out += f", p{p} <={format_ms(hist.percentile(p))}"
+    out += f", max {format_ms(hist.max)}"
+    return out
+
+
+class PerfCommand(cgserver.command.Command):
+    """
+    Implementation of the ``perf`` command.
+
+    See the module-level documentation for usage details.
+    """
+    min_privilege = 1000
+    alt_permissions = ["cg:command.perf"]
+
+    def get_help(self):
+        return "Usage: perf events [on|off|reset]\n\t\tperf events top [count] [total|max|dispatches]" \
+               "\n\t\tperf events show <event>\n\t\tperf timers [reset]\n\t\tperf loop [reset]" \
+               "\n\t\tperf net\n\t\tperf auth\n\t\tperf io"
+
+    def get_description(self):
+        return "perf\tShow performance statistics"
+
+    def run(self, ctx: cgserver.command.CommandContext, args: list):
+        if len(args) == 1:
+            # No args, just the command
+            ctx.output("A subcommand is required for the perf command")
+            return
+
+        if args[1] == "events":
+            self.run_events(ctx, args[2:])
+        elif args[1] == "timers":
+            self.run_timers(ctx, args[2:])
+        elif args[1] == "loop":
+            self.run_loop(ctx, args[2:])
+        elif args[1] == "net":
+            self.run_net(ctx, args[2:])
+        elif args[1] == "auth":
+            self.run_auth(ctx, args[2:])
+        elif args[1] == "io":
+            self.run_io(ctx, args[2:])
+        else:
+            ctx.output(f"Invalid subcommand '{args[1]}' for the perf command")
+            return
+
+    def run_events(self, ctx: cgserver.command.CommandContext, args: list):
+        profiler = self.cg.event_manager.profiler
+
+        if len(args) == 0:
+            ctx.output(f"Event profiler is {'enabled' if profiler.enabled else 'disabled'}, "
+                       f"{len(profiler.stats)} events recorded since {cg.util.time.tdiff_format(profiler.start_time)}")
+        elif args[0] == "on":
+            profiler.enable()
+            ctx.output("Enabled event profiler")
+        elif args[0] == "off":
+            profiler.disable()
+            ctx.output("Disabled event profiler")
+        elif args[0] == "reset":
+            profiler.reset()
+            ctx.output("Reset event profiler statistics")
+        elif args[0] == "top":
+            n = DEFAULT_TOP_COUNT
+            key = "total"
+            if len(args) >= 2:
+                try:
+                    n = int(args[1])
+                except ValueError:
+                    ctx.output("Invalid count for perf events top (could not decode int)")
+                    return
+            if len(args) >= 3:
+                key = args[2].lower()
+                if key not in SORT_KEYS:
+                    ctx.output(f"Invalid sort key '{key}', must be one of {', '.join(SORT_KEYS)}")
+                    return
+
+            top = profiler.top(n, key)
+            if len(top) == 0:
+                ctx.output("No events recorded yet, use 'perf events on' to enable the profiler")
+                return
+
+            out = f"Top {len(top)} events by {key}:"
+            for event, stats in top:
+                out += f"\n{event}: {stats.dispatches} dispatches, {stats.handler_calls} handler calls, " \
+                       f"total {format_ms(stats.total)}, max {format_ms(stats.max)}"
+            ctx.output(out)
+        elif args[0] == "show":
+            if len(args) != 2:
+                ctx.output("Subcommand 'events show' needs exactly one parameter!")
+                return
+
+            stats = profiler.stats.get(args[1], None)
+            if stats is None:
+                ctx.output(f"No statistics recorded for event {args[1]}")
+                return
+
+            out = f"{args[1]}: {stats.dispatches} dispatches, total {format_ms(stats.total)}, " \
+                  f"max {format_ms(stats.max)}"
+            for name, hstats in sorted(list(stats.handlers.items()), key=lambda i: i[1].total, reverse=True):
+                out += f"\n{name}: {hstats.calls} calls, total {format_ms(hstats.total)}, " \
+                       f"max {format_ms(hstats.max)}"
+            ctx.output(out)
+        else:
+            ctx.output(f"Invalid subcommand '{args[0]}' for perf events")
+            return
+
+    def run_timers(self, ctx: cgserver.command.CommandContext, args: list):
+        server = self.cg.server
+
+        if len(args) == 0:
+            stats = sorted(list(server.timer_lateness.items()), key=lambda i: i[1].max, reverse=True)
+            out = f"{server.scheduler.count} timers pending, lateness since " \
+                  f"{cg.util.time.tdiff_format(server.process_stats_start)}:"
+            if len(stats) == 0:
+                out += "\nNo timers called yet"
+            for name, hist in stats:
+                out += f"\n{name}: {format_histogram(hist)}"
+            ctx.output(out)
+        elif args[0] == "reset":
+            server.reset_process_stats()
+            ctx.output("Reset timer and loop statistics")
+        else:
+            ctx.output(f"Invalid subcommand '{args[0]}' for perf timers")
+            return
+
+    def run_loop(self, ctx: cgserver.command.CommandContext, args: list):
+        server = self.cg.server
+
+        if len(args) == 0:
+            ctx.output(f"Main loop iterations since {cg.util.time.tdiff_format(server.process_stats_start)}: "
+                       f"{format_histogram(server.loop_duration)}\n"
+                       f"{server.event_queue.qsize()} events queued, {server.scheduler.count} timers pending")
+        elif args[0] == "reset":
+            server.reset_process_stats()
+            ctx.output("Reset timer and loop statistics")
+        else:
+            ctx.output(f"Invalid subcommand '{args[0]}' for perf loop")
+            return
+
+    def run_net(self, ctx: cgserver.command.CommandContext, args: list):
+        server = self.cg.server.server
+
+        if len(args) != 0:
+            ctx.output(f"Invalid subcommand '{args[0]}' for perf net")
+            return
+
+        out = f"{len(server.clients)} clients connected, highest queue {server.queue_high_water} bytes, " \
+              f"{server.slow_disconnects} slow clients disconnected"
+        if server.compress_count > 0:
+            out += f"\n{server.compress_count} messages compressed from {server.compress_bytes_in} to " \
+                   f"{server.compress_bytes_out} bytes " \
+                   f"({server.compress_bytes_out/server.compress_bytes_in*100:.1f}%) " \
+                   f"in {format_ms(server.compress_time)}, {server.compress_skipped} incompressible"
+        else:
+            out += f"\nNo messages compressed, {server.compress_skipped} incompressible"
+        out += f"\n{server.ping_count} pings answered, {server.ping_cache_hits} from cache, " \
+               f"{server.ping_rate_limited} rejected by rate limit"
+        for cid, client in list(server.clients.items()):
+            name = client.user.username if getattr(client, "user", None) is not None else "<not logged in>"
+            queued = sum(map(len, tuple(client.write_queue)))
+            pending = len(server._outbox.get(cid, []))
+            out += f"\n#{cid} {name}: {queued} bytes queued, {pending} messages held back, " \
+                   f"highest queue {client.queue_high_water} bytes, {client.dropped_messages} dropped"
+            if client.stalled_since is not None:
+                out += f", stalled for {time.monotonic()-client.stalled_since:.1f}s"
+        ctx.output(out)
+
+    def run_auth(self, ctx: cgserver.command.CommandContext, args: list):
+        hasher = self.cg.server.password_hasher
+
+        if len(args) != 0:
+            ctx.output(f"Invalid subcommand '{args[0]}' for perf auth")
+            return
+
+        ctx.output(f"{hasher.pending} of at most {hasher.max_pending} hashes pending, "
+                   f"highest {hasher.pending_high_water}, {hasher.rejected} rejected, {hasher.failed} failed\n"
+                   f"{hasher.workers} {'processes' if hasher.processes else 'threads'}, "
+                   f"hash durations: {format_histogram(hasher.duration)}")
+
+    def run_io(self, ctx: cgserver.command.CommandContext, args: list):
+        persistence = self.cg.server.persistence
+
+        if len(args) != 0:
+            ctx.output(f"Invalid subcommand '{args[0]}' for perf io")
+            return
+
+        ctx.output(f"{persistence.pending} writes pending, {persistence.written} written, "
+                   f"{persistence.coalesced} coalesced, {persistence.failed} failed\n"
+                   f"Delay {format_ms(persistence.delay)}, time until written: {format_histogram(persistence.duration)}")
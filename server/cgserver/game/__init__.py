@@ -85,7 +85,7 @@ class CGame(object, metaclass=abc.ABCMeta):
     def __init__(self, c: cg.CardGame, lobby: uuid.UUID, id: uuid.UUID = None):
         self.cg: cg.CardGame = c
 
-        self.game_id = uuid.uuid4() if id is None else id
+        self.game_id = self.cg.server.gen_uuid("game") if id is None else id
 
         self.creation_time = time.time()
 
@@ -134,23 +134,35 @@ class CGame(object, metaclass=abc.ABCMeta):
         del self.cg.server.games[self.game_id]
 
     def send_to_all(self, packet: str, data: dict, exclude: Optional[List[uuid.UUID]] = None):
-        if exclude is None:
-            exclude = []
+        self.cg.server.broadcast(packet, data, self.players, exclude)
 
-        for u in self.players:
-            if u not in exclude:
-                self.send_to_user(u, packet, data)
+        if packet not in ["cg:game.dk.card.transfer", "cg:game.dk.card.transfer_bulk"]:
+            self.cg.info(f"sent packet {packet} with content {data} to all users except {exclude}")
 
     def send_to_user(self, user: uuid.UUID, packet: str, data: dict):
         self.cg.server.send_to_user(user, packet, data)
 
-        if packet != "cg:game.dk.card.transfer":
+        if packet not in ["cg:game.dk.card.transfer", "cg:game.dk.card.transfer_bulk"]:
             self.cg.info(f"sent packet {packet} with content {data} to user {user}")
 
     @abc.abstractmethod
     def start(self):
         pass
 
+    @classmethod
+    def get_gamerule_hash(cls) -> str:
+        """
+        Returns the hash of the :py:attr:`GAMERULES` of this game.
+
+        The hash is only calculated once per game class.
+
+        :return: Hash as returned by :py:func:`cg.util.hash_validators()`
+        """
+        # Not inherited from other game classes, since they may have different rules
+        if cls.__dict__.get("_gamerule_hash", None) is None:
+            cls._gamerule_hash = cg.util.hash_validators(cls.GAMERULES)
+        return cls._gamerule_hash
+
     @classmethod
     def check_gamerule(cls, name: str, value: Union[float, bool, str]) -> Tuple[bool, Union[float, bool, str]]:
         return cg.util.validate(value, cls.GAMERULES[name])
@@ -228,6 +240,9 @@ class CGame(object, metaclass=abc.ABCMeta):
         # Delete all event handlers belonging to the game
         self.cg.event_manager.del_group(self.game_id)
 
+        # Cancel all pending timers of the game, e.g. card dealing
+        self.cg.server.cancel_group(self.game_id)
+
         # Delete all bot players and their corresponding threads
         for pid in self.players:
             p = self.cg.server.users_uuid[pid]
@@ -267,20 +267,36 @@ class Bot(object, metaclass=abc.ABCMeta):
         """
         pass
 
-    def send_event(self, event: str, data):
+    @property
+    def game_scope(self) -> Optional[uuid.UUID]:
+        """
+        Event scope of the game the bot is currently playing in.
+
+        This is the :term:`UUID` of the current game or ``None`` if the bot is not ingame.
+        """
+        u = self.cg.server.users_uuid.get(self.bot_id, None)
+        return u.cur_game if u is not None else None
+
+    def send_event(self, event: str, data, scope=None):
         """
         Send an event from within the bot's thread.
 
         Executed asynchronously by the server main loop.
 
+        If no scope is given, the event will be routed to the game the bot is currently
+        playing in, see :py:attr:`game_scope`\ .
+
         Note that errors caused by event handlers may appear out-of-order in log files in
         relation to logging occuring from within bot code.
 
         :param event: Name of the event
         :param data: Arbitrary event data
+        :param scope: Optional event scope
         :return:
         """
-        self.cg.server.event_queue.put((event, data,))
+        if scope is None:
+            scope = self.game_scope
+        self.cg.server.queue_event(event, data, scope)
 
     def add_event_listener(self, event: str, handler: Callable[[str, Dict], None]):
         """
@@ -295,6 +311,20 @@ class Bot(object, metaclass=abc.ABCMeta):
 
         Also ensures that the event handlers are properly removed when the bot is deleted.
 
+        :param event:
+        :param handler:
+        :return:
+        """
+        self._add_local_listener(event, handler)
+        self.cg.add_event_listener(event, self._receive_event, group=self.bot_id)
+
+    def _add_local_listener(self, event: str, handler: Callable[[str, Dict], None]):
+        """
+        Adds an event listener to the bot's thread without registering a global listener.
+
+        Only useful for events that are routed to the bot directly by the server, like the
+        ``cg:bot.[<bot_id>].*`` events.
+
         :param event:
         :param handler:
         :return:
@@ -303,7 +333,6 @@ class Bot(object, metaclass=abc.ABCMeta):
             self._event_handlers[event] = []
 
         self._event_handlers[event].append(handler)
-        self.cg.add_event_listener(event, self._receive_event, group=self.bot_id)
 
     def register_event_handlers(self):
         """
@@ -316,8 +345,9 @@ class Bot(object, metaclass=abc.ABCMeta):
         :return:
         """
 
-        self.add_event_listener(f"cg:bot.[{self.bot_id.hex}].packet.recv", self.handle_recvpacket)
-        self.add_event_listener(f"cg:bot.[{self.bot_id.hex}].gamerules", self.handle_gamerules)
+        # These are routed by the server via a single pattern listener for all bots
+        self._add_local_listener(f"cg:bot.[{self.bot_id.hex}].packet.recv", self.handle_recvpacket)
+        self._add_local_listener(f"cg:bot.[{self.bot_id.hex}].gamerules", self.handle_gamerules)
 
     def handle_recvpacket(self, event: str, data: Dict):
         self.on_packet(data["packet"], data["data"])
@@ -1133,6 +1133,7 @@ class DoppelkopfBot(Bot):
         self.send_event("cg:event.delay", {
             "event": "cg:game.dk.play_card",
             "delay": gen_delay(self.CARD_PLAY_DELAY, self.CARD_PLAY_DELAY_VAR),
+            "scope": self.game_scope,
             "data": {
                 "player": self.bot_id.hex,
                 "card": card.card_id.hex
@@ -1827,7 +1828,7 @@ class DoppelkopfBot(Bot):
         # Update any internal state that is changed by the packet
         # Similar to a real client
         # Then call the appropriate handler with the packet data
-        if packet != "cg:game.dk.card.transfer":
+        if packet not in ["cg:game.dk.card.transfer", "cg:game.dk.card.transfer_bulk"]:
             self.cg.debug(f"Received packet {packet} with data {data} on bot {self.bot_id}")
 
         if packet == "cg:game.start":
@@ -1837,6 +1838,9 @@ class DoppelkopfBot(Bot):
         elif packet == "cg:game.dk.card.transfer":
             # TODO: transfer card in self.slots
             self.on_card_transfer(data)
+        elif packet == "cg:game.dk.card.transfer_bulk":
+            for transfer in data["transfers"]:
+                self.on_card_transfer(transfer)
         elif packet == "cg:game.dk.turn":
             # TODO: store current player and call do_turn() if appropriate
             self.on_turn(data)
@@ -884,6 +884,9 @@ class AdvancedDKBot(Bot):
             self.on_question(data)
         elif packet == "cg:game.dk.card.transfer":
             self.on_card_transfer(data)
+        elif packet == "cg:game.dk.card.transfer_bulk":
+            for transfer in data["transfers"]:
+                self.on_card_transfer(transfer)
         elif packet == "cg:game.dk.turn":
             # TODO: store current player and call do_turn() if appropriate
             self.on_turn(data)
@@ -22,7 +22,7 @@
 # 
 
 import uuid
-from typing import Dict
+from typing import Callable, Dict, Optional
 
 
 class Card(object):
@@ -32,8 +32,8 @@ class Card(object):
         "value",
     ]
 
-    def __init__(self, color: str, value: str):
-        self.card_id: uuid.UUID = uuid.uuid4()
+    def __init__(self, color: str, value: str, card_id: Optional[uuid.UUID] = None):
+        self.card_id: uuid.UUID = card_id if card_id is not None else uuid.uuid4()
 
         self.color = color
         self.value = value
@@ -52,7 +52,7 @@ class Card(object):
             self.value = value[1:]
 
 
-def create_dk_deck(with9: int = 8, joker: bool = False):
+def create_dk_deck(with9: int = 8, joker: bool = False, new_id: Callable[[], uuid.UUID] = uuid.uuid4):
     if with9 not in [0, 4, 8]:
         raise ValueError("with9 cannot be", with9)
 
@@ -62,15 +62,15 @@ def create_dk_deck(with9: int = 8, joker: bool = False):
             for value in ["a", "k", "q", "j", "10", "9"]:
                 if value == "9" and (with9 == 0 or (with9 == 4 and i == 1)):
                     continue
-                card = Card("j", "0") if joker and color == "d" and i == 0 and (
+                card = Card("j", "0", new_id()) if joker and color == "d" and i == 0 and (
                     (with9 == 0 and value == "k") or (with9 in [4, 8] and value == "9")
-                ) else Card(color, value)
+                ) else Card(color, value, new_id())
                 card_dict[card.card_id] = card
 
     return card_dict
 
 
-def create_dk_prepped_deck():
+def create_dk_prepped_deck(new_id: Callable[[], uuid.UUID] = uuid.uuid4):
     deck = 0
     hands = {}
     if deck == 0:
@@ -103,7 +103,7 @@ def create_dk_prepped_deck():
 
     cards = {}
     for card in card_values:
-        c = Card(card[0], card[1:])
+        c = Card(card[0], card[1:], new_id())
         cards[c.card_id] = c
 
     return cards
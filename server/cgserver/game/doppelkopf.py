@@ -387,6 +387,11 @@ class DoppelkopfGame(CGame):
             "type": "bool",
             "default": OPEN_CARD,
             "requirements": {}
+        },
+        "dk.fast_deal": {
+            "type": "bool",
+            "default": False,
+            "requirements": {}
         }
     }
     SOLO_ORDER = [
@@ -519,16 +524,25 @@ class DoppelkopfGame(CGame):
     def register_event_handlers(self):
         super().register_event_handlers()
 
-        self.cg.add_event_listener("cg:game.dk.end_round", self.handle_end_round, group=self.game_id)
-
-        self.cg.add_event_listener("cg:game.dk.play.continue_yes", self.handle_continue_play, group=self.game_id)
-        self.cg.add_event_listener("cg:game.dk.play.continue_no", self.handle_not_continue_play, group=self.game_id)
-        self.cg.add_event_listener("cg:game.dk.play.cancel_yes", self.handle_cancel_play, group=self.game_id)
-        self.cg.add_event_listener("cg:game.dk.play.cancel_no", self.handle_not_cancel_play, group=self.game_id)
-        self.cg.add_event_listener("cg:game.dk.play.end_yes", self.handle_end_play, group=self.game_id)
-        self.cg.add_event_listener("cg:game.dk.play.end_no", self.handle_not_end_play, group=self.game_id)
-        self.cg.add_event_listener("cg:game.dk.play.adjourn_yes", self.handle_adjourn_play, group=self.game_id)
-        self.cg.add_event_listener("cg:game.dk.play.adjourn_no", self.handle_not_adjourn_play, group=self.game_id)
+        self.cg.add_event_listener("cg:game.dk.end_round", self.handle_end_round,
+                                   group=self.game_id, scope=self.game_id)
+
+        self.cg.add_event_listener("cg:game.dk.play.continue_yes", self.handle_continue_play,
+                                   group=self.game_id, scope=self.game_id)
+        self.cg.add_event_listener("cg:game.dk.play.continue_no", self.handle_not_continue_play,
+                                   group=self.game_id, scope=self.game_id)
+        self.cg.add_event_listener("cg:game.dk.play.cancel_yes", self.handle_cancel_play,
+                                   group=self.game_id, scope=self.game_id)
+        self.cg.add_event_listener("cg:game.dk.play.cancel_no", self.handle_not_cancel_play,
+                                   group=self.game_id, scope=self.game_id)
+        self.cg.add_event_listener("cg:game.dk.play.end_yes", self.handle_end_play,
+                                   group=self.game_id, scope=self.game_id)
+        self.cg.add_event_listener("cg:game.dk.play.end_no", self.handle_not_end_play,
+                                   group=self.game_id, scope=self.game_id)
+        self.cg.add_event_listener("cg:game.dk.play.adjourn_yes", self.handle_adjourn_play,
+                                   group=self.game_id, scope=self.game_id)
+        self.cg.add_event_listener("cg:game.dk.play.adjourn_no", self.handle_not_adjourn_play,
+                                   group=self.game_id, scope=self.game_id)
 
     def handle_end_round(self, event: str, data: Dict):
         m = -1 if data["game_type"] in ["ramsch", "ramsch_sw"] else 1  # In case of Ramsch, the points are swapped
@@ -797,12 +811,13 @@ class DoppelkopfRound(object):
     else:
         CARD_DEAL_DELAY = 1.0
     CARD_DEAL_DELAY = 1.0
+    CARD_FAST_DEAL_DELAY = 0.1
 
     FIXED_SEED = False
 
     def __init__(self, game: DoppelkopfGame, players: List[uuid.UUID]):
         self.game: DoppelkopfGame = game
-        self.round_id: uuid.UUID = uuid.uuid4()
+        self.round_id: uuid.UUID = self.game.cg.server.gen_uuid("round")
 
         self.register_event_handlers()
 
@@ -881,7 +896,9 @@ class DoppelkopfRound(object):
         self.players_loaded = set()
 
         if not self.FIXED_SEED:
-            self.random_seed = secrets.randbits(128)
+            self.random_seed = int.from_bytes(
+                self.game.cg.server.gen_random("seed", lambda: secrets.token_bytes(16)), "big"
+            )
         else:
             self.random_seed = RANDOM_SEED
         self.random = random.Random(self.random_seed)
@@ -967,7 +984,6 @@ class DoppelkopfRound(object):
                     "from_slot": from_slot,
                     "to_slot": to_slot,
                 })
-                self.slots[to_slot].append(card.card_id)
             else:
                 raise CardTransferError(f"Cannot transfer card from {from_slot} to {to_slot}")
 
@@ -1070,6 +1086,44 @@ class DoppelkopfRound(object):
             self.slots[from_slot].remove(card.card_id)
         self.slots[to_slot].append(card.card_id)
 
+    def transfer_cards(self, transfers: List[Tuple[Card, Optional[str], str]], delay: float = 0):
+        """
+        Transfers multiple cards at once.
+
+        Sends a single ``cg:game.dk.card.transfer_bulk`` packet to each player instead of one
+        ``cg:game.dk.card.transfer`` packet per card.
+
+        Only creating cards on the stack and dealing cards from the stack to a hand are
+        supported, all other transfers have to use :py:meth:`transfer_card()`\ .
+
+        If a delay is given, clients will wait that many seconds between the animations of
+        two consecutive transfers.
+        """
+        open_cards = self.game.DEV_MODE or self.game.gamerules["dk.open_cards"]
+
+        for card, from_slot, to_slot in transfers:
+            if not ((from_slot is None and to_slot == "stack") or (from_slot == "stack" and "hand" in to_slot)):
+                raise CardTransferError(f"Cannot bulk transfer cards from {from_slot} to {to_slot}")
+
+        for i, player in enumerate(self.players):
+            data = {
+                "transfers": [{
+                    "card_id": card.card_id.hex,
+                    # Only the receiver may know the values of dealt cards
+                    "card_value": card.card_value if open_cards or to_slot == f"hand{i}" else "",
+                    "from_slot": from_slot,
+                    "to_slot": to_slot,
+                } for card, from_slot, to_slot in transfers],
+            }
+            if delay > 0:
+                data["delay"] = delay
+            self.game.send_to_user(player, "cg:game.dk.card.transfer_bulk", data)
+
+        for card, from_slot, to_slot in transfers:
+            if from_slot is not None:
+                self.slots[from_slot].remove(card.card_id)
+            self.slots[to_slot].append(card.card_id)
+
     def get_card_color(self, card: Card) -> str:
         # Clubs
         if card.card_value == "c9":
@@ -1594,7 +1648,13 @@ class DoppelkopfRound(object):
         elif card.value == "a":
             return 11
 
-    def deal_card(self, dt):
+    def draw_deal_cards(self, exclude: Set[uuid.UUID]) -> List[Card]:
+        """
+        Chooses the cards of the stack to deal in the current dealing step.
+
+        Cards whose IDs are in ``exclude`` are skipped, since they have already been chosen
+        but are still on the stack.
+        """
         stack = self.slots["stack"]
         kr = 3
         if self.deal_counter >= 12:
@@ -1603,20 +1663,56 @@ class DoppelkopfRound(object):
             elif self.game.gamerules["dk.without9"] == "without":
                 kr = 1
 
+        cards = []
         for k in range(kr):  # 3 cards (or less in the last round, if 9s are disabled)
+            candidates = [c for c in stack if c not in exclude and self.cards[c] not in cards]
             if self.DEV_MODE_PREP_CARDS:
-                card_id = stack.pop(0)
+                card_id = candidates[0]
             else:
-                card_id = stack.pop(self.random.randint(0, len(stack) - 1))
+                card_id = self.random.choice(candidates)
             self.game.cg.info(f"Dealing card {self.cards[card_id].card_value} to hand{self.deal_counter % 4}")
-            self.transfer_card(self.cards[card_id], "stack", f"hand{self.deal_counter % 4}")
+            cards.append(self.cards[card_id])
+        return cards
+
+    def deal_card(self, dt):
+        cards = self.draw_deal_cards(set())
+        self.transfer_cards([(card, "stack", f"hand{self.deal_counter % 4}") for card in cards])
 
         self.deal_counter += 1
 
         if self.deal_counter >= 16:
-            self.game.cg.server.schedule_function(self.deal_ready, self.CARD_DEAL_DELAY)
+            self.game.cg.server.schedule_function(self.deal_ready, self.CARD_DEAL_DELAY,
+                                                  group=self.game.game_id)
+        else:
+            self.game.cg.server.schedule_function(self.deal_card, self.CARD_DEAL_DELAY,
+                                                  group=self.game.game_id)
+
+    def deal_all(self):
+        """
+        Deals all cards at once, used if the ``dk.fast_deal`` gamerule is active.
+
+        All cards are sent in the usual dealing order with a single packet per player.
+        Clients animate the dealing themselves, so only a single timer is needed to wait for
+        the animation to finish. Tables with only bots do not wait at all.
+        """
+        transfers = []
+        dealt = set()
+        while self.deal_counter < 16:
+            for card in self.draw_deal_cards(dealt):
+                dealt.add(card.card_id)
+                transfers.append((card, "stack", f"hand{self.deal_counter % 4}"))
+            self.deal_counter += 1
+
+        if self.is_bot_only():
+            self.transfer_cards(transfers)
+            self.deal_ready(0)
         else:
-            self.game.cg.server.schedule_function(self.deal_card, self.CARD_DEAL_DELAY)
+            self.transfer_cards(transfers, self.CARD_FAST_DEAL_DELAY)
+            self.game.cg.server.schedule_function(self.deal_ready, self.CARD_FAST_DEAL_DELAY*len(transfers),
+                                                  group=self.game.game_id)
+
+    def is_bot_only(self) -> bool:
+        return all(map(lambda pid: isinstance(self.game.cg.server.users_uuid[pid], user.BotUser), self.players))
 
     def deal_ready(self, dt):
         self.game_state = "w_for_ready"
@@ -1634,12 +1730,14 @@ class DoppelkopfRound(object):
         joker = self.game.gamerules["dk.joker"]
         joker = joker != "None"
 
-        self.cards = create_dk_deck(with9=with9, joker=joker)
+        # Card IDs are sent to clients, so they must be the same when replaying a journal
+        new_id = lambda: self.game.cg.server.gen_uuid("card")
         if self.DEV_MODE_PREP_CARDS:
-            self.cards = create_dk_prepped_deck()
+            self.cards = create_dk_prepped_deck(new_id)
+        else:
+            self.cards = create_dk_deck(with9=with9, joker=joker, new_id=new_id)
 
-        for card in self.cards.values():
-            self.transfer_card(card, None, "stack")
+        self.transfer_cards([(card, None, "stack") for card in self.cards.values()])
 
         self.game.cg.info("Initialized cards")
 
@@ -2277,55 +2375,55 @@ class DoppelkopfRound(object):
             "extras": [re_extras, kontra_extras],
             "buckround_events": self.buckround_events,
             "game_summary": game_summary
-        })
+        }, scope=self.game.game_id)
 
     def register_event_handlers(self):
         self.game.cg.add_event_listener("cg:game.dk.ready_to_deal", self.handle_deal, cg.event.F_RAISE_ERRORS,
-                                        group=self.round_id)
+                                        group=self.round_id, scope=self.game.game_id)
 
         self.game.cg.add_event_listener("cg:game.dk.reservation", self.handle_reservation, cg.event.F_RAISE_ERRORS,
-                                        group=self.round_id)
+                                        group=self.round_id, scope=self.game.game_id)
         self.game.cg.add_event_listener("cg:game.dk.reservation_solo", self.handle_reservation_solo,
-                                        cg.event.F_RAISE_ERRORS, group=self.round_id)
+                                        cg.event.F_RAISE_ERRORS, group=self.round_id, scope=self.game.game_id)
         self.game.cg.add_event_listener("cg:game.dk.reservation_throw", self.handle_reservation_throw,
-                                        cg.event.F_RAISE_ERRORS, group=self.round_id)
+                                        cg.event.F_RAISE_ERRORS, group=self.round_id, scope=self.game.game_id)
         self.game.cg.add_event_listener("cg:game.dk.reservation_pigs", self.handle_reservation_pigs,
-                                        cg.event.F_RAISE_ERRORS, group=self.round_id)
+                                        cg.event.F_RAISE_ERRORS, group=self.round_id, scope=self.game.game_id)
         self.game.cg.add_event_listener("cg:game.dk.reservation_superpigs", self.handle_reservation_superpigs,
-                                        cg.event.F_RAISE_ERRORS, group=self.round_id)
+                                        cg.event.F_RAISE_ERRORS, group=self.round_id, scope=self.game.game_id)
         self.game.cg.add_event_listener("cg:game.dk.reservation_poverty", self.handle_reservation_poverty,
-                                        cg.event.F_RAISE_ERRORS, group=self.round_id)
+                                        cg.event.F_RAISE_ERRORS, group=self.round_id, scope=self.game.game_id)
         self.game.cg.add_event_listener("cg:game.dk.reservation_poverty_pass_card",
                                         self.handle_reservation_poverty_pass_card, cg.event.F_RAISE_ERRORS,
-                                        group=self.round_id)
+                                        group=self.round_id, scope=self.game.game_id)
         self.game.cg.add_event_listener("cg:game.dk.reservation_poverty_accept", self.handle_reservation_poverty_accept,
-                                        cg.event.F_RAISE_ERRORS, group=self.round_id)
+                                        cg.event.F_RAISE_ERRORS, group=self.round_id, scope=self.game.game_id)
         self.game.cg.add_event_listener("cg:game.dk.reservation_wedding", self.handle_reservation_wedding,
-                                        cg.event.F_RAISE_ERRORS, group=self.round_id)
+                                        cg.event.F_RAISE_ERRORS, group=self.round_id, scope=self.game.game_id)
         self.game.cg.add_event_listener("cg:game.dk.reservation_wedding_clarification_trick",
                                         self.handle_reservation_wedding_clarification_trick, cg.event.F_RAISE_ERRORS,
-                                        group=self.round_id)
+                                        group=self.round_id, scope=self.game.game_id)
 
         self.game.cg.add_event_listener("cg:game.dk.play_card", self.handle_play_card, cg.event.F_RAISE_ERRORS,
-                                        group=self.round_id)
+                                        group=self.round_id, scope=self.game.game_id)
         self.game.cg.add_event_listener("cg:game.dk.call_pigs", self.handle_call_pigs, cg.event.F_RAISE_ERRORS,
-                                        group=self.round_id)
+                                        group=self.round_id, scope=self.game.game_id)
         self.game.cg.add_event_listener("cg:game.dk.call_superpigs", self.handle_call_superpigs,
-                                        cg.event.F_RAISE_ERRORS, group=self.round_id)
+                                        cg.event.F_RAISE_ERRORS, group=self.round_id, scope=self.game.game_id)
         self.game.cg.add_event_listener("cg:game.dk.call_re", self.handle_call_re, cg.event.F_RAISE_ERRORS,
-                                        group=self.round_id)
+                                        group=self.round_id, scope=self.game.game_id)
         self.game.cg.add_event_listener("cg:game.dk.call_denial", self.handle_call_denial, cg.event.F_RAISE_ERRORS,
-                                        group=self.round_id)
+                                        group=self.round_id, scope=self.game.game_id)
 
         self.game.cg.add_event_listener("cg:game.dk.black_sow_solo", self.handle_black_sow_solo,
-                                        cg.event.F_RAISE_ERRORS, group=self.round_id)
+                                        cg.event.F_RAISE_ERRORS, group=self.round_id, scope=self.game.game_id)
         self.game.cg.add_event_listener("cg:game.dk.throw", self.handle_throw, cg.event.F_RAISE_ERRORS,
-                                        group=self.round_id)
+                                        group=self.round_id, scope=self.game.game_id)
         self.game.cg.add_event_listener("cg:game.dk.ready", self.handle_ready, cg.event.F_RAISE_ERRORS,
-                                        group=self.round_id)
+                                        group=self.round_id, scope=self.game.game_id)
 
         self.game.cg.add_event_listener("cg:game.dk.command", self.handle_command, cg.event.F_RAISE_ERRORS,
-                                        group=self.round_id)
+                                        group=self.round_id, scope=self.game.game_id)
 
     def handle_deal(self, event: str, data: Dict):
         # Check for valid states
@@ -2348,7 +2446,10 @@ class DoppelkopfRound(object):
                 "phase": "dealing",
             })
 
-            self.deal_card(0)
+            if self.game.gamerules.get("dk.fast_deal", False) or self.is_bot_only():
+                self.deal_all()
+            else:
+                self.deal_card(0)
 
     def handle_ready(self, event: str, data: Dict):
         # Check for valid states
@@ -2462,7 +2563,7 @@ class DoppelkopfRound(object):
             "modifiers": self.modifiers,
             "extras": [],
             "game_summary": [],
-        })
+        }, scope=self.game.game_id)
 
     def handle_reservation(self, event: str, data: Dict):
         # Check for correct states
@@ -2692,7 +2793,7 @@ class DoppelkopfRound(object):
                 "modifiers": self.modifiers,
                 "extras": [],
                 "game_summary": [],
-            })
+            }, scope=self.game.game_id)
 
         # If he doesn't want to throw
         elif data["type"] == "throw_no":
@@ -3250,7 +3351,7 @@ class DoppelkopfRound(object):
                     self.game.cg.send_event("cg:game.dk.reservation_poverty_accept", {
                         "player": self.current_player.hex,
                         "type": "poverty_accept"
-                    })
+                    }, scope=self.game.game_id)
                     return
                     # --> handle_reservation_poverty_accept (type = "accept")
 
@@ -3312,7 +3413,7 @@ class DoppelkopfRound(object):
                         "modifiers": self.modifiers,
                         "extras": [],
                         "game_summary": [],
-                    })
+                    }, scope=self.game.game_id)
 
                 # Play a round of black sow
                 elif self.game.gamerules["dk.poverty_consequence"] == "black_sow":
@@ -3534,7 +3635,7 @@ class DoppelkopfRound(object):
 
         # Trick is full
         elif len(self.current_trick) == 4:
-            self.game.cg.server.schedule_function(self.end_trick, 1, fox_card=fox_card)
+            self.game.cg.server.schedule_function(self.end_trick, 1, fox_card=fox_card, group=self.game.game_id)
 
     def end_trick(self, dt=None, fox_card=""):
         self.game.cg.info(f"Game Type: {self.game_type}")
@@ -3773,7 +3874,7 @@ class DoppelkopfRound(object):
 
         # Last Round
         elif self.trick_num == self.max_tricks:
-            self.game.cg.server.schedule_function(self.end_round, 1)
+            self.game.cg.server.schedule_function(self.end_round, 1, group=self.game.game_id)
 
     def handle_call_pigs(self, event: str, data: Dict):
         # Check for valid states
@@ -4194,19 +4295,19 @@ class DoppelkopfRound(object):
                         self.game.cg.send_event("cg:game.dk.ready", {
                             "player": p.hex,
                             "type": "ready"
-                        })
+                        }, scope=self.game.game_id)
                     return
                 elif packet == "cg:game.dk.q":
                     for p in self.players:
                         self.game.cg.send_event("cg:game.dk.ready", {
                             "player": p.hex,
                             "type": "ready"
-                        })
+                        }, scope=self.game.game_id)
                     for p in self.players:
                         self.game.cg.send_event("cg:game.dk.reservation", {
                             "player": p.hex,
                             "type": "reservation_no"
-                        })
+                        }, scope=self.game.game_id)
                     return
                 self.game.cg.info(f"Invalid packet: {packet}")
                 return
@@ -4224,14 +4325,14 @@ class DoppelkopfRound(object):
                 "player": player.hex,
                 "type": data["type"],
                 "data": {"type": data["data"]}
-            })
+            }, scope=self.game.game_id)
 
         elif packet == "cg:game.dk.black_sow_solo":
             self.game.cg.send_event(packet, {
                 "player": player.hex,
                 "type": data["type"],
                 "data": {"type": data["data"]}
-            })
+            }, scope=self.game.game_id)
 
         elif packet == "cg:game.dk.reservation_poverty_pass_card":
             try:
@@ -4245,21 +4346,21 @@ class DoppelkopfRound(object):
                 "player": player.hex,
                 "type": data["type"],
                 "card": cards
-            })
+            }, scope=self.game.game_id)
 
         elif packet == "cg:game.dk.reservation_poverty_accept" and data["type"] == "poverty_return":
             self.game.cg.send_event(packet, {
                 "player": player.hex,
                 "type": data["type"],
                 "data": {"amount": int(data["data"])}
-            })
+            }, scope=self.game.game_id)
 
         elif packet == "cg:game.dk.reservation_wedding_clarification_trick":
             self.game.cg.send_event(packet, {
                 "player": player.hex,
                 "type": data["type"],
                 "data": {"trick": data["data"]}
-            })
+            }, scope=self.game.game_id)
 
         elif packet == "cg:game.dk.play_card":
             if data["card"] == "-1":
@@ -4284,7 +4385,7 @@ class DoppelkopfRound(object):
                             "player": player.hex,
                             "type": data["type"],
                             "card": card.hex
-                        })
+                        }, scope=self.game.game_id)
                         return
             else:
                 try:
@@ -4299,7 +4400,7 @@ class DoppelkopfRound(object):
                     "player": player.hex,
                     "type": data["type"],
                     "card": card.hex
-                })
+                }, scope=self.game.game_id)
 
         elif packet == "cg:game.dk.autoplay":
             self.do_autoplay()
@@ -4308,7 +4409,7 @@ class DoppelkopfRound(object):
             self.game.cg.send_event(packet, {
                 "player": player.hex,
                 "type": data["type"]
-            })
+            }, scope=self.game.game_id)
 
     def send_turn_packet(self, trick_num=1):
         for p in self.players:
@@ -4501,7 +4602,7 @@ class DoppelkopfRound(object):
                     "player": p,
                     "type": "play",
                     "card": "-1"
-                })
+                }, scope=self.game.game_id)
                 time.sleep(.5)
 
                 if self.game_state == "counting":
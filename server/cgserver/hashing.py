@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  hashing.py
+#
+#  Copyright 2020 contributors of cardgame
+#
+#  This file is part of cardgame.
+#
+#  cardgame is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  cardgame is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with cardgame.  If not, see <http://www.gnu.org/licenses/>.
+#
+import concurrent.futures
+import hashlib
+import multiprocessing
+import threading
+import time
+from typing import Callable, Optional
+
+import cg
+import cgserver
+import cgserver.scheduler
+
+
+def hash_password(password: bytes, salt: bytes, iterations: int) -> bytes:
+    """
+    Hashes a password with PBKDF2-HMAC-SHA256.
+
+    Must stay a module-level function, since it is run in worker processes.
+    """
+    return hashlib.pbkdf2_hmac("sha256", password, salt, iterations)
+
+
+class PasswordHasher(object):
+    """
+    Bounded pool of workers hashing passwords outside of the network processing thread.
+
+    Hashing a password takes tens of milliseconds on purpose. Doing this in the network
+    processing thread would freeze all games on the server during every login. Instead,
+    :py:meth:`submit()` hands the password to a worker and the callback is later called from
+    within the network processing thread via :py:meth:`DedicatedServer.schedule_function()`\\ .
+
+    By default, worker processes are used to avoid contention on the GIL. If ``processes`` is
+    false, threads are used instead, which still works well since :py:func:`hashlib.pbkdf2_hmac()`
+    releases the GIL while hashing.
+
+    At most ``max_pending`` hashes may be queued or running at the same time, further requests
+    are rejected to prevent login floods from using up all memory.
+    """
+
+    def __init__(self, c: cg.CardGame, server: "cgserver.server.DedicatedServer",
+                 workers: int = 2, max_pending: int = 32, processes: bool = True,
+                 ):
+        self.cg = c
+        self.server = server
+
+        self.workers = workers
+        self.max_pending = max_pending
+        self.processes = processes
+
+        # Created lazily, since worker processes are costly and most servers rarely see logins
+        self._executor: Optional[concurrent.futures.Executor] = None
+        self._lock = threading.Lock()
+
+        self.pending: int = 0
+        self.pending_high_water: int = 0
+        self.completed: int = 0
+        self.rejected: int = 0
+        self.failed: int = 0
+        self.duration = cgserver.scheduler.Histogram()
+
+    def _get_executor(self) -> concurrent.futures.Executor:
+        if self._executor is None:
+            if self.processes:
+                # Forking would copy the state of all other threads, including held locks
+                self._executor = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                )
+            else:
+                self._executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="cg-hash",
+                )
+        return self._executor
+
+    def submit(self, password: bytes, salt: bytes, iterations: int, callback: Callable[[Optional[bytes]], None]) -> bool:
+        """
+        Hashes a password in the background.
+
+        The callback is called from within the network processing thread with the hash, or
+        ``None`` if hashing failed.
+
+        :param bytes password: Password to hash
+        :param bytes salt: Salt to use
+        :param int iterations: Number of PBKDF2 iterations
+        :param callback: Function to call with the result
+        :return: Whether the password was accepted, ``False`` if too many hashes are pending
+        :rtype: bool
+        """
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                return False
+            self.pending += 1
+            self.pending_high_water = max(self.pending_high_water, self.pending)
+
+            start = time.monotonic()
+            try:
+                future = self._get_executor().submit(hash_password, password, salt, iterations)
+            except Exception:
+                self.pending -= 1
+                # The pool may be broken, e.g. if a worker process was killed
+                self._executor = None
+                self.cg.exception("Could not submit password hash to worker pool:")
+                return False
+
+        future.add_done_callback(lambda f: self._done(f, start, callback))
+        return True
+
+    def _done(self, future: concurrent.futures.Future, start: float, callback: Callable[[Optional[bytes]], None]):
+        # Called from a thread of the executor
+        with self._lock:
+            self.pending -= 1
+            self.duration.record(time.monotonic()-start)
+
+            if future.cancelled() or future.exception() is not None:
+                self.failed += 1
+                result = None
+                self.cg.error(f"Could not hash password: {future.exception() if not future.cancelled() else 'cancelled'}")
+            else:
+                self.completed += 1
+                result = future.result()
+
+        self.server.schedule_function(self._call_callback, 0, 0, callback, result)
+
+    def _call_callback(self, dt: float, callback: Callable[[Optional[bytes]], None], result: Optional[bytes]):
+        callback(result)
+
+    def shutdown(self):
+        """
+        Stops all workers without waiting for pending hashes.
+
+        :return: None
+        """
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
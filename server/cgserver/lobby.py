@@ -27,14 +27,14 @@ import uuid
 import cgserver
 
 import cg
-from cg.constants import ROLE_REMOVE, ROLE_CREATOR, ROLE_ADMIN, ROLE_PLAYER
+from cg.constants import ROLE_REMOVE, ROLE_CREATOR, ROLE_ADMIN, ROLE_PLAYER, FEATURE_GAMERULE_CACHE
 
 
 class Lobby(object):
     def __init__(self, c: cg.CardGame, u: Optional[uuid.UUID] = None):
         self.cg: cg.CardGame = c
 
-        self.uuid: uuid.UUID = u if u is not None else uuid.uuid4()
+        self.uuid: uuid.UUID = u if u is not None else self.cg.server.gen_uuid("lobby")
         self.game: Union[str, None] = None
 
         self.game_data: Optional[Dict] = None
@@ -124,9 +124,9 @@ class Lobby(object):
             "lobby": self.uuid.hex,
         })
 
-        gamerule_validators = self.cg.server.game_reg.get(self.game, cgserver.game.CGame).GAMERULES
+        game_cls = self.cg.server.game_reg.get(self.game, cgserver.game.CGame)
 
-        self.cg.server.send_to_user(user, "cg:lobby.change", {
+        data = {
             "users": {u.hex: {
                 "ready": self.user_ready[u],
                 "role": self.user_roles[u],
@@ -136,11 +136,17 @@ class Lobby(object):
             },
             "game": self.game,
             "gamerules": self.gamerules,
-            "gamerule_validators": gamerule_validators,
             "supported_bots": [
                 key for key in self.cg.server.bot_reg if self.cg.server.bot_reg[key].supports_game(self.game)
             ]
-        })
+        }
+        if FEATURE_GAMERULE_CACHE in self.cg.server.get_user_features(user):
+            # The client will request the validators if it does not have them cached yet
+            data["gamerule_validators_hash"] = game_cls.get_gamerule_hash()
+        else:
+            data["gamerule_validators"] = game_cls.GAMERULES
+
+        self.cg.server.send_to_user(user, "cg:lobby.change", data)
 
         self.send_to_all("cg:lobby.change", {
             "users": {user.uuid.hex: {
@@ -170,7 +176,7 @@ class Lobby(object):
                 self.cg.server.send_status_message(from_user, "warning", "cg:msg.lobby.add_bot.invalid_type")
             return False
 
-        bot_id = uuid.uuid4()
+        bot_id = self.cg.server.gen_uuid("bot")
         u = cgserver.user.BotUser(self.cg.server,
                                   self.cg,
                                   bot_cls.generate_name(
@@ -304,9 +310,7 @@ class Lobby(object):
         g.start()
 
     def send_to_all(self, packet: str, data: dict, exclude=None):
-        for u in self.users:
-            if u != exclude:
-                self.cg.server.send_to_user(u, packet, data)
+        self.cg.server.broadcast(packet, data, self.users, [exclude] if exclude is not None else None)
 
     def set_gamerule(self, rule: str, value):
         if rule not in self.cg.server.game_reg[self.game].GAMERULES:
@@ -21,7 +21,9 @@
 #  along with cardgame.  If not, see <http://www.gnu.org/licenses/>.
 #
 import re
+import secrets
 import uuid
+from typing import Optional, Set
 
 from cg.constants import STATE_AUTH, STATE_ACTIVE
 from cg.packet import CGPacket
@@ -48,8 +50,21 @@ class AuthPacket(CGPacket):
         "serverid",
     ]
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        # Lower-case names of accounts that are being created while their password is hashed
+        self._registering: Set[str] = set()
+
     def receive(self, msg, cid=None):
         username = msg["username"]
+        client = self.peer.clients[cid]
+
+        if client.auth_pending:
+            # Only one password per connection may be hashed at a time, otherwise a single
+            # client could take up all slots of the password hasher
+            self.send_busy(cid, "a login of the same client is still pending")
+            return
 
         if msg.get("create", False):
             if not self.cg.server.settings["allow_new_accounts"]:
@@ -60,7 +75,7 @@ class AuthPacket(CGPacket):
                                        }, cid)
                 return
 
-            if username.lower() in self.cg.server.users:
+            if username.lower() in self.cg.server.users or username.lower() in self._registering:
                 # User already exists
                 self.peer.send_message("cg:auth", {
                     "status": "user_exists",
@@ -72,43 +87,30 @@ class AuthPacket(CGPacket):
                     # Invalid username
                     self.peer.send_message("cg:auth", {
                        "status": "wrong_credentials",
-                    })
+                    }, cid)
                     return
                 if "pwd" not in msg or len(msg["pwd"]) >= MAX_PWD_LENGTH:
                     # Invalid password
                     self.peer.send_message("cg:auth", {
                         "status": "wrong_credentials",
-                    })
+                    }, cid)
                     return
 
-                # User does not exist, create it
-                self.cg.info(f"Creating new account with name '{username}'")
-                u = cgserver.user.User(self.cg.server, self.cg, username, {
-                    "pwd": msg["pwd"],
-                    # No uuid necessary, will be created automatically
-                })
-                self.cg.server.users[username.lower()] = u
-                self.cg.server.users_uuid[u.uuid] = u
-
-                self.cg.server.save_server_data()
-
-                self.peer.clients[cid].user = u
-                self.peer.clients[cid].state = STATE_ACTIVE
-
-                u.cid = cid
+                # Hash the password before creating the account, the name is reserved meanwhile
+                pwd = msg["pwd"].encode() if isinstance(msg["pwd"], str) else msg["pwd"]
+                salt = secrets.token_bytes(self.cg.get_config_option("cg:server.secret_length"))
+                iterations = cgserver.user.User.get_pwd_iterations()
 
-                self.cg.server.send_user_data(u.uuid, cid)
+                def done(phash: Optional[bytes]):
+                    client.auth_pending = False
+                    self._registering.discard(username.lower())
+                    self.finish_register(cid, client, username, phash, salt, iterations)
 
-                self.cg.send_event("cg:network.client.register", {"client": cid})
-                self.cg.send_event("cg:network.client.login", {"client": cid})
-
-                self.peer.send_message("cg:auth", {
-                    "status": "logged_in",
-                    "username": u.username,
-                    "uuid": u.uuid.hex,
-                    "pwd": u.pwd,
-                    "serverid": self.cg.server.serverid.hex,
-                }, cid)
+                if not self.cg.server.password_hasher.submit(pwd, salt, iterations, done):
+                    self.send_busy(cid)
+                    return
+                client.auth_pending = True
+                self._registering.add(username.lower())
         else:
             if username.lower() not in self.cg.server.users:
                 # User does not exist
@@ -116,39 +118,104 @@ class AuthPacket(CGPacket):
                     "status": "wrong_credentials",
                 }, cid)
                 return
-            elif self.cg.server.users[username.lower()].check_password(msg.get("pwd", "")):
-                u = self.cg.server.users[username.lower()]
-
-                if u.uuid.hex in self.cg.server.settings["blocklist"]:
-                    self.peer.send_message("cg:auth", {
-                        "status": "blocked",
-                        "username": username.lower()
-                    }, cid)
-                    return
-
-                # Correct password, log in
-                self.cg.info(f"User {username} logged in")
-
-                self.peer.clients[cid].user = u
-                self.peer.clients[cid].state = STATE_ACTIVE
-
-                u.cid = cid
-
-                self.cg.server.send_user_data(u.uuid, cid)
-
-                self.cg.send_event("cg:network.client.login", {"client": cid})
-
-                self.peer.send_message("cg:auth", {
-                    "status": "logged_in",
-                    "username": u.username,
-                    "uuid": u.uuid.hex,
-                    "pwd": u.pwd,
-                    "serverid": self.cg.server.serverid.hex,
-                }, cid)
-            else:
-                # Incorrect credentials
-                self.peer.send_message("cg:auth", {
-                    "status": "wrong_credentials",
-                }, cid)
-                return
 
+            u = self.cg.server.users[username.lower()]
+
+            def done(correct: bool):
+                client.auth_pending = False
+                self.finish_login(cid, client, u, correct)
+
+            # Set beforehand, since plaintext passwords are checked immediately
+            client.auth_pending = True
+            if not u.check_password_async(msg.get("pwd", ""), done):
+                client.auth_pending = False
+                self.send_busy(cid)
+
+    def finish_register(self, cid: int, client, username: str, phash: Optional[bytes], salt: bytes, iterations: int):
+        if self.peer.clients.get(cid, None) is not client:
+            # Client disconnected while hashing
+            return
+
+        if phash is None or username.lower() in self.cg.server.users:
+            self.peer.send_message("cg:auth", {
+                "status": "user_exists" if phash is not None else "wrong_credentials",
+                "username": username.lower(),
+            }, cid)
+            return
+
+        # User does not exist, create it
+        self.cg.info(f"Creating new account with name '{username}'")
+        u = cgserver.user.User(self.cg.server, self.cg, username, {
+            "pwd": phash,
+            "pwd_type": "pbkdf2_hmac-sha256",
+            "pwd_salt": salt,
+            "pwd_iterations": iterations,
+            "uuid": self.cg.server.gen_uuid("user"),
+        })
+        self.cg.server.users[username.lower()] = u
+        self.cg.server.users_uuid[u.uuid] = u
+
+        self.cg.server.save_user(u)
+
+        self.peer.clients[cid].user = u
+        self.peer.clients[cid].state = STATE_ACTIVE
+
+        u.cid = cid
+
+        self.cg.server.send_user_data(u.uuid, cid)
+
+        self.cg.send_event("cg:network.client.register", {"client": cid})
+        self.cg.send_event("cg:network.client.login", {"client": cid})
+
+        self.peer.send_message("cg:auth", {
+            "status": "logged_in",
+            "username": u.username,
+            "uuid": u.uuid.hex,
+            "pwd": u.pwd,
+            "serverid": self.cg.server.serverid.hex,
+        }, cid)
+
+    def finish_login(self, cid: int, client, u: cgserver.user.User, correct: bool):
+        if self.peer.clients.get(cid, None) is not client:
+            # Client disconnected while hashing
+            return
+
+        if not correct:
+            # Incorrect credentials
+            self.peer.send_message("cg:auth", {
+                "status": "wrong_credentials",
+            }, cid)
+            return
+
+        if u.uuid.hex in self.cg.server.settings["blocklist"]:
+            self.peer.send_message("cg:auth", {
+                "status": "blocked",
+                "username": u.username.lower()
+            }, cid)
+            return
+
+        # Correct password, log in
+        self.cg.info(f"User {u.username} logged in")
+
+        self.peer.clients[cid].user = u
+        self.peer.clients[cid].state = STATE_ACTIVE
+
+        u.cid = cid
+
+        self.cg.server.send_user_data(u.uuid, cid)
+
+        self.cg.send_event("cg:network.client.login", {"client": cid})
+
+        self.peer.send_message("cg:auth", {
+            "status": "logged_in",
+            "username": u.username,
+            "uuid": u.uuid.hex,
+            "pwd": u.pwd,
+            "serverid": self.cg.server.serverid.hex,
+        }, cid)
+
+    def send_busy(self, cid: int, reason: str = "too many pending logins"):
+        self.cg.warn(f"Rejecting login of client #{cid}, {reason}")
+        self.peer.send_message("cg:auth", {
+            "status": "busy",
+        }, cid)
@@ -34,6 +34,10 @@ class AnnouncePacket(CGPacket):
         "data",
         "announcer"
     ]
+    key_types = {
+        "type": str,
+        "data": dict,
+    }
 
     def receive(self, msg, cid=None):
         t = msg["type"]
@@ -44,13 +48,13 @@ class AnnouncePacket(CGPacket):
                  "end_yes", "end_no"]:
             self.cg.send_event(f"cg:game.dk.play.{t}", {
                 "player": self.peer.clients[cid].user.uuid.hex
-            })
+            }, scope=self.peer.clients[cid].user.cur_game)
 
         elif t in ["reservation_yes", "reservation_no"]:
             self.cg.send_event("cg:game.dk.reservation", {
                 "player": self.peer.clients[cid].user.uuid.hex,
                 "type": t
-            })
+            }, scope=self.peer.clients[cid].user.cur_game)
 
         elif t in ["solo_yes", "solo_no"]:
             if t == "solo_yes":
@@ -64,37 +68,37 @@ class AnnouncePacket(CGPacket):
                 "player": self.peer.clients[cid].user.uuid.hex,
                 "type": t,
                 "data": msg["data"] if t == "solo_yes" else {}
-            })
+            }, scope=self.peer.clients[cid].user.cur_game)
 
         elif t in ["throw_yes", "throw_no"]:
             self.cg.send_event("cg:game.dk.reservation_throw", {
                 "player": self.peer.clients[cid].user.uuid.hex,
                 "type": t
-            })
+            }, scope=self.peer.clients[cid].user.cur_game)
 
         elif t in ["pigs_yes", "pigs_no"]:
             self.cg.send_event("cg:game.dk.reservation_pigs", {
                 "player": self.peer.clients[cid].user.uuid.hex,
                 "type": t
-            })
+            }, scope=self.peer.clients[cid].user.cur_game)
 
         elif t in ["superpigs_yes", "superpigs_no"]:
             self.cg.send_event("cg:game.dk.reservation_superpigs", {
                 "player": self.peer.clients[cid].user.uuid.hex,
                 "type": t
-            })
+            }, scope=self.peer.clients[cid].user.cur_game)
 
         elif t in ["poverty_yes", "poverty_no"]:
             self.cg.send_event("cg:game.dk.reservation_poverty", {
                 "player": self.peer.clients[cid].user.uuid.hex,
                 "type": t
-            })
+            }, scope=self.peer.clients[cid].user.cur_game)
 
         elif t in ["poverty_accept", "poverty_decline"]:
             self.cg.send_event("cg:game.dk.reservation_poverty_accept", {
                 "player": self.peer.clients[cid].user.uuid.hex,
                 "type": t
-            })
+            }, scope=self.peer.clients[cid].user.cur_game)
 
         elif t == "poverty_return":
             if "data" not in msg:
@@ -107,13 +111,13 @@ class AnnouncePacket(CGPacket):
                 "player": self.peer.clients[cid].user.uuid.hex,
                 "type": t,
                 "data": msg["data"]
-            })
+            }, scope=self.peer.clients[cid].user.cur_game)
 
         elif t in ["wedding_yes", "wedding_no"]:
             self.cg.send_event("cg:game.dk.reservation_wedding", {
                 "player": self.peer.clients[cid].user.uuid.hex,
                 "type": t
-            })
+            }, scope=self.peer.clients[cid].user.cur_game)
 
         elif t == "wedding_clarification_trick":
             if "data" not in msg:
@@ -127,31 +131,31 @@ class AnnouncePacket(CGPacket):
                 "player": self.peer.clients[cid].user.uuid.hex,
                 "type": t,
                 "data": msg["data"]
-            })
+            }, scope=self.peer.clients[cid].user.cur_game)
 
         elif t == "pigs":
             self.cg.send_event("cg:game.dk.call_pigs", {
                 "player": self.peer.clients[cid].user.uuid.hex,
                 "type": t
-            })
+            }, scope=self.peer.clients[cid].user.cur_game)
 
         elif t == "superpigs":
             self.cg.send_event("cg:game.dk.call_superpigs", {
                 "player": self.peer.clients[cid].user.uuid.hex,
                 "type": t
-            })
+            }, scope=self.peer.clients[cid].user.cur_game)
 
         elif t in ["re", "kontra"]:
             self.cg.send_event("cg:game.dk.call_re", {
                 "player": self.peer.clients[cid].user.uuid.hex,
                 "type": t
-            })
+            }, scope=self.peer.clients[cid].user.cur_game)
 
         elif t in ["no90", "no60", "no30", "black"]:
             self.cg.send_event("cg:game.dk.call_denial", {
                 "player": self.peer.clients[cid].user.uuid.hex,
                 "type": t
-            })
+            }, scope=self.peer.clients[cid].user.cur_game)
 
         elif t == "black_sow_solo":
             if "data" not in msg:
@@ -164,19 +168,19 @@ class AnnouncePacket(CGPacket):
                 "player": self.peer.clients[cid].user.uuid.hex,
                 "type": t,
                 "data": msg["data"]
-            })
+            }, scope=self.peer.clients[cid].user.cur_game)
 
         elif t == "throw":
             self.cg.send_event("cg:game.dk.throw", {
                 "player": self.peer.clients[cid].user.uuid.hex,
                 "type": t,
-            })
+            }, scope=self.peer.clients[cid].user.cur_game)
 
         elif t == "ready":
             self.cg.send_event("cg:game.dk.ready", {
                 "player": self.peer.clients[cid].user.uuid.hex,
                 "type": t,
-            })
+            }, scope=self.peer.clients[cid].user.cur_game)
 
         else:
             self.cg.warn(f"Unknown announce of type {t} from client {self.peer.clients[cid].user.uuid}!")
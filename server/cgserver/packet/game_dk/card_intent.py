@@ -20,6 +20,8 @@
 #  You should have received a copy of the GNU General Public License
 #  along with cardgame.  If not, see <http://www.gnu.org/licenses/>.
 #
+import uuid
+
 from peng3dnet import SIDE_SERVER
 
 from cg.constants import STATE_GAME_DK
@@ -36,6 +38,14 @@ class CardIntentPacket(CGPacket):
         "intent",
         "card"
     ]
+    key_types = {
+        "intent": str,
+        # Passing cards during a poverty sends a list of cards
+        "card": (str, list, uuid.UUID),
+    }
+    uuid_keys = [
+        "card",
+    ]
     side = SIDE_SERVER
 
     def receive(self, msg, cid=None):
@@ -47,10 +57,10 @@ class CardIntentPacket(CGPacket):
                 "player": self.peer.clients[cid].user.uuid.hex,
                 "type": t,
                 "card": c
-            })
+            }, scope=self.peer.clients[cid].user.cur_game)
 
         elif t == "play":
             self.cg.send_event("cg:game.dk.play_card", {
                 "player": self.peer.clients[cid].user.uuid.hex,
                 "card": c
-            })
+            }, scope=self.peer.clients[cid].user.cur_game)
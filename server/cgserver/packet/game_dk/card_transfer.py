@@ -40,4 +40,7 @@ class CardTransferPacket(CGPacket):
         "from_slot",
         "to_slot",
     ]
+    uuid_keys = [
+        "card_id",
+    ]
     side = SIDE_CLIENT
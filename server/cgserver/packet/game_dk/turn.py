@@ -40,4 +40,7 @@ class TurnPacket(CGPacket):
         "rebtn_state",
         "pigbtn_state",
     ]
+    uuid_keys = [
+        "current_player",
+    ]
     side = SIDE_CLIENT
@@ -44,4 +44,4 @@ class GameStartPacket(CGPacket):
     def receive(self, msg, cid=None):
         self.cg.send_event("cg:game.dk.ready_to_deal", {
             "player": self.peer.clients[cid].user.uuid.hex
-        })
+        }, scope=self.peer.clients[cid].user.cur_game)
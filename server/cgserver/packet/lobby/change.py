@@ -24,6 +24,8 @@ from cg.constants import STATE_LOBBY, ROLE_CREATOR, ROLE_REMOVE, ROLE_ADMIN
 from cg.packet import CGPacket
 from cg.util import uuidify
 
+import cgserver
+
 
 class ChangePacket(CGPacket):
     state = STATE_LOBBY
@@ -35,6 +37,7 @@ class ChangePacket(CGPacket):
         "game",
         "gamerules",
         "gamerule_validators",
+        "gamerule_validators_hash",
         "supported_bots",
     ]
 
@@ -116,6 +119,18 @@ class ChangePacket(CGPacket):
                 self.cg.server.send_status_message(u, "warning", "cg:msg.lobby.load_game.reset.gamerules")
             lobby.update_gamerules(msg["gamerules"])
 
+        if "gamerule_validators_hash" in msg:
+            # The client does not have the validators cached
+            game_cls = self.cg.server.game_reg.get(lobby.game, cgserver.game.CGame)
+            if msg["gamerule_validators_hash"] != game_cls.get_gamerule_hash():
+                self.cg.warn(f"User {u.username} requested outdated gamerule validators, sending current ones")
+
+            self.cg.server.send_to_user(u, "cg:lobby.change", {
+                "gamerules": lobby.gamerules,
+                "gamerule_validators": game_cls.GAMERULES,
+                "gamerule_validators_hash": game_cls.get_gamerule_hash(),
+            })
+
         if "user_roles" in msg:
             if lobby.user_roles[u.uuid] < ROLE_ADMIN:
                 self.cg.server.send_status_message(u, "warn", "cg:msg.lobby.change_admin.missing_rights")
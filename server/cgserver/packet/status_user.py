@@ -60,7 +60,7 @@ class StatusUserPacket(CGPacket):
                         del self.cg.server.users[u.username]
                         u.username = msg["username"]
                         self.cg.server.users[u.username] = u
-                        self.cg.server.save_server_data()
+                        self.cg.server.save_user(u)
                         # TODO Send not to everyone
                         for user in self.cg.server.users.values():
                             if user.cid is not None:
@@ -93,7 +93,7 @@ class StatusUserPacket(CGPacket):
                         self.cg.server.send_status_message(u, "warn", "cg:msg.status.user.img_name_long")
                         return
                     u.profile_img = msg["profile_img"]
-                    self.cg.server.save_server_data()
+                    self.cg.server.save_user(u)
 
                     # TODO Send not to everyone
                     for user in self.cg.server.users.values():
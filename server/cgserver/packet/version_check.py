@@ -25,7 +25,7 @@ import uuid
 
 from peng3dnet import SIDE_SERVER
 
-from cg.constants import STATE_VERSIONCHECK, STATE_AUTH
+from cg.constants import STATE_VERSIONCHECK, STATE_AUTH, SUPPORTED_FEATURES
 from cg.packet import CGPacket
 
 import cgserver.version
@@ -43,7 +43,11 @@ class VersionCheckPacket(CGPacket):
         "semver",
         "flavor",
         "compatible",
+        "features",
     ]
+    key_types = {
+        "features": list,
+    }
 
     def receive(self, msg, cid=None):
         compatible = not (msg["protoversion"] != cgserver.version.PROTO_VERSION or
@@ -51,6 +55,9 @@ class VersionCheckPacket(CGPacket):
                           msg["flavor"] != cgserver.version.FLAVOR
                           )
 
+        # Only features supported by both sides may be used
+        features = SUPPORTED_FEATURES.intersection(msg.get("features", []))
+
         self.peer.send_message(
             "cg:version.check",
             {
@@ -58,11 +65,13 @@ class VersionCheckPacket(CGPacket):
                 "semver": cgserver.version.SEMVER,
                 "flavor": cgserver.version.FLAVOR,
                 "compatible": compatible,
+                "features": sorted(features),
             },
             cid
         )
 
         if compatible:
+            self.peer.clients[cid].features = features
             self.peer.clients[cid].state = STATE_AUTH
         else:
             # Will not really work, since peng3dnet immediately closes the connection
@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  persistence.py
+#
+#  Copyright 2020 contributors of cardgame
+#
+#  This file is part of cardgame.
+#
+#  cardgame is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  cardgame is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with cardgame.  If not, see <http://www.gnu.org/licenses/>.
+#
+import os
+import threading
+import time
+from typing import Callable, Dict, Hashable, Optional, Tuple, Union
+
+import cg
+import cgserver.scheduler
+
+
+def write_file_atomic(fname: str, data: Union[bytes, str]) -> None:
+    """
+    Writes a file so that it either contains the old or the new data, even after a crash.
+
+    The data is first written to a temporary file next to the target, which then replaces
+    the target via :py:func:`os.replace()`\\ .
+
+    :param str fname: Path of the file to write
+    :param data: Data to write, strings are encoded as UTF-8
+    :return: None
+    """
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+
+    tmpname = f"{fname}.{os.getpid()}.tmp"
+    try:
+        with open(tmpname, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmpname, fname)
+    except BaseException:
+        if os.path.exists(tmpname):
+            os.remove(tmpname)
+        raise
+
+
+class PersistenceService(object):
+    """
+    Write-behind queue moving disk I/O out of the network processing thread.
+
+    Changes are registered with :py:meth:`mark_dirty()` under a key identifying what has
+    changed, e.g. a file name or a user. The actual write is done by a background thread
+    once ``delay`` seconds have passed since the key first became dirty. Marking a key again
+    before it has been written replaces the pending write, so that many changes in quick
+    succession only cause a single write.
+
+    Writes are passed as functions that should only do the I/O itself. Data should be copied
+    or serialized before calling :py:meth:`mark_dirty()`\\ , since the objects it came from
+    may change again before the write happens. Writes are done in the order their keys were
+    last marked.
+
+    :py:meth:`flush()` synchronously writes everything that is still pending and is called
+    on ``cg:shutdown``\\ .
+
+    While :py:attr:`enabled` is false, all changes are discarded instead of being written.
+    """
+
+    def __init__(self, c: cg.CardGame, delay: float = 1.0):
+        self.cg = c
+        self.delay = delay
+
+        # Values are (first marked, write function), ordered by when they were last marked
+        self._pending: Dict[Hashable, Tuple[float, Callable[[], None]]] = {}
+        self._cond = threading.Condition()
+        # Held while writing, so that flush() never overlaps with the background thread
+        self._write_lock = threading.Lock()
+
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self._closed = False
+
+        self.enabled: bool = True
+
+        self.marked: int = 0
+        self.written: int = 0
+        self.failed: int = 0
+        self.duration = cgserver.scheduler.Histogram()
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    @property
+    def coalesced(self) -> int:
+        return self.marked-self.written-self.failed-self.pending
+
+    def mark_dirty(self, key: Hashable, write: Callable[[], None]) -> None:
+        """
+        Schedules a write, replacing any pending write with the same key.
+
+        :param key: Key identifying what is written, e.g. a file name
+        :param write: Function doing the write, called from the background thread
+        :return: None
+        """
+        if not self.enabled:
+            return
+
+        with self._cond:
+            if self._closed:
+                # The stores written to are closed right after shutdown()
+                self.cg.warn(f"Discarding change of {key!r} marked after shutdown")
+                return
+
+            first = self._pending.pop(key, (time.monotonic(), None))[0]
+            self._pending[key] = (first, write)
+            self.marked += 1
+
+            if not self._running:
+                self._start()
+            self._cond.notify()
+
+    def write_file(self, fname: str, data: Union[bytes, str]) -> None:
+        """
+        Schedules an atomic write of a file.
+
+        :param str fname: Path of the file to write
+        :param data: Data to write
+        :return: None
+        """
+        self.mark_dirty(("file", fname), lambda: write_file_atomic(fname, data))
+
+    def _start(self):
+        self._running = True
+        self._thread = threading.Thread(name="cg-persist", target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running:
+                    if self._pending:
+                        first = min(t for t, _ in self._pending.values())
+                        wait = first+self.delay-time.monotonic()
+                        if wait <= 0:
+                            break
+                        self._cond.wait(wait)
+                    else:
+                        self._cond.wait()
+
+                if not self._running:
+                    return
+
+            self._write_pending()
+
+    def _write_pending(self):
+        with self._write_lock:
+            with self._cond:
+                batch = list(self._pending.values())
+                self._pending.clear()
+
+            for first, write in batch:
+                try:
+                    write()
+                except Exception:
+                    self.failed += 1
+                    self.cg.exception("Exception while writing data in the background:")
+                else:
+                    self.written += 1
+                    self.duration.record(time.monotonic()-first)
+
+    def flush(self) -> None:
+        """
+        Writes all pending changes immediately, blocking until they have been written.
+
+        :return: None
+        """
+        self._write_pending()
+
+    def shutdown(self) -> None:
+        """
+        Stops the background thread and writes all pending changes.
+
+        Changes marked afterwards are discarded with a warning instead of being written,
+        since the files and databases they would be written to may already be closed.
+
+        :return: None
+        """
+        with self._cond:
+            self._running = False
+            self._closed = True
+            self._cond.notify()
+            thread = self._thread
+
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        self.flush()
@@ -0,0 +1,290 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  scheduler.py
+#
+#  Copyright 2020 contributors of cardgame
+#
+#  This file is part of cardgame.
+#
+#  cardgame is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  cardgame is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with cardgame.  If not, see <http://www.gnu.org/licenses/>.
+#
+import bisect
+import collections
+import itertools
+import math
+import threading
+from typing import Callable, Dict, Any, Tuple, Hashable, Optional, List, Deque
+
+HISTOGRAM_BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0)
+"""
+Upper bounds in seconds of the buckets used by :py:class:`Histogram`\ .
+
+Values larger than the last bound are counted in an additional overflow bucket.
+"""
+
+
+class Histogram(object):
+    """
+    Histogram of durations in seconds with fixed, roughly logarithmic buckets.
+
+    Recording a value only takes a binary search over :py:data:`HISTOGRAM_BUCKETS`\ ,
+    which allows histograms to be updated all the time without noticeable overhead.
+    """
+
+    def __init__(self):
+        self.counts: List[int] = [0]*(len(HISTOGRAM_BUCKETS)+1)
+        self.count: int = 0
+        self.total: float = 0
+        self.max: float = 0
+
+    def record(self, value: float) -> None:
+        self.counts[bisect.bisect_left(HISTOGRAM_BUCKETS, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def reset(self) -> None:
+        self.counts = [0]*(len(HISTOGRAM_BUCKETS)+1)
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    @property
+    def mean(self) -> float:
+        return self.total/self.count if self.count else 0
+
+    def percentile(self, p: float) -> float:
+        """
+        Returns an upper bound of the given percentile.
+
+        The upper bound of the bucket containing the percentile is returned, or the maximum
+        recorded value if it is smaller.
+
+        :param float p: Percentile between ``0`` and ``100``
+        :return: Upper bound of the percentile in seconds
+        :rtype: float
+        """
+        target = self.count*p/100
+        n = 0
+        for bound, count in zip(HISTOGRAM_BUCKETS, self.counts):
+            n += count
+            if n >= target and n > 0:
+                return min(bound, self.max)
+        return self.max
+
+
+class TimerHandle(object):
+    """
+    Handle of a function scheduled via :py:meth:`TimingWheel.schedule()`\\ .
+
+    The handle can be used to cancel the function before it is called.
+    """
+    __slots__ = ["wheel", "deadline", "tick", "seq", "func", "args", "kwargs", "start_time", "group", "cancelled"]
+
+    def __init__(self, wheel, deadline, tick, seq, func, args, kwargs, start_time, group):
+        self.wheel: "TimingWheel" = wheel
+        self.deadline: float = deadline
+        self.tick: int = tick
+        self.seq: int = seq
+        self.func: Callable = func
+        self.args: Tuple[Any, ...] = args
+        self.kwargs: Dict[str, Any] = kwargs
+        self.start_time: float = start_time
+        self.group: Hashable = group
+        self.cancelled: bool = False
+
+    def cancel(self) -> bool:
+        """
+        Cancels the scheduled function.
+
+        Cancelling a function that has already been called or cancelled has no effect.
+
+        :return: Whether the function was still pending
+        :rtype: bool
+        """
+        return self.wheel.cancel(self)
+
+
+class TimingWheel(object):
+    """
+    Hashed timing wheel used to schedule functions on the server.
+
+    Time is divided into ticks of ``resolution`` seconds, which are mapped onto a ring of
+    ``size`` slots. Scheduling and cancelling a function only touches the slot of its tick
+    and thus takes constant time, no matter how many functions are pending. Functions may
+    be called up to one tick later than requested, but never earlier.
+
+    Functions may optionally belong to a group, usually the :term:`UUID` of a game. All
+    functions of a group can be cancelled at once via :py:meth:`cancel_group()`\\ .
+
+    All methods are thread-safe.
+    """
+
+    def __init__(self, clock: Callable[[], float], resolution: float = 0.01, size: int = 512):
+        self.clock = clock
+        self.resolution = resolution
+        self.size = size
+
+        # Slots are dicts used as ordered sets of handles
+        self.slots: List[Dict[TimerHandle, None]] = [{} for _ in range(size)]
+        self.groups: Dict[Hashable, Dict[TimerHandle, None]] = {}
+        self.count: int = 0
+
+        # Due handles that have not been called yet, in order
+        self._ready: Deque[TimerHandle] = collections.deque()
+
+        self._tick: int = math.floor(clock() / resolution)
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def schedule(self, func: Callable, delay: float, args=(), kwargs=None, group: Hashable = None) -> TimerHandle:
+        """
+        Schedules a function to be called after the given delay.
+
+        :param func: Function to call, will be passed the actual delay as the first argument
+        :param float delay: Delay in seconds
+        :param args: Additional positional arguments for the function
+        :param kwargs: Additional keyword arguments for the function
+        :param group: Optional group the function belongs to
+        :return: Handle that can be used to cancel the function
+        :rtype: TimerHandle
+        """
+        now = self.clock()
+        deadline = now+delay
+
+        with self._lock:
+            # Never schedule into ticks that have already been processed
+            tick = max(math.ceil(deadline / self.resolution), self._tick+1)
+            handle = TimerHandle(
+                self, deadline, tick, next(self._seq), func, args, kwargs or {}, now, group,
+            )
+
+            self.slots[tick % self.size][handle] = None
+            if group is not None:
+                self.groups.setdefault(group, {})[handle] = None
+            self.count += 1
+
+        return handle
+
+    def cancel(self, handle: TimerHandle) -> bool:
+        """
+        Cancels the given scheduled function.
+
+        :param TimerHandle handle: Handle returned by :py:meth:`schedule()`
+        :return: Whether the function was still pending
+        :rtype: bool
+        """
+        with self._lock:
+            return self._cancel(handle)
+
+    def cancel_group(self, group: Hashable) -> int:
+        """
+        Cancels all pending functions of the given group.
+
+        :param group: Group to cancel
+        :return: Number of cancelled functions
+        :rtype: int
+        """
+        with self._lock:
+            handles = self.groups.pop(group, {})
+            for handle in handles:
+                # The group has already been removed as a whole
+                handle.group = None
+                self._cancel(handle)
+            return len(handles)
+
+    def _cancel(self, handle: TimerHandle) -> bool:
+        if handle.cancelled:
+            return False
+        handle.cancelled = True
+
+        # Handles in the ready queue are skipped when popped instead
+        if self.slots[handle.tick % self.size].pop(handle, False) is None:
+            self.count -= 1
+        self._discard_group(handle)
+        return True
+
+    def _discard_group(self, handle: TimerHandle):
+        if handle.group is not None:
+            handles = self.groups.get(handle.group, {})
+            handles.pop(handle, None)
+            if not handles:
+                self.groups.pop(handle.group, None)
+
+    def pop_due(self) -> Optional[TimerHandle]:
+        """
+        Removes and returns the next function that is due to be called.
+
+        Functions are returned in the order of their deadlines. Cancelled functions are
+        never returned.
+
+        :return: Handle of the next due function or ``None`` if no function is due
+        :rtype: Optional[TimerHandle]
+        """
+        with self._lock:
+            if not self._ready:
+                self._advance(math.floor(self.clock() / self.resolution))
+
+            while self._ready:
+                handle = self._ready.popleft()
+                if not handle.cancelled:
+                    handle.cancelled = True  # Prevents cancelling after the fact
+                    self._discard_group(handle)
+                    return handle
+            return None
+
+    def _advance(self, now_tick: int):
+        if now_tick <= self._tick or self.count == 0:
+            self._tick = max(now_tick, self._tick)
+            return
+
+        # After long pauses, every slot only needs to be visited once
+        due = []
+        for tick in range(self._tick+1, self._tick+1+min(now_tick-self._tick, self.size)):
+            slot = self.slots[tick % self.size]
+            handles = [handle for handle in slot if handle.tick <= now_tick]
+            for handle in handles:
+                del slot[handle]
+            due.extend(handles)
+        self.count -= len(due)
+
+        # Slots are visited in the order of the wheel, not of the deadlines. After pauses
+        # longer than a full rotation, a later slot may contain handles of an earlier rotation
+        due.sort(key=lambda h: (h.deadline, h.seq))
+        self._ready.extend(due)
+
+        self._tick = now_tick
+
+    def get_next_delay(self, limit: float) -> float:
+        """
+        Returns the time until the next function is due, but at most ``limit`` seconds.
+
+        :param float limit: Maximum time to return
+        :return: Time in seconds
+        :rtype: float
+        """
+        with self._lock:
+            if self._ready:
+                return 0
+            elif self.count == 0:
+                return limit
+
+            now = self.clock()
+            for tick in range(self._tick+1, self._tick+1+min(math.ceil(limit / self.resolution), self.size)):
+                for handle in self.slots[tick % self.size]:
+                    if handle.tick <= tick:
+                        return max(0, tick*self.resolution - now)
+            return limit
@@ -21,63 +21,536 @@
 #  along with cardgame.  If not, see <http://www.gnu.org/licenses/>.
 #
 
+import collections
 import os
 import queue
 import secrets
+import selectors
 import socket
 import sys
 import time
 import threading
 import uuid
-import heapq
-from typing import Dict, Union, Type, Optional, Callable, List, Any, Tuple
-from dataclasses import dataclass, field
+import zlib
+from typing import Dict, Union, Type, Optional, Callable, List, Any, Tuple, Iterable, FrozenSet, Set
 
 import peng3dnet
 
 import cg
 import cgserver
 
-from cg.constants import STATE_AUTH, MODE_CG, STATE_VERSIONCHECK
+from cg.constants import STATE_AUTH, MODE_CG, STATE_VERSIONCHECK, FEATURE_UUID_BIN
 from cg.util import uuidify
 from cg.util.serializer import msgpack, json
 
 
-@dataclass(order=True)
-class _ScheduledFunction:
-    time: float
-    func: Callable = field(compare=False)
-    flags: int = field(compare=False)
-    start_time: float = field(compare=False)
-    args: Tuple[Any] = field(compare=False)
-    kwargs: Dict[str, Any] = field(compare=False)
+class CGPingConnectionType(peng3dnet.ext.ping.PingConnectionType):
+    """
+    Ping connection type that limits how often each address may ping the server.
+
+    Pings exceeding :py:attr:`CGServer.ping_rate_limit` are answered by closing the connection.
+    """
+
+    def receive(self, msg, pid, flags, cid):
+        if pid == 64 and cid is not None and not self.peer.check_ping_rate(cid):
+            self.peer.close_connection(cid, "pingratelimit")
+            return True
+
+        return super().receive(msg, pid, flags, cid)
 
 
 class CGServer(peng3dnet.ext.ping.PingableServerMixin, peng3dnet.net.Server):
+    """
+    Network server of the :py:class:`DedicatedServer`\ .
+
+    Messages sent from within the network processing thread are not written individually.
+    Instead, they are encoded immediately and collected per client until the end of the
+    current iteration of the main loop, where all messages of a client are written to its
+    socket at once. Since every message keeps its own length prefix, this is transparent to
+    the client but greatly reduces the number of writes and TCP packets, e.g. while dealing.
+
+    The messages of a client are written early if they have been waiting for longer than
+    :py:attr:`send_max_latency` seconds or take up more than :py:attr:`send_max_buffer`
+    bytes. Messages sent from other threads are written immediately. Internal messages of
+    peng3dnet are written directly after any messages still waiting for the same client.
+
+    If more than :py:attr:`send_max_queue` bytes are still waiting in the socket buffer of
+    a client, new messages are held back until the client catches up. While held back,
+    older messages of a type listed in :py:attr:`superseded_packets` are dropped whenever
+    a newer one is sent. Clients that stay behind for longer than :py:attr:`send_max_stall`
+    seconds or accumulate more than :py:attr:`send_max_pending` held back messages are
+    disconnected, which keeps the memory used per connection bounded.
+    """
+
     cg: cg.CardGame
+    cgserver: "DedicatedServer"
+
+    send_max_latency: float = 0
+    """
+    Maximum time in seconds that a message may wait before being sent.
+
+    A value of ``0`` disables the collection of messages.
+    """
+
+    send_max_buffer: int = 0
+    """
+    Maximum number of bytes that may be waiting to be sent to a single client.
+    """
+
+    send_max_queue: int = 0
+    """
+    Number of bytes in the socket buffer of a client above which messages are held back.
+    """
+
+    send_max_pending: int = 0
+    """
+    Maximum number of held back messages per client before it is disconnected.
+    """
+
+    send_max_stall: float = 0
+    """
+    Maximum time in seconds that messages may be held back before the client is disconnected.
+    """
+
+    compress_enabled: bool = True
+    """
+    Whether large messages should be compressed.
+
+    Compressed messages are flagged in their header, which all peng3dnet peers understand.
+    """
+
+    compress_threshold: int = 1024
+    """
+    Minimum size in bytes of an encoded message before it is compressed.
+
+    Most packets are much smaller and are always sent uncompressed.
+    """
+
+    compress_level: int = 6
+    """
+    zlib compression level between ``1`` (fastest) and ``9`` (smallest).
+    """
+
+    ping_cache_ttl: float = 1.0
+    """
+    Maximum time in seconds that a cached ping response is reused.
+
+    The cache is also cleared whenever the settings or the list of online players change.
+    """
+
+    ping_rate_limit: int = 10
+    """
+    Maximum number of pings accepted from a single address within :py:attr:`ping_rate_window` seconds.
+
+    A value of ``0`` disables the limit.
+    """
+
+    ping_rate_window: float = 10.0
+    """
+    Length in seconds of the window used for :py:attr:`ping_rate_limit`\ .
+    """
+
+    superseded_packets = {"cg:game.dk.turn"}
+    """
+    Packets that fully replace the state sent by earlier packets of the same type.
+
+    Pending older packets of these types are dropped if a newer one is sent to the same client
+    while its messages are held back, see :py:attr:`send_max_queue`\ .
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        # Maps the cid to the encoded messages waiting to be sent and their total size
+        self._outbox: Dict[int, List[Tuple[Any, bytes]]] = {}
+        self._outbox_size: Dict[int, int] = {}
+        self._outbox_time: Dict[int, float] = {}
+        self._outbox_lock = threading.Lock()
+
+        # Clients to disconnect once the outbox lock has been released
+        self._slow_clients: List[int] = []
+
+        self.queue_high_water: int = 0
+        self.slow_disconnects: int = 0
+
+        self._ping_cache: Optional[Dict[str, Any]] = None
+        self._ping_cache_time: float = 0
+        # Maps addresses to the start of their current window and the number of pings in it
+        self._ping_rate: Dict[str, List] = {}
+        self._ping_lock = threading.Lock()
+
+        self.ping_count: int = 0
+        self.ping_cache_hits: int = 0
+        self.ping_rate_limited: int = 0
+
+        # Compression statistics, sizes are in bytes before and after compression
+        self.compress_count: int = 0
+        self.compress_skipped: int = 0
+        self.compress_bytes_in: int = 0
+        self.compress_bytes_out: int = 0
+        self.compress_time: float = 0
+
+        # Clients whose packets have been recorded to the event journal
+        self._journaled_cids: Set[int] = set()
+
+    def receive_packet(self, data, cid):
+        journal = self.cg.event_manager.journal
+        if journal is not None:
+            self._record_packet(journal, data, cid)
+
+        super().receive_packet(data, cid)
+
+    def _record_packet(self, journal: cg.journal.EventJournal, data: bytes, cid: int):
+        # Called from the thread reading the sockets, before the packet is processed
+        client = self.clients.get(cid, None)
+        pid, flags = peng3dnet.net.STRUCT_HEADER.unpack(data[:peng3dnet.net.STRUCT_HEADER.size])
+        if (client is None or pid < 64
+                or client.conntype != peng3dnet.constants.CONNTYPE_CLASSIC):
+            # Handshakes and pings do not change the state of the server
+            return
+
+        if cid not in self._journaled_cids:
+            self._journaled_cids.add(cid)
+            journal.record("cg:journal.connect", {
+                "cid": cid,
+                "addr": list(client.addr),
+                "conntype": client.conntype,
+            })
+
+        # Stored by name, since packet IDs may differ between versions
+        journal.record("cg:journal.packet", {
+            "cid": cid,
+            "packet": self.registry.getStr(pid),
+            "flags": flags,
+            "data": data[peng3dnet.net.STRUCT_HEADER.size:],
+        })
+
+    def record_close(self, cid: int, reason=None):
+        """
+        Records the disconnect of a client to the event journal, if its packets were recorded.
+
+        :param int cid: Client ID of the client
+        :param reason: Reason of the disconnect
+        :return: None
+        """
+        journal = self.cg.event_manager.journal
+        if cid in self._journaled_cids:
+            self._journaled_cids.discard(cid)
+            if journal is not None:
+                journal.record("cg:journal.close", {"cid": cid, "reason": reason})
+
+    def send_message(self, ptype, data, cid):
+        if (isinstance(ptype, int) and ptype < 64) or (isinstance(ptype, str) and ptype.startswith("peng3dnet:")):
+            client = self.clients.get(cid, None)
+            if client is not None and client.conn is None:
+                # Clients replayed from a journal cannot receive internal messages
+                return
+
+            # Internal messages like closing the connection must not be held back, but should
+            # still arrive after all messages sent before them
+            if cid in self._outbox:
+                with self._outbox_lock:
+                    self._flush_client(cid)
+            super().send_message(ptype, data, cid)
+            return
+
+        client = self.clients.get(cid, None)
+        msg = self._encode_message(ptype, data, client.features if client is not None else frozenset())
+
+        with self._outbox_lock:
+            self._queue_message(ptype, msg, cid, time.monotonic())
+
+        self._close_slow_clients()
+
+    def send_message_many(self, ptype, data, cids: List[int]):
+        """
+        Sends the same message to multiple clients.
+
+        The message is only encoded once per set of negotiated protocol features and the
+        resulting bytes are shared between all recipients, which is much cheaper than
+        calling :py:meth:`send_message()` for every client.
+
+        Internal peng3dnet messages are sent to each client individually.
+
+        :param ptype: Packet type
+        :param data: Data of the message
+        :param cids: Client IDs of all recipients
+        :return: None
+        """
+        if not cids:
+            return
+
+        if (isinstance(ptype, int) and ptype < 64) or (isinstance(ptype, str) and ptype.startswith("peng3dnet:")):
+            for cid in cids:
+                self.send_message(ptype, data, cid)
+            return
+
+        encoded: Dict[FrozenSet[str], bytes] = {}
+        now = time.monotonic()
+
+        with self._outbox_lock:
+            for cid in cids:
+                client = self.clients.get(cid, None)
+                features = client.features if client is not None else frozenset()
+                msg = encoded.get(features, None)
+                if msg is None:
+                    msg = encoded[features] = self._encode_message(ptype, data, features)
+                self._queue_message(ptype, msg, cid, now)
+
+        self._close_slow_clients()
+
+    def _queue_message(self, ptype, msg: bytes, cid: int, now: float):
+        # Must be called while holding the outbox lock
+        outbox = self._outbox.get(cid, None)
+        if outbox is None:
+            outbox = self._outbox[cid] = []
+            self._outbox_size[cid] = 0
+            self._outbox_time[cid] = now
+        elif ptype in self.superseded_packets:
+            # Clients rely on receiving every message unless they cannot keep up anyway, e.g.
+            # the first cg:game.dk.turn of a round is needed to rotate the table
+            client = self.clients.get(cid, None)
+            if client is not None and client.stalled_since is not None:
+                self._drop_superseded(cid, ptype)
+
+        outbox.append((ptype, msg))
+        self._outbox_size[cid] += len(msg)
+
+        if (self.send_max_latency <= 0
+                or threading.current_thread() is not self.cgserver.process_thread
+                or self._outbox_size[cid] >= self.send_max_buffer
+                or now - self._outbox_time[cid] >= self.send_max_latency):
+            self._flush_client(cid)
+
+    def flush_messages(self):
+        """
+        Sends all messages that are waiting to be sent.
+
+        Called by the network processing thread at the end of every iteration.
+
+        :return: None
+        """
+        if not self._outbox:
+            return
+
+        with self._outbox_lock:
+            for cid in list(self._outbox.keys()):
+                self._flush_client(cid)
+
+        self._close_slow_clients()
+
+    def _encode_message(self, ptype, data, features: FrozenSet[str]) -> bytes:
+        if FEATURE_UUID_BIN in features:
+            packet = self.registry.getObj(ptype)
+            if getattr(packet, "uuid_keys", None):
+                data = packet.pack_uuids(data)
+
+        # Same encoding as peng3dnet.net.Server.send_message()
+        data = peng3dnet.net.msgpack.dumps(data)
+
+        flags = 0
+
+        if self.compress_enabled and len(data) >= self.compress_threshold:
+            start = time.perf_counter()
+            compressed = zlib.compress(data, self.compress_level)
+            self.compress_time += time.perf_counter()-start
+
+            if len(compressed) < len(data):
+                self.compress_count += 1
+                self.compress_bytes_in += len(data)
+                self.compress_bytes_out += len(compressed)
+
+                data = compressed
+                flags |= peng3dnet.constants.FLAG_COMPRESSED
+            else:
+                # Not worth making the client decompress it
+                self.compress_skipped += 1
+
+        data = peng3dnet.net.STRUCT_HEADER.pack(self.registry.getInt(ptype), flags) + data
+        return peng3dnet.net.STRUCT_LENGTH32.pack(len(data)) + data
+
+    def _drop_superseded(self, cid: int, ptype):
+        # Must be called while holding the outbox lock
+        outbox = self._outbox[cid]
+        kept = [(p, msg) for p, msg in outbox if p != ptype]
+        dropped = len(outbox)-len(kept)
+        if dropped:
+            outbox[:] = kept
+            self._outbox_size[cid] = sum(len(msg) for _, msg in kept)
+
+            client = self.clients.get(cid, None)
+            if client is not None:
+                client.dropped_messages += dropped
+
+    def _flush_client(self, cid: int):
+        # Must be called while holding the outbox lock
+        if cid not in self._outbox:
+            return
+
+        client = self.clients.get(cid, None)
+        if client is None:
+            # Client disconnected in the meantime
+            self._outbox.pop(cid, None)
+            self._outbox_size.pop(cid, None)
+            self._outbox_time.pop(cid, None)
+            return
+
+        # Copying the deque is atomic, while iterating over it is not
+        queued = sum(map(len, tuple(client.write_queue)))
+        if queued > self.send_max_queue:
+            # The client cannot keep up, hold back its messages
+            now = time.monotonic()
+            if client.stalled_since is None:
+                client.stalled_since = now
+            elif (now - client.stalled_since > self.send_max_stall
+                  or len(self._outbox[cid]) > self.send_max_pending):
+                self._slow_clients.append(cid)
+            return
+        client.stalled_since = None
+
+        outbox = self._outbox.pop(cid)
+        self._outbox_time.pop(cid)
+        size = self._outbox_size.pop(cid)
+
+        queued += size
+        client.queue_high_water = max(client.queue_high_water, queued)
+        self.queue_high_water = max(self.queue_high_water, queued)
+
+        if client.conn is not None:
+            client.write_queue.append(b"".join(msg for _, msg in outbox))
+            with self._selector_lock:
+                if not (self.selector.get_key(client.conn).events & selectors.EVENT_WRITE):
+                    self.selector.modify(client.conn, selectors.EVENT_READ | selectors.EVENT_WRITE,
+                                         [self._client_ready, client])
+                    self.interrupt()
+        # Clients replayed from a journal have no connection, but the send handlers still
+        # have to run, since they change the state of the client
+
+        for ptype, msg in outbox:
+            if not self.conntypes[client.conntype].send(msg, ptype, cid):
+                client.on_send(ptype, msg)
+                self.sendEvent("peng3dnet:server.connection.send", {"client": client, "pid": ptype, "data": msg})
+                self.registry.getObj(ptype)._send(msg, cid)
+
+    def _close_slow_clients(self):
+        if not self._slow_clients:
+            return
+
+        with self._outbox_lock:
+            cids, self._slow_clients = self._slow_clients, []
+
+        for cid in set(cids):
+            client = self.clients.get(cid, None)
+            if client is None:
+                continue
+
+            self.cg.warn(f"Disconnecting client #{cid} because it could not keep up with the sent messages")
+            self.slow_disconnects += 1
+            # Closing normally would wait for the stalled write queue to be sent first
+            client.close("slow consumer")
+
+            with self._outbox_lock:
+                self._outbox.pop(cid, None)
+                self._outbox_size.pop(cid, None)
+                self._outbox_time.pop(cid, None)
+
+    def _reg_conntypes_ping(self):
+        self.addConnType("ping", CGPingConnectionType(self))
+
+    def check_ping_rate(self, cid: int) -> bool:
+        """
+        Checks whether the address of the given client may still ping the server.
+
+        :param int cid: Client ID of the ping connection
+        :return: Whether the ping should be answered
+        :rtype: bool
+        """
+        if self.ping_rate_limit <= 0:
+            return True
+
+        addr = self.clients[cid].addr[0]
+        now = time.monotonic()
+
+        with self._ping_lock:
+            if len(self._ping_rate) > 1024:
+                # Forget addresses that have not pinged for a while
+                self._ping_rate = {
+                    a: r for a, r in self._ping_rate.items() if now - r[0] < self.ping_rate_window
+                }
+
+            rate = self._ping_rate.get(addr, None)
+            if rate is None or now - rate[0] >= self.ping_rate_window:
+                rate = self._ping_rate[addr] = [now, 0]
+
+            rate[1] += 1
+            if rate[1] > self.ping_rate_limit:
+                self.ping_rate_limited += 1
+                if rate[1] == self.ping_rate_limit+1:
+                    # Only log once per window to prevent ping floods from flooding the log as well
+                    self.cg.warn(f"Address {addr} exceeded the ping rate limit")
+                return False
+
+        return True
+
+    def invalidate_ping_cache(self):
+        """
+        Clears the cached ping response.
+
+        Should be called whenever any data contained in the ping response changes.
+
+        :return: None
+        """
+        self._ping_cache = None
 
     def getPingData(self, msg, cid):
         c = self.clients[cid]
-        self.cg.info(f"Server Ping by Client #{cid} with IP Address {c.addr[0]}:{c.addr[1]}")
-
-        return {
-            "name": self.cg.server.settings["name"],
-            "visiblename": self.cg.server.settings["visiblename"],
-            "slogan": self.cg.server.settings["slogan"],
-            "maxplayers": self.cg.server.settings["max_players"],
-            #"canonical_address": socket.getfqdn(),
-            "playercount": len(self.clients),  # TODO: don't include ping clients
-            "playerlist": [],  # TODO: implement player list
-            "canlogon": True,  # TODO: implement properly
-            "version": self.cg.get_proto_version(),
-            "flavor": cgserver.version.FLAVOR,
-            "timestamp": time.time(),
-        }
+        self.cg.debug(f"Server Ping by Client #{cid} with IP Address {c.addr[0]}:{c.addr[1]}")
+
+        self.ping_count += 1
+
+        now = time.monotonic()
+        data = self._ping_cache
+        if data is None or now - self._ping_cache_time > self.ping_cache_ttl:
+            players = list(self.cgserver.online_users.values())
+            data = {
+                "name": self.cg.server.settings["name"],
+                "visiblename": self.cg.server.settings["visiblename"],
+                "slogan": self.cg.server.settings["slogan"],
+                "maxplayers": self.cg.server.settings["max_players"],
+                #"canonical_address": socket.getfqdn(),
+                "playercount": len(players),
+                "playerlist": players,
+                "canlogon": True,  # TODO: implement properly
+                "version": self.cg.get_proto_version(),
+                "flavor": cgserver.version.FLAVOR,
+            }
+            self._ping_cache = data
+            self._ping_cache_time = now
+        else:
+            self.ping_cache_hits += 1
+
+        # The response is copied by peng3dnet, only the timestamp has to be current
+        return dict(data, timestamp=time.time())
 
 
 class ClientOnCGServer(peng3dnet.net.ClientOnServer):
     user: Optional[cgserver.user.User] = None
 
+    # Outbound queue statistics, see CGServer
+    queue_high_water: int = 0
+    dropped_messages: int = 0
+    stalled_since: Optional[float] = None
+
+    features: FrozenSet[str] = frozenset()
+    """
+    Protocol features negotiated with this client, see :py:data:`cg.constants.SUPPORTED_FEATURES`\ .
+    """
+
+    auth_pending: bool = False
+    """
+    Whether a ``cg:auth`` request of this client is waiting for its password to be hashed.
+    """
+
     def on_handshake_complete(self):
         super().on_handshake_complete()
 
@@ -97,9 +570,14 @@ class ClientOnCGServer(peng3dnet.net.ClientOnServer):
     def on_close(self, reason=None):
         super().on_close(reason)
 
+        self.server.record_close(self.cid, reason)
+
         if self.user is not None:
             self.user.cid = None
 
+            self.server.cgserver.online_users.pop(self.user.uuid, None)
+            self.server.invalidate_ping_cache()
+
             if self.user.lobby is not None:
                 self.server.cg.info(f"Removing user {self.user.username} from lobby due to disconnect")
                 self.server.cgserver.lobbies[self.user.lobby].remove_user(self.user.uuid, left=True)
@@ -133,6 +611,8 @@ class ClientOnCGServer(peng3dnet.net.ClientOnServer):
 
 class DedicatedServer(object):
     PROCESS_TIMEOUT = 0.01
+    PROCESS_BUDGET = 0.05
+    PROCESS_MAX_WAIT = 1.0
 
     command_manager = cgserver.command.CommandManager
 
@@ -145,6 +625,9 @@ class DedicatedServer(object):
 
         self.settings = {}
 
+        # Maps the UUIDs of all logged in users to their names, excluding ping connections and bots
+        self.online_users: Dict[uuid.UUID, str] = {}
+
         self.register_event_handlers()
 
         self.command_manager = cgserver.command.CommandManager(self.cg)
@@ -158,6 +641,29 @@ class DedicatedServer(object):
         )
         self.server.cg = self.cg
         self.server.cgserver = self
+        self.server.send_max_latency = self.cg.get_config_option("cg:server.send.max_latency")
+        self.server.send_max_buffer = self.cg.get_config_option("cg:server.send.max_buffer")
+        self.server.send_max_queue = self.cg.get_config_option("cg:server.send.max_queue")
+        self.server.send_max_pending = self.cg.get_config_option("cg:server.send.max_pending")
+        self.server.send_max_stall = self.cg.get_config_option("cg:server.send.max_stall")
+        self.server.compress_enabled = self.cg.get_config_option("cg:server.compress.enabled")
+        self.server.compress_threshold = self.cg.get_config_option("cg:server.compress.threshold")
+        self.server.compress_level = self.cg.get_config_option("cg:server.compress.level")
+        self.server.ping_cache_ttl = self.cg.get_config_option("cg:server.ping.cache_ttl")
+        self.server.ping_rate_limit = self.cg.get_config_option("cg:server.ping.rate_limit")
+        self.server.ping_rate_window = self.cg.get_config_option("cg:server.ping.rate_window")
+
+        self.password_hasher = cgserver.hashing.PasswordHasher(
+            self.cg, self,
+            workers=self.cg.get_config_option("cg:server.auth.workers"),
+            max_pending=self.cg.get_config_option("cg:server.auth.max_pending"),
+            processes=self.cg.get_config_option("cg:server.auth.processes"),
+        )
+
+        self.persistence = cgserver.persistence.PersistenceService(
+            self.cg,
+            delay=self.cg.get_config_option("cg:server.persist.delay"),
+        )
 
         # Allow for last-minute changes and monkeypatches
         self.cg.send_event("cg:network.server.create", {"server": self, "peer": self})
@@ -195,15 +701,24 @@ class DedicatedServer(object):
 
         self.users: Dict[str, cgserver.user.User] = {}
         self.users_uuid: Dict[uuid.UUID, cgserver.user.User] = {}
+        # Opened by load_server_data()
+        self.user_store: Optional[cgserver.userstore.UserStore] = None
 
         self.run_console = False
         self.interactive_thread = None
 
         self.process_thread: Optional[threading.Thread] = None
 
-        self.scheduled_events: List[_ScheduledFunction] = []
+        # Monotonic, so that changes of the system clock do not stall or reorder timers
+        self.scheduler = cgserver.scheduler.TimingWheel(time.monotonic)
+        self.timer_lateness: Dict[str, cgserver.scheduler.Histogram] = {}
+        self.loop_duration = cgserver.scheduler.Histogram()
+        self.process_iterations: int = 0
+        self.process_stats_start: float = time.time()
         self.event_queue = queue.Queue()
-        self.process_lock = threading.Lock()
+
+        # Random values recorded in the journal being replayed, by their kind
+        self._replay_values: Dict[str, collections.deque] = {}
 
         self.load_settings()
 
@@ -212,14 +727,193 @@ class DedicatedServer(object):
 
         self.run_interactive_console()
 
-    def start_listening(self):
+    def start_listening(self, record=True):
         self.server.runAsync()
         #self.server.process_async()
 
+        journal_file = self.cg.get_config_option("cg:debug.event.journal_file")
+        if record and journal_file != "":
+            # Only record after startup, events sent during initialization are not replayable
+            self.start_journal(os.path.join(self.cg.get_instance_path(), journal_file))
+
         self.process_thread = threading.Thread(name="Network Processing Thread", target=self.run_process)
         self.process_thread.daemon = True
         self.process_thread.start()
 
+    def start_journal(self, fname: str):
+        """
+        Starts recording an event journal that can be replayed by :py:meth:`replay_journal()`\ .
+
+        Besides all events, the journal contains a snapshot of all users and settings, all
+        packets received from clients and all random values that clients may refer to, like
+        the :term:`UUID` of lobbies and cards.
+
+        .. warning::
+           Journals contain the password hashes of all users and the passwords of all users
+           logging in while recording. They should be handled like the server data itself.
+
+        :param str fname: Path of the journal file, will be overwritten if it exists
+        :return: None
+        """
+        self.cg.event_manager.start_journal(fname)
+
+        self.cg.event_manager.journal.record("cg:journal.snapshot", {
+            "serverid": self.serverid,
+            "secret": self.secret,
+            "settings": self.settings,
+            "users": {
+                u.username: u.serialize() for u in self.users.values()
+                if not isinstance(u, cgserver.user.BotUser)
+            },
+        })
+
+    def gen_random(self, kind: str, factory: Callable[[], Any]) -> Any:
+        """
+        Generates a random value that may be referred to by clients.
+
+        While replaying a journal, the values recorded in the journal are returned in the
+        order they were generated, so that replayed packets refer to the same objects as the
+        original packets. While recording a journal, the value is recorded.
+
+        :param str kind: What the value is used for, values of each kind are replayed separately
+        :param factory: Function generating a new value
+        :return: The generated value
+        """
+        values = self._replay_values.get(kind, None)
+        if values:
+            return values.popleft()
+
+        value = factory()
+
+        journal = self.cg.event_manager.journal
+        if journal is not None:
+            journal.record("cg:journal.random", {"kind": kind, "value": value})
+
+        return value
+
+    def gen_uuid(self, kind: str) -> uuid.UUID:
+        """
+        Generates a new random :term:`UUID`\ , see :py:meth:`gen_random()`\ .
+
+        :param str kind: What the UUID identifies, e.g. ``lobby``
+        :return: The generated UUID
+        :rtype: uuid.UUID
+        """
+        return self.gen_random(kind, uuid.uuid4)
+
+    def replay_journal(self, fname: str, speed: float = 1.0):
+        """
+        Replays a journal recorded by :py:meth:`start_journal()` into this server.
+
+        First, the users and settings are replaced by the snapshot stored at the start of the
+        journal. Then, every recorded client is recreated as a client without a connection and
+        its packets are processed by the network processing thread just like packets received
+        over the network. :py:meth:`start_listening()` must thus have been called before.
+
+        Nothing is saved while replaying, since the users and settings are no longer those of
+        this server. Scheduled functions run at their usual delays, replaying faster than the
+        original speed may thus cause games to diverge from the recording. Bots are not replayed
+        exactly either, since they make their own random decisions.
+
+        :param str fname: Path of the journal file
+        :param float speed: Factor to speed up the original timing by, ``0`` replays as fast as possible
+        :return: Tuple of the number of replayed packets and the time it took to process them
+        """
+        self.cg.info(f"Replaying event journal {fname} at {'maximum' if speed <= 0 else f'{speed}x'} speed")
+
+        # Events are caused again by the replayed packets, only the inputs are needed
+        entries = [e for e in cg.journal.read_journal(fname) if e.depth == cg.journal.INPUT_DEPTH]
+
+        self.persistence.enabled = False
+
+        self._replay_values = {}
+        for entry in entries:
+            if entry.event == "cg:journal.snapshot":
+                self._restore_snapshot(entry.data)
+            elif entry.event == "cg:journal.random":
+                self._replay_values.setdefault(entry.data["kind"], collections.deque()).append(entry.data["value"])
+
+        # Maps the recorded client IDs to the replayed clients
+        clients: Dict[int, ClientOnCGServer] = {}
+
+        count = 0
+        start = time.perf_counter()
+        first = None
+        for entry in entries:
+            if speed > 0:
+                if first is None:
+                    first = entry.time
+                delay = (entry.time - first) / speed - (time.perf_counter() - start)
+                if delay > 0:
+                    time.sleep(delay)
+            else:
+                # Packets may depend on passwords being hashed for previous packets
+                self._wait_replay_idle()
+
+            if entry.event == "cg:journal.connect":
+                client = ClientOnCGServer(self.server, None, tuple(entry.data["addr"]), self.server.genCID())
+                client.conntype = entry.data["conntype"]
+                self.server.clients[client.cid] = client
+                client.on_handshake_complete()
+                clients[entry.data["cid"]] = client
+            elif entry.event == "cg:journal.packet":
+                client = clients[entry.data["cid"]]
+                header = peng3dnet.net.STRUCT_HEADER.pack(
+                    self.server.registry.getInt(entry.data["packet"]), entry.data["flags"],
+                )
+                self.server.receive_packet(header+entry.data["data"], client.cid)
+                count += 1
+            elif entry.event == "cg:journal.close":
+                # Must be done after all packets of the client have been processed
+                self.schedule_function(self._close_replayed, 0, 0, clients.pop(entry.data["cid"]), entry.data["reason"])
+
+        # Wait for the processing thread to catch up
+        self._wait_replay_idle()
+
+        dt = time.perf_counter() - start
+        self.cg.info(f"Replayed {count} packets in {dt:.3f}s ({count / max(dt, 1e-9):.1f} packets/s)")
+        return count, dt
+
+    def _restore_snapshot(self, data: Dict[str, Any]):
+        self.serverid = uuidify(data["serverid"])
+        self.secret = data["secret"]
+
+        self.settings = data["settings"]
+        self.server.invalidate_ping_cache()
+
+        self.users = {}
+        self.users_uuid = {}
+        for username, udat in data["users"].items():
+            u = cgserver.user.User(self, self.cg, username, udat)
+            self.users[username] = u
+            self.users_uuid[u.uuid] = u
+
+        self.cg.info(f"Restored {len(self.users)} users from journal snapshot")
+
+    def _close_replayed(self, dt, client: ClientOnCGServer, reason):
+        client.close(reason)
+
+    def _wait_replay_idle(self):
+        idle_since = None
+        while self.server.run:
+            if not (self.server._process_queue.empty()
+                    and self.event_queue.empty()
+                    and self.password_hasher.pending == 0
+                    and self.scheduler.get_next_delay(self.PROCESS_MAX_WAIT) > 0):
+                idle_since = None
+                time.sleep(self.PROCESS_TIMEOUT)
+                continue
+
+            # A packet may have been taken from the queue, but is only guaranteed to be done
+            # once an iteration started after the check has finished
+            if idle_since is None:
+                idle_since = self.process_iterations
+            elif self.process_iterations >= idle_since+2:
+                return
+
+            self.wake_process()
+            time.sleep(self.PROCESS_TIMEOUT / 10)
+
     def start_interactive_console(self):
         self.interactive_thread = threading.Thread(name="Server Management Console Thread", target=self.run_interactive_console)
         self.interactive_thread.daemon = True
@@ -244,75 +938,198 @@ class DedicatedServer(object):
             sys.stdout.flush()
 
     def run_process(self):
+        """
+        Main loop of the network processing thread.
+
+        Each iteration processes all received packets, all due scheduled functions and all
+        queued events. Scheduled functions and queued events share a time budget of
+        :py:attr:`PROCESS_BUDGET` seconds per iteration, so that received packets are not
+        delayed indefinitely under load. Both are processed alternately, so that neither can
+        use up the whole budget while the other is waiting. Any work left over is processed
+        in the next iteration without waiting.
+
+        If there is nothing to do, the thread sleeps until either a packet arrives, an event
+        is queued, or the next scheduled function is due.
+        """
+        cond = self.server._process_condition
         while self.server.run:
-            self.server.process(wait=True, timeout=self.PROCESS_TIMEOUT)
-
-            if not self.event_queue.empty():
-                try:
-                    event, data = self.event_queue.get_nowait()
-                except queue.Empty:
-                    pass
-                else:
-                    self.cg.send_event(event, data)
-
-            sched_func = None
-            with self.process_lock:
-                if len(self.scheduled_events) > 0 and self.scheduled_events[0].time <= time.time():
-                    sched_func = heapq.heappop(self.scheduled_events)
-
-            if sched_func is not None:
-                try:
-                    sched_func.func(time.time() - sched_func.start_time, *sched_func.args, **sched_func.kwargs)
-                except Exception:
-                    self.cg.error(f"Error while calling scheduled function:")
-                    self.cg.exception("Exception within scheduled function")
+            with cond:
+                # Checked while holding the lock, so wake-ups cannot get lost
+                if self.server._process_queue.empty() and self.event_queue.empty():
+                    cond.wait(self.scheduler.get_next_delay(self.PROCESS_MAX_WAIT))
+
+            start = time.perf_counter()
+            self.server.process()
+
+            deadline = time.perf_counter() + self.PROCESS_BUDGET
+
+            timers = events = True
+            while (timers or events) and time.perf_counter() < deadline:
+                if timers:
+                    timers = self._call_next_timer()
+                if events and time.perf_counter() < deadline:
+                    events = self._send_next_event()
 
             self.cg.process_async_events()
 
-    def schedule_function(self, func: Callable, delay: float, flags=0, *args, **kwargs):
-        with self.process_lock:
-            sched_func = _ScheduledFunction(time.time()+delay, func, flags, time.time(), args, kwargs)
-            heapq.heappush(self.scheduled_events, sched_func)
+            # Send all messages of this iteration at once
+            self.server.flush_messages()
 
-    def load_server_data(self):
-        fname = self.cg.get_settings_path("serverdat.csd")
+            self.loop_duration.record(time.perf_counter() - start)
+            self.process_iterations += 1
 
-        # First, check if the data file exists and is a file
-        if not (os.path.exists(fname) and os.path.isfile(fname)):
-            self.cg.warn("Generating new server data because serverdat.csd was not found")
-            self.gen_server_data()
-            return
+    def _call_next_timer(self) -> bool:
+        # Returns whether a scheduled function was due
+        sched_func = self.scheduler.pop_due()
+        if sched_func is None:
+            return False
+
+        now = self.scheduler.clock()
+        self._record_lateness(sched_func, now - sched_func.deadline)
+
+        try:
+            sched_func.func(now - sched_func.start_time, *sched_func.args, **sched_func.kwargs)
+        except Exception:
+            self.cg.error(f"Error while calling scheduled function:")
+            self.cg.exception("Exception within scheduled function")
+        return True
+
+    def _send_next_event(self) -> bool:
+        # Returns whether an event was queued
+        try:
+            event, data, scope = self.event_queue.get_nowait()
+        except queue.Empty:
+            return False
+
+        self.cg.send_event(event, data, scope)
+        return True
+
+    def _record_lateness(self, sched_func: cgserver.scheduler.TimerHandle, lateness: float):
+        name = getattr(sched_func.func, "__qualname__", repr(sched_func.func))
+        hist = self.timer_lateness.get(name, None)
+        if hist is None:
+            hist = self.timer_lateness[name] = cgserver.scheduler.Histogram()
+        hist.record(lateness)
+
+    def reset_process_stats(self):
+        """
+        Resets the timer lateness and main loop duration statistics.
+
+        :return: None
+        """
+        self.timer_lateness = {}
+        self.loop_duration.reset()
+        self.process_stats_start = time.time()
+
+    def wake_process(self):
+        """
+        Wakes up the network processing thread if it is currently waiting for work.
+
+        :return: None
+        """
+        cond = self.server._process_condition
+        with cond:
+            cond.notify()
+
+    def queue_event(self, event: str, data: Dict, scope=None):
+        """
+        Queues an event to be sent from within the network processing thread.
+
+        This method is thread-safe and mainly used by bots, which run in their own threads.
+
+        :param str event: Name of the event
+        :param dict data: Event data
+        :param scope: Optional event scope
+        :return: None
+        """
+        self.event_queue.put((event, data, scope))
+        self.wake_process()
+
+    def schedule_function(self, func: Callable, delay: float, flags=0, *args, group=None, **kwargs) -> cgserver.scheduler.TimerHandle:
+        """
+        Schedules a function to be called from within the network processing thread.
+
+        The function will be called with the actual delay in seconds as its first argument,
+        followed by the given additional arguments.
+
+        If a group is given, the function will be cancelled automatically when
+        :py:meth:`cancel_group()` is called for the group. Games use their :term:`UUID`
+        as the group, so that their functions are cancelled when they are deleted.
+
+        :param func: Function to call
+        :param float delay: Delay in seconds
+        :param int flags: Currently unused
+        :param group: Optional group the function belongs to
+        :return: Handle that can be used to cancel the function
+        :rtype: cgserver.scheduler.TimerHandle
+        """
+        handle = self.scheduler.schedule(func, delay, args, kwargs, group)
+
+        if delay < self.scheduler.get_next_delay(self.PROCESS_MAX_WAIT) + self.scheduler.resolution:
+            # The processing thread may be waiting for a later function
+            self.wake_process()
+
+        return handle
+
+    def cancel_group(self, group) -> int:
+        """
+        Cancels all pending scheduled functions of the given group.
+
+        :param group: Group passed to :py:meth:`schedule_function()`
+        :return: Number of cancelled functions
+        :rtype: int
+        """
+        return self.scheduler.cancel_group(group)
+
+    def load_server_data(self):
+        fname = self.cg.get_settings_path("serverdat.db")
 
         # Try to open it safely
         try:
-            with open(fname, "rb") as f:
-                data = msgpack.load(f)
+            self.user_store = cgserver.userstore.UserStore(self.cg, fname)
         except Exception:
-            self.cg.error("Could not load server data from file, probably broken")
+            self.cg.error("Could not open server data, probably broken")
             self.cg.exception("Exception during server data load:")
-            self.gen_server_data()
-            return
+
+            # Keep the broken database around for manual recovery
+            for suffix in ["", "-wal", "-shm"]:
+                if os.path.exists(fname+suffix):
+                    os.replace(fname+suffix, fname+".broken"+suffix)
+            self.user_store = cgserver.userstore.UserStore(self.cg, fname)
+
+        # One-shot import of the data file written by older versions
+        oldfname = self.cg.get_settings_path("serverdat.csd")
+        if self.user_store.is_empty() and os.path.isfile(oldfname):
+            self.cg.info("Migrating server data from serverdat.csd")
+            self.user_store.migrate(oldfname)
 
         # Check if the data is valid
-        if "serverid" not in data or "users" not in data:
-            self.cg.warn("Generating new server identity because necessary data is missing")
-            self.cg.info(f"Old Server Data: {data}")
+        serverid = self.user_store.get_meta("serverid")
+        if serverid is None:
+            self.cg.warn("Generating new server data because no server identity was found")
             self.gen_server_data()
             return
 
-        self.serverid = uuidify(data["serverid"])
+        self.serverid = uuidify(serverid)
 
-        if "secret" not in data:
+        self.secret = self.user_store.get_meta("secret")
+        if self.secret is None:
             self.secret = secrets.token_bytes(self.cg.get_config_option("cg:server.secret_length"))
-        else:
-            self.secret = data["secret"]
+            self.user_store.set_meta("secret", self.secret)
 
-        for user, udat in data["users"].items():
+        upgraded = []
+        for user, udat in self.user_store.load_users():
             u = cgserver.user.User(self, self.cg, user, udat)
             self.users[user] = u
             self.users_uuid[u.uuid] = u
+            if udat.get("pwd_type", "plaintext") == "plaintext":
+                upgraded.append(u)
 
-        self.cg.info(f"Successfully loaded server data! {len(data['users'])} Users found")
+        self.cg.info(f"Successfully loaded server data! {len(self.users)} Users found")
+
+        # Plaintext passwords have been hashed while loading
+        for u in upgraded:
+            self.save_user(u)
 
     def gen_server_data(self):
         self.serverid = uuid.uuid4()
@@ -321,23 +1138,52 @@ class DedicatedServer(object):
         self.save_server_data()
 
     def save_server_data(self):
+        """
+        Saves the server identity and all users in a single transaction.
+
+        The data is written in the background by :py:attr:`persistence`\ .
+        Prefer :py:meth:`save_user()` if only a single user has changed.
+
+        :return: None
+        """
         self.cg.info("Saving server data")
 
-        users = {}
-        for name, u in self.users.items():
-            if isinstance(u, cgserver.user.BotUser):
-                continue
-            users[u.username] = u.serialize()
+        serverid = self.serverid.hex
+        secret = self.secret
+        users = [
+            (u.username, u.serialize()) for u in self.users.values()
+            if not isinstance(u, cgserver.user.BotUser)
+        ]
 
-        fname = self.cg.get_settings_path("serverdat.csd")
-        data = {
-            "serverid": self.serverid.hex,
-            "secret": self.secret,
-            "users": users,
-        }
+        def write():
+            with self.user_store.transaction():
+                self.user_store.set_meta("serverid", serverid)
+                self.user_store.set_meta("secret", secret)
 
-        with open(fname, "wb") as f:
-            msgpack.dump(data, f)
+                for username, udat in users:
+                    self.user_store.put_user(username, udat)
+
+        self.persistence.mark_dirty("serverdat", write)
+
+    def save_user(self, user: cgserver.user.User):
+        """
+        Persists the changes made to a single user.
+
+        Only the record of the given user is written, which makes this much cheaper than
+        :py:meth:`save_server_data()` on servers with many users. Multiple changes of the
+        same user in quick succession are written only once.
+
+        :param user: User that has been changed
+        :return: None
+        """
+        if isinstance(user, cgserver.user.BotUser):
+            return
+
+        username, udat = user.username, user.serialize()
+        self.persistence.mark_dirty(
+            ("user", user.uuid),
+            lambda: self.user_store.put_user(username, udat),
+        )
 
     def register_game(self, name: str, cls: Type[cgserver.game.CGame]):
         self.game_reg[name] = cls
@@ -383,6 +1229,61 @@ class DedicatedServer(object):
 
         self.server.send_message(packet, data, user.cid)
 
+    def get_user_features(self, user: cgserver.user.User) -> FrozenSet[str]:
+        """
+        Returns the protocol features negotiated with the client of the given user.
+
+        Bots and users that are not connected do not support any features.
+        """
+        if user.cid is None or user.cid not in self.server.clients:
+            return frozenset()
+        return self.server.clients[user.cid].features
+
+    def broadcast(self,
+                  packet: str,
+                  data: dict,
+                  recipients: Iterable[Union[uuid.UUID, cgserver.user.User]],
+                  exclude: Optional[Iterable[uuid.UUID]] = None,
+                  ):
+        """
+        Sends a packet to multiple users.
+
+        Unlike calling :py:meth:`send_to_user()` for each recipient, the packet is only
+        encoded once and the same bytes are written to every connection. Bots still
+        receive their copy via the ``cg:bot.[<uuid>].packet.recv`` event.
+
+        :param packet: Name of the packet to send
+        :param data: Data of the packet
+        :param recipients: Users to send the packet to
+        :param exclude: Optional UUIDs of users that should not receive the packet
+        :return: None
+        """
+        exclude = set(exclude) if exclude is not None else set()
+
+        cids = []
+        for user in recipients:
+            if isinstance(user, uuid.UUID):
+                if user in exclude:
+                    continue
+                if user not in self.users_uuid:
+                    self.cg.error(f"Could not send packet {packet} to user {user} because it does not exist")
+                    continue
+                user = self.users_uuid[user]
+            elif user.uuid in exclude:
+                continue
+
+            if isinstance(user, cgserver.user.BotUser):
+                self.cg.send_event(f"cg:bot.[{user.uuid.hex}].packet.recv", {"packet": packet, "data": data})
+                continue
+
+            if user.cid is None:
+                self.cg.error(f"Could not send packet {packet} to user {user.username} because they are not connected")
+                continue
+
+            cids.append(user.cid)
+
+        self.server.send_message_many(packet, data, cids)
+
     def send_status_message(self, user: Union[uuid.UUID, cgserver.user.User], t: str, msg: str, data: Optional[Dict] = None):
         if data is None:
             data = {}
@@ -416,6 +1317,7 @@ class DedicatedServer(object):
             return
 
         self.settings = data
+        self.server.invalidate_ping_cache()
 
         self.cg.send_event("cg:settings.load", {"settings": self.settings})
 
@@ -458,12 +1360,15 @@ class DedicatedServer(object):
     def save_settings(self):
         self.cg.info(f"Saving settings")
 
+        # Settings are saved after every change
+        self.server.invalidate_ping_cache()
+
         self.cg.send_event("cg:settings.save", {"settings": self.settings})
 
         fname = self.cg.get_settings_path("server_settings.json")
 
-        with open(fname, "w") as f:
-            json.dump(self.settings, f)
+        # Serialized right away, since the settings may change again before being written
+        self.persistence.write_file(fname, json.dumps(self.settings))
 
     # Event Handlers
     def register_event_handlers(self):
@@ -473,9 +1378,12 @@ class DedicatedServer(object):
 
         self.cg.add_event_listener("cg:network.packets.register.do", self.handler_dopacketregister)
         self.cg.add_event_listener("cg:network.client.login", self.handler_netclientlogin)
+        self.cg.add_event_listener("cg:shutdown", self.handler_shutdown)
 
         self.cg.add_event_listener("cg:game.register.do", self.handler_dogameregister)
         self.cg.add_event_listener("cg:bot.register.do", self.handler_dobotregister)
+        self.cg.add_event_listener("cg:bot.*.packet.recv", self.handler_botevent)
+        self.cg.add_event_listener("cg:bot.*.gamerules", self.handler_botevent)
 
         self.cg.add_event_listener("cg:stats.game.new", self.handler_statsnew)
 
@@ -492,6 +1400,8 @@ class DedicatedServer(object):
             0,
             event=data["event"],
             data=data["data"],
+            scope=data.get("scope", None),
+            group=data.get("scope", None),
         )
 
     def handler_consolerecvline(self, event: str, data: Dict):
@@ -505,7 +1415,21 @@ class DedicatedServer(object):
         cgserver.packet.register_default_packets(data["reg"], data["peer"], self.cg, data["registrar"])
 
     def handler_netclientlogin(self, event: str, data: Dict):
-        pass
+        client = self.server.clients.get(data["client"], None)
+        if client is None or client.user is None:
+            return
+
+        self.online_users[client.user.uuid] = client.user.username
+        self.server.invalidate_ping_cache()
+
+    def handler_shutdown(self, event: str, data: Dict):
+        self.password_hasher.shutdown()
+
+        # Must happen before closing the user store, since pending writes may still use it
+        self.persistence.shutdown()
+
+        if self.user_store is not None:
+            self.user_store.close()
 
     def handler_dogameregister(self, event: str, data: Dict):
         cgserver.game.register_games(data["registrar"])
@@ -513,22 +1437,35 @@ class DedicatedServer(object):
     def handler_dobotregister(self, event: str, data: Dict):
         cgserver.game.bot.register_bots(data["registrar"])
 
+    def handler_botevent(self, event: str, data: Dict, captures: Tuple[str, ...]):
+        # Route per-bot events to the thread of the bot in question
+        u = self.users_uuid.get(uuidify(captures[0]), None)
+        if not isinstance(u, cgserver.user.BotUser) or getattr(u, "bot", None) is None:
+            self.cg.warn(f"Ignored event {event} for unknown bot {captures[0]}")
+            return
+
+        u.bot._receive_event(event, data)
+
     def handler_statsnew(self, event: str, data: Dict):
         statdir = self.cg.get_settings_path("gamestats")
         statdir = os.path.join(statdir, data["game_type"])
 
-        # Ensure directory exists
-        os.makedirs(statdir, exist_ok=True)
-
         fname = os.path.join(statdir, f"{data['game_id']}.cgs")
 
         self.cg.info(f"Saving statistics for game {data['game_id']}")
 
-        if os.path.exists(fname):
-            self.cg.warn(f"Overwriting old statistics for game {data['game_id']}")
+        packed = msgpack.dumps(data)
+
+        def write():
+            # Ensure directory exists
+            os.makedirs(statdir, exist_ok=True)
+
+            if os.path.exists(fname):
+                self.cg.warn(f"Overwriting old statistics for game {data['game_id']}")
+
+            cgserver.persistence.write_file_atomic(fname, packed)
 
-        with open(fname, "wb") as f:
-            msgpack.dump(data, f)
+        self.persistence.mark_dirty(("file", fname), write)
 
-    def _send_event(self, dt, event, data):
-        self.cg.send_event(event, data)
+    def _send_event(self, dt, event, data, scope=None):
+        self.cg.send_event(event, data, scope)
@@ -24,7 +24,7 @@ import hashlib
 import hmac
 import secrets
 import uuid
-from typing import Union, Optional, Dict, Any
+from typing import Union, Optional, Dict, Any, Callable
 
 import cg
 
@@ -60,8 +60,9 @@ class User(object):
         self.pwd_iterations: int = udat.get("pwd_iterations", self.get_pwd_iterations()) if auth else -1
 
         # Auto-upgrade plaintext passwords
+        # Saving is left to whoever created the user, to avoid rewriting all users while loading
         if auth and self.pwd_type == "plaintext":
-            self.set_pwd(self.pwd)
+            self.set_pwd(self.pwd, save=False)
 
         self.uuid: uuid.UUID = cg.util.uuidify(udat.get("uuid", uuid.uuid4()))
 
@@ -96,7 +97,7 @@ class User(object):
             if secrets.compare_digest(password, self.pwd):
                 # Success!
                 # Upgrade password automatically
-                if update:
+                if update and self.needs_rehash():
                     self.set_pwd(password)
 
                 return True
@@ -108,8 +109,8 @@ class User(object):
 
             if hmac.compare_digest(phash.hex(), self.pwd.hex()):
                 # Success!
-                # Upgrade password automatically
-                if update:
+                # Upgrade password automatically, but only if the hash is outdated
+                if update and self.needs_rehash():
                     self.set_pwd(password)
 
                 return True
@@ -120,7 +121,71 @@ class User(object):
             self.cg.error(f"Unknown password type {self.pwd_type} for user {self.username} with UUID {self.uuid.hex}")
             return False
 
-    def set_pwd(self, password):
+    def check_password_async(self, password: bytes, callback: Callable[[bool], None], update=True) -> bool:
+        """
+        Checks the password without blocking the network processing thread.
+
+        Works like :py:meth:`check_password()`\ , but the password is hashed by the
+        :py:class:`~cgserver.hashing.PasswordHasher` of the server. The callback is called from
+        within the network processing thread with the result once hashing has finished.
+
+        :param password: Password to check
+        :param callback: Function to call with whether the password was correct
+        :param update: Whether the stored hash should be upgraded on success if it is outdated
+        :return: ``False`` if the check could not be started because too many are pending
+        :rtype: bool
+        """
+        if isinstance(password, str):
+            password = password.encode()
+
+        if self.pwd_type != "pbkdf2_hmac-sha256":
+            # Plaintext passwords are fast to check and unknown types always fail
+            callback(self.check_password(password, update))
+            return True
+
+        # The password may be changed while hashing
+        expected = self.pwd
+
+        def done(phash: Optional[bytes]):
+            if phash is not None and hmac.compare_digest(phash.hex(), expected.hex()):
+                if update and self.needs_rehash():
+                    self.set_pwd_async(password)
+                callback(True)
+                return
+
+            if phash is not None:
+                self.cg.info(f"Failed login attempt of {self.uuid.hex} with {self.pwd_type}")
+            callback(False)
+
+        return self.cg.server.password_hasher.submit(password, self.pwd_salt, self.pwd_iterations, done)
+
+    def set_pwd_async(self, password: bytes, callback: Optional[Callable[[bool], None]] = None) -> bool:
+        """
+        Sets the password without blocking the network processing thread.
+
+        The callback, if given, is called once the new password has been stored.
+
+        :param password: New password
+        :param callback: Optional function to call with whether the password was changed
+        :return: ``False`` if hashing could not be started because too many hashes are pending
+        :rtype: bool
+        """
+        iterations = self.get_pwd_iterations()
+
+        def done(phash: Optional[bytes]):
+            if phash is not None:
+                self.pwd_type = "pbkdf2_hmac-sha256"
+                self.pwd_iterations = iterations
+                self.pwd = phash
+
+                self.cg.server.save_user(self)
+
+            if callback is not None:
+                callback(phash is not None)
+
+        return self.cg.server.password_hasher.submit(password, self.pwd_salt, iterations, done)
+
+    def set_pwd(self, password, save=True):
         self.pwd_type = "pbkdf2_hmac-sha256"
         self.pwd_iterations = self.get_pwd_iterations()
 
@@ -128,7 +193,20 @@ class User(object):
 
         self.pwd = phash
 
-        self.cg.server.save_server_data()
+        if save:
+            self.cg.server.save_user(self)
+
+    def needs_rehash(self) -> bool:
+        """
+        Checks whether the stored password hash should be upgraded.
+
+        This is the case for plaintext passwords, other outdated algorithms and hashes with
+        fewer iterations than :py:meth:`get_pwd_iterations()` currently returns.
+
+        :return: Whether the password should be re-hashed on the next successful login
+        :rtype: bool
+        """
+        return self.pwd_type != "pbkdf2_hmac-sha256" or self.pwd_iterations < self.get_pwd_iterations()
 
     @staticmethod
     def get_pwd_iterations() -> int:
@@ -152,7 +230,7 @@ class BotUser(User):
     def state(self):
         return "bot"
 
-    def set_pwd(self, password):
+    def set_pwd(self, password, save=True):
         raise RuntimeError("Cannot set password on bot user")
 
     def serialize(self):
@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  userstore.py
+#
+#  Copyright 2020 contributors of cardgame
+#
+#  This file is part of cardgame.
+#
+#  cardgame is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  cardgame is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with cardgame.  If not, see <http://www.gnu.org/licenses/>.
+#
+import contextlib
+import os
+import sqlite3
+import threading
+import uuid
+from typing import Any, Dict, Iterator, Tuple
+
+import cg
+from cg.util.serializer import msgpack
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value BLOB
+);
+CREATE TABLE IF NOT EXISTS users (
+    uuid TEXT PRIMARY KEY,
+    username TEXT NOT NULL,
+    data BLOB NOT NULL
+);
+"""
+
+
+class UserStore(object):
+    """
+    Persistent store of the server identity and all user accounts, backed by SQLite.
+
+    Every user is stored as a separate row containing the msgpack-encoded output of
+    :py:meth:`User.serialize()`\\ , keyed by its :term:`UUID`\\ . Saving a user thus only
+    writes a single row, no matter how many users exist. All writes are atomic, a crash
+    while saving loses at most the change being saved.
+
+    Servers that still have a ``serverdat.csd`` file from older versions can import it
+    once via :py:meth:`migrate()`\\ .
+
+    All methods are thread-safe.
+    """
+
+    def __init__(self, c: cg.CardGame, fname: str):
+        self.cg = c
+        self.fname = fname
+
+        self._lock = threading.RLock()
+
+        self.conn = sqlite3.connect(fname, check_same_thread=False, isolation_level=None)
+        # The write-ahead log keeps the database intact if the server crashes while writing
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """
+        Context manager grouping all writes within it into a single atomic commit.
+
+        Transactions may be nested, only the outermost one commits.
+        """
+        with self._lock:
+            if self.conn.in_transaction:
+                yield self
+                return
+
+            self.conn.execute("BEGIN")
+            try:
+                yield self
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            else:
+                self.conn.execute("COMMIT")
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            return (self.conn.execute("SELECT 1 FROM meta LIMIT 1").fetchone() is None
+                    and self.conn.execute("SELECT 1 FROM users LIMIT 1").fetchone() is None)
+
+    def get_meta(self, key: str, default=None) -> Any:
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return default if row is None else row[0]
+
+    def set_meta(self, key: str, value: Any) -> None:
+        with self.transaction():
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def load_users(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Loads all stored users.
+
+        :return: Iterator of tuples of the username and the saved user data
+        """
+        with self._lock:
+            rows = self.conn.execute("SELECT username, data FROM users ORDER BY rowid").fetchall()
+
+        for username, data in rows:
+            yield username, msgpack.loads(data)
+
+    def put_user(self, username: str, udat: Dict[str, Any]) -> None:
+        """
+        Stores the data of a single user, replacing any previous data with the same UUID.
+
+        :param str username: Name of the user
+        :param dict udat: Data as returned by :py:meth:`User.serialize()`
+        :return: None
+        """
+        with self.transaction():
+            self.conn.execute(
+                "INSERT OR REPLACE INTO users (uuid, username, data) VALUES (?, ?, ?)",
+                (udat["uuid"], username, msgpack.dumps(udat)),
+            )
+
+    def migrate(self, fname: str) -> bool:
+        """
+        Imports the data of a ``serverdat.csd`` file written by older versions.
+
+        The import is done in a single transaction. Afterwards, the old file is renamed so
+        that it is not imported again, but still available in case something went wrong.
+
+        :param str fname: Path of the old file
+        :return: Whether the file could be imported
+        :rtype: bool
+        """
+        try:
+            with open(fname, "rb") as f:
+                data = msgpack.load(f)
+        except Exception:
+            self.cg.error("Could not load old server data from file, probably broken")
+            self.cg.exception("Exception during server data migration:")
+            return False
+
+        if not isinstance(data, dict) or "serverid" not in data or "users" not in data:
+            self.cg.warn("Not migrating old server data because necessary data is missing")
+            return False
+
+        with self.transaction():
+            self.set_meta("serverid", cg.util.uuidify(data["serverid"]).hex)
+            if "secret" in data:
+                self.set_meta("secret", data["secret"])
+
+            for username, udat in data["users"].items():
+                udat = dict(udat)
+                udat["uuid"] = cg.util.uuidify(udat.get("uuid", None) or uuid.uuid4()).hex
+                self.put_user(username, udat)
+
+        os.replace(fname, fname+".migrated")
+
+        self.cg.info(f"Migrated {len(data['users'])} users from {os.path.basename(fname)}")
+        return True
+
+    def close(self) -> None:
+        with self._lock:
+            self.conn.close()
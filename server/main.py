@@ -50,6 +50,18 @@ class CardgameApp(cli.Application):
                                  help="Sets the settings directory",
                                  )
 
+    replay = cli.SwitchAttr(["--replay"],
+                            argtype=str,
+                            default=None,
+                            help="Replays the given event journal instead of starting the console",
+                            )
+
+    replay_speed = cli.SwitchAttr(["--replay-speed"],
+                                  argtype=float,
+                                  default=1.0,
+                                  help="Speed factor for replaying journals, 0 replays as fast as possible",
+                                  )
+
     def main(self):
         print("Server starting...")
         sys.stdout.flush()
@@ -62,8 +74,14 @@ class CardgameApp(cli.Application):
 
         c.init_server(addr=self.addr)
 
-        c.info("Starting server")
-        c.server.start()
+        if self.replay is not None:
+            c.info("Starting server for replay")
+            # Recording while replaying could overwrite the journal being replayed
+            c.server.start_listening(record=False)
+            c.server.replay_journal(self.replay, self.replay_speed)
+        else:
+            c.info("Starting server")
+            c.server.start()
 
         c.info("Server stopped")
         sys.stdout.flush()
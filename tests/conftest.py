@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  conftest.py
+#
+#  Copyright 2020 contributors of cardgame
+#
+#  This file is part of cardgame.
+#
+#  cardgame is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  cardgame is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with cardgame.  If not, see <http://www.gnu.org/licenses/>.
+#
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Same layout as when running server/main.py from the repository
+sys.path[:0] = [ROOT, os.path.join(ROOT, "server")]
+
+# peng3d imports pyglet, which would otherwise try to open a window
+os.environ.setdefault("PYGLET_SHADOW_WINDOW", "0")
+
+import cg
+
+
+@pytest.fixture(scope="session")
+def c(tmp_path_factory) -> cg.CardGame:
+    """
+    CardGame object with its own settings directory.
+
+    Only one should be created per process, since loggers are bound to the first one.
+    """
+    if cg.c is not None:
+        return cg.c
+    return cg.CardGame(os.path.join(ROOT, "server"), str(tmp_path_factory.mktemp("settings")))
+
+
+@pytest.fixture(scope="session")
+def server(c):
+    """
+    Dedicated server that is not listening for connections.
+
+    Shared by all tests, since each CardGame object can only have a single server.
+    """
+    import cgserver
+
+    if c.server is None:
+        c.server = cgserver.server.DedicatedServer(c, "127.0.0.1", 0)
+        c.server.load_server_data()
+    return c.server
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  test_bot.py
+#
+#  Copyright 2020 contributors of cardgame
+#
+#  This file is part of cardgame.
+#
+#  cardgame is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  cardgame is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with cardgame.  If not, see <http://www.gnu.org/licenses/>.
+#
+import uuid
+
+import pytest
+
+from cgserver.game.bot.doppelkopf.advanced import AdvancedDKBot
+from cgserver.game.bot.doppelkopf.dumb import DumbDoppelkopfBot
+from cgserver.game.card import create_dk_deck
+from cgserver.game.doppelkopf import DoppelkopfGame
+
+
+@pytest.mark.parametrize("botcls", [DumbDoppelkopfBot, AdvancedDKBot])
+def test_bulk_transfer_creates_and_deals_cards(c, botcls):
+    players = [uuid.uuid4() for _ in range(4)]
+    bot = botcls(c, players[1], "botTest")
+
+    # Events are normally queued on the server, which is not needed here
+    sent = []
+    bot.send_event = lambda event, data, scope=None: sent.append((event, data))
+
+    bot.on_packet("cg:game.start", {
+        "gamerules": {rule: v["default"] for rule, v in DoppelkopfGame.GAMERULES.items()},
+        "player_list": [p.hex for p in players],
+    })
+    bot.on_packet("cg:game.dk.round.change", {
+        "round": 1,
+        "phase": "loading",
+        "player_list": [p.hex for p in players],
+    })
+
+    # Same packets as sent by DoppelkopfRound.transfer_cards()
+    deck = list(create_dk_deck().values())
+    bot.on_packet("cg:game.dk.card.transfer_bulk", {
+        "transfers": [{
+            "card_id": card.card_id.hex,
+            "card_value": "",
+            "from_slot": None,
+            "to_slot": "stack",
+        } for card in deck],
+    })
+
+    assert len(bot.slots["stack"]) == 48
+    assert sent == [("cg:game.dk.ready_to_deal", {"player": bot.bot_id.hex})]
+
+    bot.on_packet("cg:game.dk.card.transfer_bulk", {
+        "transfers": [{
+            "card_id": card.card_id.hex,
+            "card_value": card.card_value if i % 4 == 1 else "",
+            "from_slot": "stack",
+            "to_slot": f"hand{i % 4}",
+        } for i, card in enumerate(deck)],
+        "delay": 0.1,
+    })
+
+    assert bot.slots["stack"] == []
+    hand = [(card.card_id, card.card_value) for card in bot.slots["hand1"]]
+    assert hand == [(card.card_id, card.card_value) for card in deck[1::4]]
+    for i in [0, 2, 3]:
+        assert len(bot.slots[f"hand{i}"]) == 12
@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  test_event.py
+#
+#  Copyright 2020 contributors of cardgame
+#
+#  This file is part of cardgame.
+#
+#  cardgame is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  cardgame is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with cardgame.  If not, see <http://www.gnu.org/licenses/>.
+#
+import time
+
+import cg.event
+
+
+def test_split_event_keeps_bracketed_segments():
+    assert cg.event.split_event("cg:network.packet.[cg:game.dk.turn].recv") == (
+        "cg:network", "packet", "[cg:game.dk.turn]", "recv",
+    )
+
+
+def test_pattern_handlers_receive_captures(c):
+    em = cg.event.EventManager(c)
+    calls = []
+
+    em.add_event_listener("cg:bot.*.packet.recv", lambda e, d, captures: calls.append((e, captures)))
+    em.send_event("cg:bot.[abc].packet.recv", {})
+    em.send_event("cg:bot.[abc].packet.send", {})
+    em.send_event("cg:bot.[abc].packet.recv.extra", {})
+
+    assert calls == [("cg:bot.[abc].packet.recv", ("abc",))]
+
+
+def test_pattern_cache_follows_listener_changes(c):
+    em = cg.event.EventManager(c)
+    calls = []
+
+    def handler(event, data, captures):
+        calls.append(captures)
+
+    em.add_event_listener("a.*.c", handler)
+    assert em.has_listeners("a.b.c")
+
+    em.send_event("a.b.c", {})
+    em.del_event_listener("a.*.c", handler)
+    em.send_event("a.b.c", {})
+
+    assert calls == [("b",)]
+    assert not em.has_listeners("a.b.c")
+
+
+def test_scoped_events_only_reach_their_scope(c):
+    em = cg.event.EventManager(c)
+    calls = []
+
+    em.add_event_listener("ev", lambda e, d: calls.append("global"))
+    em.add_event_listener("ev", lambda e, d: calls.append(1), scope=1)
+    em.add_event_listener("ev", lambda e, d: calls.append(2), scope=2)
+
+    em.send_event("ev", {}, scope=1)
+    assert calls == ["global", 1]
+
+    calls.clear()
+    em.send_event("ev", {})
+    assert sorted(map(str, calls)) == ["1", "2", "global"]
+
+
+def test_del_group_removes_all_handlers(c):
+    em = cg.event.EventManager(c)
+    calls = []
+
+    em.add_event_listener("a", lambda e, d: calls.append("a"), group="g")
+    em.add_event_listener("b.*", lambda e, d, captures: calls.append("b"), group="g")
+    em.del_group("g")
+
+    em.send_event("a", {})
+    em.send_event("b.x", {})
+    assert calls == []
+
+
+def test_profiler_records_dispatches_and_handlers(c):
+    em = cg.event.EventManager(c)
+    em.profiler.enable()
+
+    def slow(event, data):
+        time.sleep(0.01)
+
+    em.add_event_listener("slow", slow)
+    em.add_event_listener("fast", lambda e, d: None)
+    for _ in range(3):
+        em.send_event("slow", {})
+    em.send_event("fast", {})
+
+    stats = em.profiler.stats["slow"]
+    assert stats.dispatches == 3
+    assert stats.handler_calls == 3
+    assert stats.max >= 0.01
+    assert stats.handlers[slow.__qualname__].calls == 3
+
+    assert em.profiler.top(1)[0][0] == "slow"
+    assert [name for name, _ in em.profiler.top(key="dispatches")][0] == "slow"
+
+
+def test_disabled_profiler_records_nothing(c):
+    em = cg.event.EventManager(c)
+    em.add_event_listener("ev", lambda e, d: None)
+    em.send_event("ev", {})
+
+    assert em.profiler.stats == {}
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  test_hashing.py
+#
+#  Copyright 2020 contributors of cardgame
+#
+#  This file is part of cardgame.
+#
+#  cardgame is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  cardgame is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with cardgame.  If not, see <http://www.gnu.org/licenses/>.
+#
+import hashlib
+import threading
+import time
+
+import cgserver.hashing
+
+
+class ImmediateServer(object):
+    # Calls the callbacks from the worker thread instead of the network processing thread
+    def schedule_function(self, func, delay, flags=0, *args):
+        func(0, *args)
+
+
+def wait_for(cond, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not cond() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return cond()
+
+
+def test_hash_password(c):
+    hasher = cgserver.hashing.PasswordHasher(c, ImmediateServer(), workers=1, processes=False)
+    results = []
+
+    assert hasher.submit(b"pwd", b"salt", 1000, results.append)
+    assert wait_for(lambda: results)
+    assert results == [hashlib.pbkdf2_hmac("sha256", b"pwd", b"salt", 1000)]
+    assert (hasher.pending, hasher.completed) == (0, 1)
+
+    hasher.shutdown()
+
+
+def test_pending_limit(c, monkeypatch):
+    release = threading.Event()
+
+    def blocking_hash(password, salt, iterations):
+        release.wait(5)
+        return password
+    monkeypatch.setattr(cgserver.hashing, "hash_password", blocking_hash)
+
+    hasher = cgserver.hashing.PasswordHasher(c, ImmediateServer(), workers=1, max_pending=2, processes=False)
+    results = []
+
+    assert hasher.submit(b"a", b"", 1, results.append)
+    assert hasher.submit(b"b", b"", 1, results.append)
+    # Queued hashes count as well, not only running ones
+    assert not hasher.submit(b"c", b"", 1, results.append)
+    assert (hasher.pending, hasher.rejected, hasher.pending_high_water) == (2, 1, 2)
+
+    release.set()
+    assert wait_for(lambda: len(results) == 2)
+    assert sorted(results) == [b"a", b"b"]
+    assert hasher.pending == 0
+
+    # Slots are free again once the hashes are done
+    assert hasher.submit(b"d", b"", 1, results.append)
+    assert wait_for(lambda: len(results) == 3)
+
+    hasher.shutdown()
@@ -0,0 +1,265 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  test_journal.py
+#
+#  Copyright 2020 contributors of cardgame
+#
+#  This file is part of cardgame.
+#
+#  cardgame is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  cardgame is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with cardgame.  If not, see <http://www.gnu.org/licenses/>.
+#
+import multiprocessing
+import os
+import queue
+import socket
+import sys
+import threading
+import time
+
+import msgpack.fallback
+
+import cg
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+USERNAMES = ["alice", "bob", "carol", "dave"]
+
+# Generous, since both sessions run in freshly spawned processes that may compete for the CPU
+TIMEOUT = float(os.environ.get("CG_TEST_TIMEOUT", 60))
+
+
+# Servers are run in their own processes, since loggers are bound to the first CardGame object
+# of each process
+
+
+def _create_server(settings_dir: str) -> cg.CardGame:
+    """
+    Creates a server that already listens on a free port.
+
+    The socket is bound before returning, so clients can connect as soon as
+    :py:meth:`~cgserver.server.DedicatedServer.start_listening()` has been called.
+    """
+    import cgserver
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+
+    c = cg.CardGame(os.path.join(ROOT, "server"), settings_dir)
+    c.server = cgserver.server.DedicatedServer(c, "127.0.0.1", port)
+    c.server.load_server_data()
+    # Worker processes take much longer to start than the whole session
+    c.server.password_hasher.processes = False
+
+    # Otherwise, the socket is only bound once the network thread gets to it
+    c.server.server.bind()
+    return c
+
+
+def _get_state(c: cg.CardGame):
+    server = c.server
+    names = lambda uids: [server.users_uuid[uid].username for uid in uids]
+
+    return {
+        "users": {name: u.uuid for name, u in server.users.items()},
+        "lobbies": {
+            lid: (l.game, l.started, names(l.users)) for lid, l in server.lobbies.items()
+        },
+        "games": {
+            gid: {
+                "players": names(g.players),
+                "round_id": g.current_round.round_id,
+                "seed": g.current_round.random_seed,
+                "cards": {cid: card.card_value for cid, card in g.current_round.cards.items()},
+            } for gid, g in server.games.items()
+        },
+    }
+
+
+def _record_session(settings_dir: str, journal: str, results: multiprocessing.Queue):
+    import peng3dnet
+    import cgserver
+
+    class RecordingPacket(peng3dnet.packet.Packet):
+        def __init__(self, reg, peer, name):
+            super().__init__(reg, peer)
+            self.name = name
+
+        def receive(self, msg, cid=None):
+            self.peer.inbox.put((self.name, msg))
+
+    class TestClient(peng3dnet.net.Client):
+        def __init__(self, server, username):
+            super().__init__(addr=f"127.0.0.1:{server.addr[1]}")
+            self.username = username
+            self.inbox = queue.Queue()
+
+            # Same IDs as on the server, so that the registry does not need to be synced
+            for name, pid in server.registry.reg_int_str.inv.items():
+                if not name.startswith("peng3dnet:"):
+                    self.register_packet(name, RecordingPacket(self.registry, self, name), pid)
+
+            self.runAsync()
+            self.process_async()
+            self.wait_for_connection(TIMEOUT)
+
+        def on_handshake_complete(self):
+            super().on_handshake_complete()
+            self.send_message("cg:version.check", {
+                "protoversion": cgserver.version.PROTO_VERSION,
+                "semver": cgserver.version.SEMVER,
+                "flavor": cgserver.version.FLAVOR,
+                "features": [],
+            })
+
+        def expect(self, packet, **match):
+            deadline = time.monotonic() + TIMEOUT
+            while True:
+                name, msg = self.inbox.get(timeout=deadline - time.monotonic())
+                if name == packet and all(msg.get(k, None) == v for k, v in match.items()):
+                    return msg
+
+    c = _create_server(settings_dir)
+    c.server.start_listening(record=False)
+    c.server.start_journal(journal)
+
+    clients = [TestClient(c.server.server, name) for name in USERNAMES]
+    for client in clients:
+        client.expect("cg:version.check", compatible=True)
+        client.send_message("cg:auth", {"username": client.username, "pwd": "hunter22", "create": True})
+        client.expect("cg:auth", status="logged_in")
+
+    creator = clients[0]
+    creator.send_message("cg:lobby.create", {"game": "doppelkopf"})
+    creator.expect("cg:lobby.join")
+
+    for client in clients[1:]:
+        creator.send_message("cg:lobby.invite", {"username": client.username})
+        invite = client.expect("cg:lobby.invite")
+        client.send_message("cg:lobby.invite.accept", {
+            "accepted": True,
+            "lobby_id": invite["lobby_id"],
+            "inviter": invite["inviter"],
+        })
+        client.expect("cg:lobby.join")
+
+    for client in clients:
+        client.send_message("cg:lobby.ready", {"ready": True})
+    for client in clients:
+        client.expect("cg:game.start")
+        client.send_message("cg:game.start", {})
+    for client in clients:
+        client.expect("cg:game.dk.round.change", phase="dealing")
+
+    # The clients stay connected, so the replayed state ends with the same session
+    results.put(_get_state(c))
+    c.event_manager.stop_journal()
+
+
+def _replay_session(settings_dir: str, journal: str, results: multiprocessing.Queue):
+    c = _create_server(settings_dir)
+    c.server.start_listening(record=False)
+    count, _ = c.server.replay_journal(journal, 0)
+
+    results.put((count, _get_state(c)))
+
+
+def _run(target, *args):
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    p = ctx.Process(target=target, args=args+(results,), daemon=True)
+    p.start()
+    try:
+        # Covers the startup of the process and all waits within it
+        deadline = time.monotonic() + TIMEOUT*5
+        while time.monotonic() < deadline:
+            try:
+                return results.get(timeout=1)
+            except queue.Empty:
+                assert p.is_alive() or not results.empty(), f"{target.__name__} exited with {p.exitcode}"
+        raise TimeoutError(f"{target.__name__} did not finish within {TIMEOUT*5}s")
+    finally:
+        p.join(TIMEOUT)
+        if p.is_alive():
+            p.kill()
+
+
+def test_replay_round_trip(tmp_path):
+    journal = str(tmp_path / "journal.cgj")
+    (tmp_path / "recorded").mkdir()
+    (tmp_path / "replayed").mkdir()
+
+    recorded = _run(_record_session, str(tmp_path / "recorded"), journal)
+
+    assert sorted(recorded["users"]) == USERNAMES
+    assert len(recorded["lobbies"]) == 1
+    assert len(recorded["games"]) == 1
+    game = next(iter(recorded["games"].values()))
+    assert sorted(game["players"]) == USERNAMES
+    assert len(game["cards"]) == 48
+
+    count, replayed = _run(_replay_session, str(tmp_path / "replayed"), journal)
+
+    assert count > 0
+    assert replayed == recorded
+
+
+def test_journal_records_inputs(tmp_path):
+    fname = str(tmp_path / "journal.cgj")
+
+    journal = cg.journal.EventJournal(fname)
+    journal.enter("cg:test", {"a": 1}, None)
+    journal.leave()
+    journal.record("cg:journal.packet", {"cid": 1, "packet": "cg:test", "flags": 0, "data": b"\x80"})
+    journal.close()
+
+    entries = list(cg.journal.read_journal(fname))
+    assert [(e.depth, e.event) for e in entries] == [
+        (0, "cg:test"),
+        (cg.journal.INPUT_DEPTH, "cg:journal.packet"),
+    ]
+    assert entries[1].data["data"] == b"\x80"
+
+
+def test_journal_concurrent_writes(tmp_path):
+    fname = str(tmp_path / "journal.cgj")
+    journal = cg.journal.EventJournal(fname)
+    # The C extension holds the GIL while packing and hides any interleaving
+    journal.packer = msgpack.fallback.Packer(default=cg.journal._encode, use_bin_type=True)
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+
+    def write(n):
+        for i in range(2000):
+            journal.enter("cg:test", {"thread": n, "i": i, "pad": "x"*(n*500)}, None)
+            journal.leave()
+        journal.record("cg:journal.random", {"value": n})
+
+    threads = [threading.Thread(target=write, args=(n,)) for n in range(4)]
+    try:
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        sys.setswitchinterval(interval)
+    journal.close()
+
+    entries = list(cg.journal.read_journal(fname))
+    assert len(entries) == journal.entries == 4*2001
+    for n in range(4):
+        data = [e.data for e in entries if e.event == "cg:test" and e.data["thread"] == n]
+        assert [d["i"] for d in data] == list(range(2000))
+    assert sorted(e.data["value"] for e in entries if e.event == "cg:journal.random") == list(range(4))
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  test_packet.py
+#
+#  Copyright 2020 contributors of cardgame
+#
+#  This file is part of cardgame.
+#
+#  cardgame is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  cardgame is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with cardgame.  If not, see <http://www.gnu.org/licenses/>.
+#
+import copy
+import uuid
+
+import msgpack
+
+import cg.packet
+
+
+class UUIDPacket(cg.packet.CGPacket):
+    uuid_keys = [
+        "player",
+        "players",
+        "transfers.*.card_id",
+    ]
+
+
+def test_pack_unpack_uuids_round_trip(c):
+    packet = UUIDPacket(None, None, c=c)
+
+    player, other, card = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    msg = {
+        "player": player.hex,
+        "players": [player, other.hex],
+        "transfers": [{"card_id": card.hex, "to_slot": "hand0"}],
+        "username": "a" * 32,  # Not listed, must stay a string
+    }
+    orig = copy.deepcopy(msg)
+
+    packed = packet.pack_uuids(msg)
+    # Shared between recipients, so it must not be modified
+    assert msg == orig
+    assert packed["player"] == player.bytes
+    assert packed["players"] == [player.bytes, other.bytes]
+    assert packed["transfers"][0]["card_id"] == card.bytes
+    assert packed["username"] == "a" * 32
+
+    received = msgpack.unpackb(msgpack.packb(packed, use_bin_type=True), raw=False)
+    unpacked = packet.unpack_uuids(received)
+    assert unpacked == {
+        "player": player,
+        "players": [player, other],
+        "transfers": [{"card_id": card, "to_slot": "hand0"}],
+        "username": "a" * 32,
+    }
+
+
+def test_unpack_uuids_keeps_hex_strings(c):
+    packet = UUIDPacket(None, None, c=c)
+
+    # Peers that did not negotiate binary UUIDs still send hex strings
+    msg = {"player": uuid.uuid4().hex, "transfers": []}
+    assert packet.unpack_uuids(msg) is msg
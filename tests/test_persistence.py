@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  test_persistence.py
+#
+#  Copyright 2020 contributors of cardgame
+#
+#  This file is part of cardgame.
+#
+#  cardgame is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  cardgame is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with cardgame.  If not, see <http://www.gnu.org/licenses/>.
+#
+import os
+import time
+
+import pytest
+
+import cgserver.persistence
+
+
+def test_write_file_atomic(tmp_path):
+    fname = str(tmp_path / "data.json")
+
+    cgserver.persistence.write_file_atomic(fname, "old")
+    cgserver.persistence.write_file_atomic(fname, b"new")
+
+    with open(fname, "rb") as f:
+        assert f.read() == b"new"
+    assert os.listdir(tmp_path) == ["data.json"]
+
+
+def test_write_file_atomic_keeps_old_data_on_error(tmp_path, monkeypatch):
+    fname = str(tmp_path / "data.json")
+    cgserver.persistence.write_file_atomic(fname, "old")
+
+    def fail(src, dst):
+        raise OSError("disk full")
+    monkeypatch.setattr(os, "replace", fail)
+
+    with pytest.raises(OSError):
+        cgserver.persistence.write_file_atomic(fname, "new")
+
+    with open(fname, "rb") as f:
+        assert f.read() == b"old"
+    # The temporary file must not be left behind
+    assert os.listdir(tmp_path) == ["data.json"]
+
+
+def test_mark_dirty_coalesces(c):
+    service = cgserver.persistence.PersistenceService(c, delay=60)
+    writes = []
+
+    for i in range(3):
+        service.mark_dirty("key", lambda i=i: writes.append(i))
+    service.mark_dirty("other", lambda: writes.append("other"))
+    assert service.pending == 2
+
+    service.flush()
+    assert writes == [2, "other"]
+    assert (service.marked, service.written, service.coalesced) == (4, 2, 2)
+
+    service.shutdown()
+
+
+def test_mark_dirty_writes_in_background(c):
+    service = cgserver.persistence.PersistenceService(c, delay=0)
+    writes = []
+
+    service.mark_dirty("key", lambda: writes.append(1))
+
+    deadline = time.monotonic() + 5
+    while not writes and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert writes == [1]
+
+    service.shutdown()
+
+
+def test_shutdown_flushes_and_refuses_marks(c):
+    service = cgserver.persistence.PersistenceService(c, delay=60)
+    writes = []
+
+    service.mark_dirty("key", lambda: writes.append("before"))
+    service.shutdown()
+    assert writes == ["before"]
+
+    service.mark_dirty("key", lambda: writes.append("after"))
+    assert service.pending == 0
+    assert service._thread is None or not service._thread.is_alive()
+    assert writes == ["before"]
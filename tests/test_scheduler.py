@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  test_scheduler.py
+#
+#  Copyright 2020 contributors of cardgame
+#
+#  This file is part of cardgame.
+#
+#  cardgame is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  cardgame is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with cardgame.  If not, see <http://www.gnu.org/licenses/>.
+#
+import cgserver.scheduler
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def pop_all(wheel):
+    handles = []
+    while True:
+        handle = wheel.pop_due()
+        if handle is None:
+            return handles
+        handles.append(handle.args[0])
+
+
+def test_pop_due_in_deadline_order():
+    clock = FakeClock()
+    wheel = cgserver.scheduler.TimingWheel(clock, resolution=1, size=4)
+
+    wheel.schedule(None, 2.5, ("b",))
+    wheel.schedule(None, 1.5, ("a",))
+    wheel.schedule(None, 2.5, ("c",))
+    cancelled = wheel.schedule(None, 1.5, ("x",))
+    assert cancelled.cancel()
+
+    assert pop_all(wheel) == []
+    clock.now = 3
+    assert pop_all(wheel) == ["a", "b", "c"]
+    assert wheel.count == 0
+
+
+def test_pop_due_after_stall_longer_than_rotation():
+    clock = FakeClock()
+    wheel = cgserver.scheduler.TimingWheel(clock, resolution=1, size=4)
+
+    # Slot 0 is visited after slot 2, although its function is due earlier
+    wheel.schedule(None, 3.5, ("early",))
+    wheel.schedule(None, 5.5, ("late",))
+
+    clock.now = 10
+    assert pop_all(wheel) == ["early", "late"]
+
+
+def test_cancel_group():
+    clock = FakeClock()
+    wheel = cgserver.scheduler.TimingWheel(clock, resolution=1, size=4)
+
+    wheel.schedule(None, 1, ("a",), group="game")
+    wheel.schedule(None, 1, ("b",))
+    wheel.schedule(None, 9, ("c",), group="game")
+
+    assert wheel.cancel_group("game") == 2
+    clock.now = 10
+    assert pop_all(wheel) == ["b"]
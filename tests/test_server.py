@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  test_server.py
+#
+#  Copyright 2020 contributors of cardgame
+#
+#  This file is part of cardgame.
+#
+#  cardgame is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  cardgame is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with cardgame.  If not, see <http://www.gnu.org/licenses/>.
+#
+import os
+import threading
+import time
+import zlib
+
+import peng3dnet
+import pytest
+
+import cgserver
+
+
+@pytest.fixture
+def client(server):
+    """
+    Client without a connection, like the clients created while replaying a journal.
+    """
+    client = cgserver.server.ClientOnCGServer(server.server, None, ("127.0.0.1", 1), server.server.genCID())
+    client.conntype = peng3dnet.constants.CONNTYPE_CLASSIC
+    server.server.clients[client.cid] = client
+    yield client
+
+    with server.server._outbox_lock:
+        server.server._outbox.pop(client.cid, None)
+        server.server._outbox_size.pop(client.cid, None)
+        server.server._outbox_time.pop(client.cid, None)
+    server.server.clients.pop(client.cid, None)
+
+
+def queued_packets(server, cid):
+    return [ptype for ptype, _ in server.server._outbox.get(cid, [])]
+
+
+def test_superseded_only_dropped_while_stalled(server, client, monkeypatch):
+    # Keep all messages in the outbox, like within a single iteration of the main loop
+    monkeypatch.setattr(server, "process_thread", threading.current_thread())
+    monkeypatch.setattr(server.server, "send_max_latency", 60)
+    monkeypatch.setattr(server.server, "send_max_buffer", 2**20)
+
+    for i in range(3):
+        server.server.send_message("cg:game.dk.turn", {"current_player": str(i)}, client.cid)
+    assert queued_packets(server, client.cid) == ["cg:game.dk.turn"]*3
+    assert client.dropped_messages == 0
+
+    client.stalled_since = time.monotonic()
+    server.server.send_message("cg:game.dk.turn", {"current_player": "3"}, client.cid)
+    assert queued_packets(server, client.cid) == ["cg:game.dk.turn"]
+    assert client.dropped_messages == 3
+
+
+def decode_frame(server, frame: bytes):
+    # Same steps as peng3dnet.net.Client when receiving a message
+    length, = peng3dnet.net.STRUCT_LENGTH32.unpack(frame[:peng3dnet.net.STRUCT_LENGTH32.size])
+    frame = frame[peng3dnet.net.STRUCT_LENGTH32.size:]
+    assert length == len(frame)
+
+    pid, flags = peng3dnet.net.STRUCT_HEADER.unpack(frame[:peng3dnet.net.STRUCT_HEADER.size])
+    body = frame[peng3dnet.net.STRUCT_HEADER.size:]
+    if flags & peng3dnet.constants.FLAG_COMPRESSED:
+        body = zlib.decompress(body)
+    return server.server.registry.getStr(pid), flags, peng3dnet.net.msgpack.unpackb(body)
+
+
+def test_encode_message_compression(server, monkeypatch):
+    monkeypatch.setattr(server.server, "compress_enabled", True)
+    monkeypatch.setattr(server.server, "compress_threshold", 256)
+
+    large = {"message": "cg:msg.test", "data": {"text": "spam " * 200}}
+    frame = server.server._encode_message("cg:status.message", large, frozenset())
+    ptype, flags, data = decode_frame(server, frame)
+    assert flags & peng3dnet.constants.FLAG_COMPRESSED
+    assert (ptype, data) == ("cg:status.message", large)
+    assert len(frame) < len(peng3dnet.net.msgpack.dumps(large))
+
+    small = {"message": "cg:msg.test"}
+    ptype, flags, data = decode_frame(server, server.server._encode_message("cg:status.message", small, frozenset()))
+    assert not flags & peng3dnet.constants.FLAG_COMPRESSED
+    assert data == small
+
+    # Random data does not get smaller and is sent as is
+    skipped = server.server.compress_skipped
+    noise = {"message": "cg:msg.test", "data": {"noise": os.urandom(1024)}}
+    ptype, flags, data = decode_frame(server, server.server._encode_message("cg:status.message", noise, frozenset()))
+    assert not flags & peng3dnet.constants.FLAG_COMPRESSED
+    assert data == noise
+    assert server.server.compress_skipped == skipped+1
+
+
+def test_ping_rate_limit(server, client, monkeypatch):
+    monkeypatch.setattr(server.server, "ping_rate_limit", 3)
+    monkeypatch.setattr(server.server, "ping_rate_window", 60)
+    monkeypatch.setattr(server.server, "_ping_rate", {})
+
+    limited = server.server.ping_rate_limited
+    assert [server.server.check_ping_rate(client.cid) for _ in range(5)] == [True]*3 + [False]*2
+    assert server.server.ping_rate_limited == limited+2
+
+    # Start of the next window
+    server.server._ping_rate[client.addr[0]][0] -= 60
+    assert server.server.check_ping_rate(client.cid)
+
+
+def test_ping_data_cached(server, client, monkeypatch):
+    monkeypatch.setattr(server.server, "ping_cache_ttl", 60)
+    monkeypatch.setitem(server.settings, "slogan", "first")
+    server.server.invalidate_ping_cache()
+
+    hits = server.server.ping_cache_hits
+    first = server.server.getPingData(None, client.cid)
+    second = server.server.getPingData(None, client.cid)
+    assert server.server.ping_cache_hits == hits+1
+    assert second["slogan"] == first["slogan"] == "first"
+    assert "timestamp" in second
+
+    # Changes only show up once the cache has been invalidated
+    server.settings["slogan"] = "second"
+    assert server.server.getPingData(None, client.cid)["slogan"] == "first"
+    server.server.invalidate_ping_cache()
+    assert server.server.getPingData(None, client.cid)["slogan"] == "second"
+
+
+def test_process_budget_is_shared(c, server, monkeypatch):
+    monkeypatch.setattr(server, "PROCESS_BUDGET", 0.05)
+
+    order = []
+
+    def slow_timer(dt):
+        order.append("timer")
+        time.sleep(0.02)
+
+    def on_event(event, data):
+        order.append("event")
+
+    c.add_event_listener("cg:test.process.event", on_event)
+
+    # Enough timers to use up the budget of several iterations
+    for _ in range(10):
+        server.schedule_function(slow_timer, 0)
+    server.queue_event("cg:test.process.event", {})
+    # All timers are due before the processing thread starts
+    time.sleep(0.05)
+
+    thread = threading.Thread(target=server.run_process, daemon=True)
+    thread.start()
+    try:
+        deadline = time.monotonic() + 5
+        while len(order) < 11 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        server.server.run = False
+        server.wake_process()
+        thread.join(5)
+        server.server.run = True
+        c.del_event_listener("cg:test.process.event", on_event)
+
+    assert sorted(order) == ["event"] + ["timer"]*10
+    # The event must not wait until all timers have been called
+    assert order.index("event") <= 1
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  test_userstore.py
+#
+#  Copyright 2020 contributors of cardgame
+#
+#  This file is part of cardgame.
+#
+#  cardgame is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  cardgame is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with cardgame.  If not, see <http://www.gnu.org/licenses/>.
+#
+import os
+import uuid
+
+import pytest
+
+import cgserver.userstore
+from cg.util.serializer import msgpack
+
+
+@pytest.fixture
+def store(c, tmp_path):
+    store = cgserver.userstore.UserStore(c, str(tmp_path / "serverdat.db"))
+    yield store
+    store.close()
+
+
+def write_old_data(fname, data):
+    with open(fname, "wb") as f:
+        f.write(msgpack.dumps(data))
+
+
+def test_migrate(c, store, tmp_path):
+    serverid = uuid.uuid4()
+    alice = uuid.uuid4()
+    oldfname = str(tmp_path / "serverdat.csd")
+    write_old_data(oldfname, {
+        "serverid": serverid.hex,
+        "secret": b"secret",
+        "users": {
+            "alice": {"pwd": b"hash", "pwd_type": "pbkdf2_hmac-sha256", "uuid": alice.hex},
+            # Very old data did not contain UUIDs
+            "bob": {"pwd": "bob", "pwd_type": "plaintext"},
+        },
+    })
+
+    assert store.is_empty()
+    assert store.migrate(oldfname)
+    assert not store.is_empty()
+
+    # Not imported again on the next start, but kept for recovery
+    assert not os.path.exists(oldfname)
+    assert os.path.exists(oldfname+".migrated")
+
+    assert store.get_meta("serverid") == serverid.hex
+    assert store.get_meta("secret") == b"secret"
+
+    users = dict(store.load_users())
+    assert sorted(users) == ["alice", "bob"]
+    assert users["alice"]["uuid"] == alice.hex
+    assert users["alice"]["pwd"] == b"hash"
+    assert uuid.UUID(users["bob"]["uuid"])
+
+    # The data must survive reopening the database
+    store.close()
+    reopened = cgserver.userstore.UserStore(c, store.fname)
+    assert dict(reopened.load_users()) == users
+    reopened.close()
+
+
+@pytest.mark.parametrize("content", [b"\xc1broken", msgpack.dumps({"users": {}})])
+def test_migrate_invalid(store, tmp_path, content):
+    oldfname = str(tmp_path / "serverdat.csd")
+    with open(oldfname, "wb") as f:
+        f.write(content)
+
+    assert not store.migrate(oldfname)
+    assert store.is_empty()
+    # Left in place, so it can be fixed by hand
+    assert os.path.exists(oldfname)
+
+
+def test_put_user_replaces_by_uuid(store):
+    uid = uuid.uuid4().hex
+    store.put_user("alice", {"uuid": uid, "pwd": b"old"})
+    store.put_user("alice", {"uuid": uid, "pwd": b"new"})
+
+    assert list(store.load_users()) == [("alice", {"uuid": uid, "pwd": b"new"})]
+
+
+def test_transaction_rollback(store):
+    with pytest.raises(RuntimeError):
+        with store.transaction():
+            store.set_meta("serverid", "abc")
+            with store.transaction():
+                store.put_user("alice", {"uuid": uuid.uuid4().hex})
+            raise RuntimeError()
+
+    assert store.is_empty()